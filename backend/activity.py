@@ -0,0 +1,581 @@
+# Activity Classification - Ignition Hackathon
+# Windowed leg + chest features -> STATIONARY / WALKING / SCOOTER / MOTORCYCLE.
+#
+# Classifiers are plugins with one method, predict_batch(X). The engine keeps
+# a short sample window per rider and, once per tick, classifies every active
+# rider in a single batch. Windows live in a state store (the workers' shared
+# detector state in server.py), so a rider's window holds every sample
+# whichever worker ingested it; one worker claims each tick. The default plugin applies the documented threshold
+# rules to the window features. "boosted" is a small gradient-boosted stump
+# ensemble evaluated with NumPy (models/activity_boosted.json), loaded on
+# first use. Its bundled model has only seen synthetic rides, so it stays
+# opt-in until it is trained and evaluated on a recorded replay.
+#
+# CLI:
+#   python activity.py synth --out replay.jsonl      # labeled synthetic rides
+#   python activity.py train [--replay FILE]         # refit the bundled model
+#   python activity.py bench [--replay FILE]         # accuracy + batch latency
+
+import argparse
+import base64
+import importlib
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+from array import array
+
+import numpy as np
+
+import geo
+from samples import ChestSample, LegSample
+from shared import LocalState
+
+logger = logging.getLogger(__name__)
+
+ACTIVITIES = ('STATIONARY', 'WALKING', 'SCOOTER', 'MOTORCYCLE')
+FEATURES = (
+    'speed_mean', 'speed_std',
+    'leg_gyro_mean', 'leg_gyro_std',
+    'leg_accel_std', 'chest_accel_std',
+    'posture_angle', 'chest_lean',
+)
+
+MODEL_PATH = os.getenv(
+    "ACTIVITY_MODEL_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "activity_boosted.json")
+)
+ACTIVITY_CLASSIFIER = os.getenv("ACTIVITY_CLASSIFIER", "rules")  # rules | boosted | module:Class
+ACTIVITY_TICK = float(os.getenv("ACTIVITY_TICK", 1.0))  # Seconds between batched inferences
+WINDOW_SECONDS = 20.0  # Feature window (20 samples at the 1 s moving upload interval)
+WINDOW_MAX_SAMPLES = 64
+RESULT_TTL = 2 * WINDOW_SECONDS  # Older predictions are not reported
+
+# Compact per-sample rows kept in the windows
+LEG_FIELDS = ('accel_x', 'accel_y', 'accel_z', 'gyro_x', 'gyro_y', 'gyro_z', 'roll', 'pitch')
+CHEST_FIELDS = ('speed', 'accel_x', 'accel_y', 'accel_z', 'roll', 'pitch', 'lean_angle')
+
+
+# =============================================
+# Features
+# =============================================
+
+def _gravity(accel, roll, pitch):
+    """Unit gravity directions (N, 3); filtered attitude where present, raw accel otherwise"""
+    r = np.radians(roll)
+    p = np.radians(pitch)
+    from_attitude = np.stack([-np.sin(p), np.sin(r) * np.cos(p), np.cos(r) * np.cos(p)], axis=1)
+    norm = np.linalg.norm(accel, axis=1, keepdims=True)
+    from_accel = accel / np.where(norm > 0, norm, 1.0)
+    has_attitude = ~(np.isnan(roll) | np.isnan(pitch))
+    return np.where(has_attitude[:, None], from_attitude, from_accel)
+
+
+def batch_features(legs, chests):
+    """
+    Feature matrix (M, len(FEATURES)) for M riders in one pass.
+    legs / chests: M lists of compact rows (see LEG_FIELDS / CHEST_FIELDS, time first).
+    Per-rider means and deviations are segment sums over the concatenated samples.
+    """
+    riders = len(legs)
+    leg, leg_ids, leg_n = _concat(legs)
+    chest, chest_ids, chest_n = _concat(chests)
+
+    def mean(values, ids, n):
+        return np.bincount(ids, weights=values, minlength=riders) / n
+
+    def std(values, ids, n):
+        m = mean(values, ids, n)
+        return np.sqrt(np.maximum(mean(values * values, ids, n) - m * m, 0.0))
+
+    speed = chest[:, 1]
+    leg_accel = leg[:, 1:4]
+    leg_gyro = np.linalg.norm(leg[:, 4:7], axis=1)
+    chest_accel = chest[:, 2:5]
+
+    # Mean gravity direction per rider, then the angle between leg and chest
+    leg_g = _gravity(leg_accel, leg[:, 7], leg[:, 8])
+    chest_g = _gravity(chest_accel, chest[:, 5], chest[:, 6])
+    leg_g = np.stack([mean(leg_g[:, k], leg_ids, leg_n) for k in range(3)], axis=1)
+    chest_g = np.stack([mean(chest_g[:, k], chest_ids, chest_n) for k in range(3)], axis=1)
+    denom = np.linalg.norm(leg_g, axis=1) * np.linalg.norm(chest_g, axis=1)
+    cos_posture = np.einsum('ij,ij->i', leg_g, chest_g) / np.where(denom > 0, denom, 1.0)
+    posture = np.degrees(np.arccos(np.clip(cos_posture, -1, 1)))
+
+    # Filtered lean where the rows have it, tilt from raw accel otherwise
+    lean = chest[:, 7]
+    accel_lean = np.degrees(np.arccos(np.clip(_gravity(chest_accel, lean, lean)[:, 2], -1, 1)))
+    lean = np.where(np.isnan(lean), accel_lean, lean)
+
+    return np.stack([
+        mean(speed, chest_ids, chest_n), std(speed, chest_ids, chest_n),
+        mean(leg_gyro, leg_ids, leg_n), std(leg_gyro, leg_ids, leg_n),
+        std(np.linalg.norm(leg_accel, axis=1), leg_ids, leg_n),
+        std(np.linalg.norm(chest_accel, axis=1), chest_ids, chest_n),
+        posture, mean(lean, chest_ids, chest_n),
+    ], axis=1)
+
+
+def _concat(windows):
+    """Stack per-rider row lists -> (samples, rider index per sample, samples per rider)"""
+    counts = np.array([len(w) for w in windows])
+    rows = np.array([row for w in windows for row in w], dtype=float)
+    return rows, np.repeat(np.arange(len(windows)), counts), counts
+
+
+def _unpack(window, kind, stride, cutoff):
+    """Rows of one packed window side taken at or after cutoff"""
+    if kind not in window:
+        return []
+    rows = array('d', base64.b64decode(window[kind]))
+    return [tuple(rows[i:i + stride]) for i in range(0, len(rows), stride) if rows[i] >= cutoff]
+
+
+def _row(t, sample, fields):
+    """Sample record -> compact tuple (missing values become NaN)"""
+    values = [t]
+    for field in fields:
+        value = getattr(sample, field)
+        if field == 'speed' and sample.smoothed_speed is not None:
+            value = sample.smoothed_speed
+        values.append(float(value) if value is not None else math.nan)
+    return tuple(values)
+
+
+# =============================================
+# Classifier plugins
+# =============================================
+
+class ActivityClassifier:
+    """
+    Plugin interface. predict_batch gets a (M, len(FEATURES)) matrix and returns
+    (labels, confidence): M activity names and an (M,) array (NaN if unknown).
+    """
+
+    name = None
+
+    def predict_batch(self, X):
+        raise NotImplementedError
+
+
+class RuleClassifier(ActivityClassifier):
+    """The original speed / posture thresholds (see ACTIVITY_DETECTION_LOGIC.md)"""
+
+    name = "rules"
+
+    def predict_batch(self, X):
+        speed = X[:, FEATURES.index('speed_mean')]
+        posture = X[:, FEATURES.index('posture_angle')]
+        labels = np.where(speed < 1, 0, np.where(speed <= 15, 1, np.where(posture < 20, 2, 3)))
+        return [ACTIVITIES[i] for i in labels], np.full(len(X), np.nan)
+
+
+class BoostedStumpsClassifier(ActivityClassifier):
+    """Gradient-boosted decision stumps with softmax outputs"""
+
+    name = "boosted"
+
+    def __init__(self, path=MODEL_PATH):
+        with open(path) as f:
+            model = json.load(f)
+        if list(model["features"]) != list(FEATURES):
+            raise ValueError(f"{path}: model features {model['features']} do not match {FEATURES}")
+        self.classes = list(model["classes"])
+        self._set_stumps(model["base"], model["stumps"])
+
+    def _set_stumps(self, base, stumps):
+        self.base = np.asarray(base, dtype=float)
+        self.feature = np.array([s[0] for s in stumps], dtype=np.intp)
+        self.threshold = np.array([s[1] for s in stumps], dtype=float)
+        self.left = np.array([s[2] for s in stumps], dtype=float).reshape(len(stumps), len(self.base))
+        self.right = np.array([s[3] for s in stumps], dtype=float).reshape(len(stumps), len(self.base))
+
+    def predict_proba(self, X):
+        # (M, S) split decisions for every stump at once; NaN features go right
+        goes_left = (X[:, self.feature] <= self.threshold).astype(float)
+        scores = self.base + goes_left @ self.left + (1 - goes_left) @ self.right
+        return _softmax(scores)
+
+    def predict_batch(self, X):
+        proba = self.predict_proba(X)
+        best = proba.argmax(axis=1)
+        return [self.classes[i] for i in best], proba[np.arange(len(X)), best]
+
+    @classmethod
+    def fit(cls, X, labels, rounds=120, learning_rate=0.3, bins=32, l2=1.0):
+        """Train on (X, labels) with one vector-valued stump per round"""
+        self = cls.__new__(cls)
+        self.classes = list(ACTIVITIES)
+        y = np.array([self.classes.index(label) for label in labels])
+        Y = np.eye(len(self.classes))[y]
+
+        base = np.log(np.clip(Y.mean(axis=0), 1e-3, None))
+        scores = np.tile(base, (len(X), 1))
+        candidates = [
+            np.unique(np.quantile(X[:, f], np.linspace(0, 1, bins + 2)[1:-1]))
+            for f in range(X.shape[1])
+        ]
+
+        stumps = []
+        for _ in range(rounds):
+            P = _softmax(scores)
+            G = Y - P  # Negative gradient of the log loss
+            H = P * (1 - P)
+            G_total, H_total = G.sum(axis=0), H.sum(axis=0)
+
+            best = None
+            for f, thresholds in enumerate(candidates):
+                left = (X[:, f][None, :] <= thresholds[:, None]).astype(float)
+                g_left, h_left = left @ G, left @ H
+                g_right, h_right = G_total - g_left, H_total - h_left
+                gain = (g_left ** 2 / (h_left + l2) + g_right ** 2 / (h_right + l2)).sum(axis=1)
+                i = int(gain.argmax())
+                if best is None or gain[i] > best[0]:
+                    best = (gain[i], f, thresholds[i], g_left[i] / (h_left[i] + l2), g_right[i] / (h_right[i] + l2))
+
+            _, f, threshold, left_value, right_value = best
+            left_value = learning_rate * left_value
+            right_value = learning_rate * right_value
+            scores += np.where((X[:, f] <= threshold)[:, None], left_value, right_value)
+            stumps.append([f, float(threshold), left_value.tolist(), right_value.tolist()])
+
+        self._set_stumps(base, stumps)
+        return self
+
+    def save(self, path):
+        stumps = [
+            [int(f), round(float(t), 6), [round(v, 6) for v in l], [round(v, 6) for v in r]]
+            for f, t, l, r in zip(self.feature, self.threshold, self.left.tolist(), self.right.tolist())
+        ]
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({
+                "type": "boosted_stumps",
+                "features": list(FEATURES),
+                "classes": self.classes,
+                "base": [round(float(b), 6) for b in self.base],
+                "stumps": stumps,
+            }, f, separators=(",", ":"))
+
+
+def _softmax(scores):
+    e = np.exp(scores - scores.max(axis=1, keepdims=True))
+    return e / e.sum(axis=1, keepdims=True)
+
+
+CLASSIFIERS = {
+    RuleClassifier.name: RuleClassifier,
+    BoostedStumpsClassifier.name: BoostedStumpsClassifier,
+}
+
+
+def load_classifier(spec=ACTIVITY_CLASSIFIER):
+    """Built-in name ("rules", "boosted") or "package.module:ClassName" for a custom plugin"""
+    if spec in CLASSIFIERS:
+        return CLASSIFIERS[spec]()
+    module_name, _, class_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+# =============================================
+# Engine (per-rider windows, batched ticks)
+# =============================================
+
+class ActivityEngine:
+    """Sample windows per rider; one batched classification for all riders per tick"""
+
+    def __init__(self, classifier_spec=ACTIVITY_CLASSIFIER, tick=ACTIVITY_TICK, on_tick=None, on_results=None,
+                 store=None):
+        self.classifier_spec = classifier_spec
+        self.tick_interval = tick
+        self.on_tick = on_tick  # Observer called as on_tick(riders, seconds) after each tick
+        self.on_results = on_results  # Called as on_results({rider_id: (activity, confidence, at)}) when non-empty
+        self.store = store if store is not None else LocalState()  # SharedState across workers
+        self.results = {}
+        self.lock = threading.Lock()
+        self._classifier = None
+        self._classifier_lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def classifier(self):
+        """Load the plugin on first use; fall back to the rules if it cannot load"""
+        if self._classifier is None:
+            with self._classifier_lock:
+                if self._classifier is None:
+                    try:
+                        self._classifier = load_classifier(self.classifier_spec)
+                    except Exception as e:
+                        logger.error(f"Activity classifier '{self.classifier_spec}' failed to load, using rules: {e}")
+                        self._classifier = RuleClassifier()
+                    logger.info(f"Activity classifier: {self._classifier.name or type(self._classifier).__name__}")
+        return self._classifier
+
+    def add(self, rider_id, kind, sample, t=None):
+        """Append one 'leg' or 'chest' sample record to the rider's window"""
+        fields = LEG_FIELDS if kind == 'leg' else CHEST_FIELDS
+        row = _row(time.time() if t is None else t, sample, fields)
+        stride = len(row)
+
+        def append(window):
+            # {'leg': packed rows, 'chest': packed rows}: flat doubles, oldest first
+            window = window or {}
+            rows = array('d', base64.b64decode(window[kind])) if kind in window else array('d')
+            rows.extend(row)
+            del rows[:-WINDOW_MAX_SAMPLES * stride]
+            while rows[0] < row[0] - WINDOW_SECONDS:
+                del rows[:stride]
+            window[kind] = base64.b64encode(rows.tobytes()).decode()
+            return window
+
+        self.store.update(f"window:{rider_id}", append)
+
+    def tick(self, now=None):
+        """Classify every rider with fresh leg and chest samples in one batch"""
+        now = time.time() if now is None else now
+        cutoff = now - WINDOW_SECONDS
+        riders = []
+        legs = []
+        chests = []
+
+        for key, window in self.store.items("window:"):
+            leg = _unpack(window, 'leg', 1 + len(LEG_FIELDS), cutoff)
+            chest = _unpack(window, 'chest', 1 + len(CHEST_FIELDS), cutoff)
+            if leg and chest:
+                riders.append(key[len("window:"):])
+                legs.append(leg)
+                chests.append(chest)
+
+        started = time.perf_counter()
+        results = {}
+        if riders:
+            labels, confidence = self.classifier.predict_batch(batch_features(legs, chests))
+            results = {
+                rider_id: (label, None if math.isnan(c) else round(float(c), 3), now)
+                for rider_id, label, c in zip(riders, labels, confidence)
+            }
+            with self.lock:
+                self.results.update(results)
+                for rider_id in [r for r, (_, _, at) in self.results.items() if at < now - RESULT_TTL]:
+                    del self.results[rider_id]
+        if self.on_tick:
+            self.on_tick(len(riders), time.perf_counter() - started)
+        if self.on_results and results:
+            self.on_results(results)
+        return results
+
+    def current(self, rider_id):
+        """Latest (activity, confidence) for a rider, or None if it is stale/unknown"""
+        result = self.results.get(rider_id)
+        if result is None or result[2] < time.time() - RESULT_TTL:
+            return None
+        return result[0], result[1]
+
+    def start(self):
+        """Run tick() in the background (idempotent)"""
+        if self.thread is None or not self.thread.is_alive():
+            with self.lock:
+                if self.thread is None or not self.thread.is_alive():
+                    self.thread = threading.Thread(target=self._run, name="activity-engine", daemon=True)
+                    self.thread.start()
+
+    def _claim(self, now):
+        """True if this worker runs the tick at `now` (one tick per interval across all workers)"""
+        def claim(last):
+            return now if last is None or now - last >= 0.9 * self.tick_interval else last
+        return self.store.update("activity-tick", claim) == now
+
+    def _run(self):
+        while True:
+            started = time.monotonic()
+            try:
+                now = time.time()
+                if self._claim(now):
+                    self.tick(now)
+            except Exception as e:
+                logger.error(f"Activity tick failed: {e}")
+            time.sleep(max(self.tick_interval - (time.monotonic() - started), 0.0))
+
+
+# =============================================
+# Labeled replays (training and benchmark)
+# =============================================
+
+def synthesize(riders=50, seconds=1800, interval=2.0, seed=0):
+    """
+    Labeled synthetic rides: {"rider_id", "t", "label", "leg", "chest"} per send
+    interval. Segments deliberately overlap in speed (slow motorcycles in
+    traffic, fast walkers, GPS drift while parked) so speed alone is not enough.
+    """
+    rng = random.Random(seed)
+    records = []
+
+    for r in range(riders):
+        rider_id = f"rider-{r}"
+        t = 0.0
+        while t < seconds:
+            label = rng.choice(ACTIVITIES)
+            end = t + rng.uniform(60, 300)
+            seated = rng.random() < 0.5  # Parked riders may still sit on the bike
+
+            if label == 'STATIONARY':
+                base_speed, speed_jitter = rng.uniform(0, 1.5), 0.6
+                leg_pitch, chest_pitch = (rng.uniform(60, 85) if seated else rng.uniform(-5, 10)), rng.uniform(-5, 20)
+                leg_gyro, leg_noise, chest_noise = 0.02, 0.05, 0.05
+            elif label == 'WALKING':
+                base_speed, speed_jitter = rng.uniform(2, 9), 1.0
+                leg_pitch, chest_pitch = rng.uniform(-5, 10), rng.uniform(0, 12)
+                leg_gyro, leg_noise, chest_noise = rng.uniform(1.0, 3.0), rng.uniform(2.0, 4.0), rng.uniform(0.8, 1.8)
+            elif label == 'SCOOTER':
+                base_speed, speed_jitter = rng.uniform(8, 25), 2.0
+                leg_pitch, chest_pitch = rng.uniform(-5, 12), rng.uniform(0, 15)
+                leg_gyro, leg_noise, chest_noise = rng.uniform(0.05, 0.3), rng.uniform(0.5, 1.5), rng.uniform(0.4, 1.0)
+            else:
+                base_speed, speed_jitter = rng.uniform(5, 70), 4.0
+                leg_pitch, chest_pitch = rng.uniform(55, 85), rng.uniform(15, 40)
+                leg_gyro, leg_noise, chest_noise = rng.uniform(0.05, 0.3), rng.uniform(0.3, 1.0), rng.uniform(0.3, 0.8)
+
+            while t < min(end, seconds):
+                swing = 25 * math.sin(t * 2.1) if label == 'WALKING' else 0.0
+                leg = _synthetic_imu(rng, rng.gauss(0, 3), leg_pitch + swing, leg_noise, leg_gyro)
+                chest = _synthetic_imu(rng, rng.gauss(0, 3), chest_pitch, chest_noise, leg_gyro / 3)
+                chest['speed'] = round(max(base_speed + rng.gauss(0, speed_jitter), 0.0), 2)
+                records.append({"rider_id": rider_id, "t": t, "label": label, "leg": leg, "chest": chest})
+                t += interval
+
+    records.sort(key=lambda record: record["t"])
+    return records
+
+
+def _synthetic_imu(rng, roll, pitch, accel_noise, gyro_scale):
+    g = geo.gravity_direction(roll, pitch)
+    sample = {
+        axis: round(9.81 * component + rng.gauss(0, accel_noise), 3)
+        for axis, component in zip(('accel_x', 'accel_y', 'accel_z'), g)
+    }
+    for axis in ('gyro_x', 'gyro_y', 'gyro_z'):
+        sample[axis] = round(rng.gauss(0, gyro_scale), 3)
+    sample['roll'] = round(roll + rng.gauss(0, 1), 2)
+    sample['pitch'] = round(pitch + rng.gauss(0, 1), 2)
+    sample['lean_angle'] = round(math.degrees(math.acos(max(-1.0, min(1.0, g[2])))), 2)
+    return sample
+
+
+def replay(records, engine, tick=2.0):
+    """
+    Feed time-ordered records through an engine, ticking every `tick` seconds.
+    Yields (truth, predictions, batch_seconds) per tick; truth is each rider's
+    label at that moment.
+    """
+    truth = {}
+    i = 0
+    now = records[0]["t"] if records else 0.0
+    while i < len(records):
+        now += tick
+        while i < len(records) and records[i]["t"] < now:
+            record = records[i]
+            engine.add(record["rider_id"], 'leg', LegSample.from_row(record["leg"]), t=record["t"])
+            engine.add(record["rider_id"], 'chest', ChestSample.from_row(record["chest"]), t=record["t"])
+            truth[record["rider_id"]] = record["label"]
+            i += 1
+        started = time.perf_counter()
+        predictions = engine.tick(now=now)
+        yield truth, predictions, time.perf_counter() - started
+
+
+def load_replay(path):
+    with open(path) as f:
+        return sorted((json.loads(line) for line in f if line.strip()), key=lambda record: record["t"])
+
+
+class _Recorder(ActivityClassifier):
+    """Collects the feature matrices an engine would classify (for training)"""
+
+    name = "recorder"
+
+    def __init__(self):
+        self.batches = []
+
+    def predict_batch(self, X):
+        self.batches.append(X)
+        return ['UNKNOWN'] * len(X), np.full(len(X), np.nan)
+
+
+def main():
+    """CLI entry point"""
+    parser = argparse.ArgumentParser(description="Activity classifier tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    synth = sub.add_parser("synth", help="Write a labeled synthetic replay")
+    synth.add_argument("--out", required=True)
+    synth.add_argument("--riders", type=int, default=50)
+    synth.add_argument("--seconds", type=int, default=1800)
+    synth.add_argument("--seed", type=int, default=1)
+
+    train = sub.add_parser("train", help="Fit the boosted model on a labeled replay")
+    train.add_argument("--replay", help="Labeled JSONL replay (default: synthetic, seed 0)")
+    train.add_argument("--out", default=MODEL_PATH)
+    train.add_argument("--rounds", type=int, default=120)
+
+    bench = sub.add_parser("bench", help="Accuracy and per-batch latency on a labeled replay")
+    bench.add_argument("--replay", help="Labeled JSONL replay (default: synthetic, seed 1)")
+    bench.add_argument("--classifier", action="append", help="Plugin(s) to compare (default: rules, boosted)")
+    bench.add_argument("--riders", type=int, default=200)
+
+    args = parser.parse_args()
+
+    if args.command == "synth":
+        with open(args.out, "w") as f:
+            for record in synthesize(args.riders, args.seconds, seed=args.seed):
+                f.write(json.dumps(record) + "\n")
+        print(f"Wrote {args.out}")
+
+    elif args.command == "train":
+        records = load_replay(args.replay) if args.replay else synthesize(seed=0)
+        engine = ActivityEngine()
+        engine._classifier = recorder = _Recorder()
+        X, labels = [], []
+        for truth, predictions, _ in replay(records, engine):
+            for rider_id in predictions:
+                labels.append(truth[rider_id])
+            X.extend(recorder.batches[-1] if predictions else [])
+        X = np.array(X)
+        model = BoostedStumpsClassifier.fit(X, labels, rounds=args.rounds)
+        model.save(args.out)
+        accuracy = np.mean(np.array(model.predict_batch(X)[0]) == np.array(labels))
+        print(f"Trained on {len(X)} windows ({len(model.threshold)} stumps), train accuracy {accuracy:.3f} -> {args.out}")
+
+    elif args.command == "bench":
+        records = load_replay(args.replay) if args.replay else synthesize(riders=args.riders, seconds=900, seed=1)
+        for spec in args.classifier or ["rules", "boosted"]:
+            engine = ActivityEngine(classifier_spec=spec)
+            engine.classifier  # Load outside the timed region
+
+            correct = total = 0
+            per_class = {label: [0, 0] for label in ACTIVITIES}
+            latencies = []
+            batch_sizes = []
+            for truth, predictions, seconds in replay(records, engine):
+                if not predictions:
+                    continue
+                latencies.append(seconds)
+                batch_sizes.append(len(predictions))
+                for rider_id, (label, _, _) in predictions.items():
+                    hit = label == truth[rider_id]
+                    correct += hit
+                    total += 1
+                    per_class[truth[rider_id]][0] += hit
+                    per_class[truth[rider_id]][1] += 1
+
+            latencies = np.array(latencies) * 1000
+            recall = ", ".join(f"{label} {hits / max(n, 1):.2f}" for label, (hits, n) in per_class.items())
+            print(f"[{spec}] accuracy {correct / max(total, 1):.3f} over {total} windows ({recall})")
+            print(f"[{spec}] batch of ~{np.mean(batch_sizes):.0f} riders: "
+                  f"p50 {np.percentile(latencies, 50):.2f} ms, p99 {np.percentile(latencies, 99):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
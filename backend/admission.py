@@ -0,0 +1,111 @@
+# Admission Control - Ignition Hackathon
+# Load shedding in front of the request handlers:
+#   - a global cap on requests being worked on at once (anything beyond it is
+#     answered 429 straight away instead of queueing behind a slow Supabase)
+#   - a token bucket per device, so one chatty or retry-looping ESP32 cannot
+#     starve the rest of the fleet
+# Rejections carry Retry-After. Global rejections add jitter so a fleet that
+# was shed together does not come back together. Both are kept per worker
+# process: the cap bounds that process's own concurrency, and a device whose
+# requests spread over N workers may get up to N buckets' worth, which only
+# loosens the throttle.
+#
+# Ingest responses also carry the upload policy the firmwares follow: how often
+# to send while the rider is still and while moving. The intervals stretch as
+# the process nears MAX_IN_FLIGHT, so the fleet slows down before it has to be
+# shed. Impact triggers are always sent immediately.
+
+import math
+import os
+import random
+import threading
+import time
+
+from metrics import IN_FLIGHT
+
+MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT", 32))  # Concurrent requests per process
+DEVICE_RATE = float(os.getenv("INGEST_DEVICE_RATE", 2.0))  # Sustained requests/s per device
+DEVICE_BURST = float(os.getenv("INGEST_DEVICE_BURST", 10))  # Bucket size (requests)
+OVERLOAD_RETRY_AFTER = 2  # Seconds, before jitter
+MAX_BUCKETS = 10000
+IDLE_INTERVAL_MS = int(os.getenv("UPLOAD_IDLE_INTERVAL_MS", 30000))  # Device still (parked, walking away)
+MOVING_INTERVAL_MS = int(os.getenv("UPLOAD_MOVING_INTERVAL_MS", 1000))  # Device in motion
+POLICY_STRETCH = ((0.8, 4), (0.5, 2))  # (in-flight load at or above, interval multiplier)
+
+
+class TokenBucket:
+    """Classic token bucket; not thread-safe on its own"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now, cost=1.0):
+        """Spend `cost` tokens; returns 0 if allowed, else seconds until it would be"""
+        self.refill(now)
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """Global in-flight limit plus per-device token buckets (thread-safe)"""
+
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT, device_rate=DEVICE_RATE, device_burst=DEVICE_BURST):
+        self.max_in_flight = max_in_flight
+        self.device_rate = device_rate
+        self.device_burst = device_burst
+        self.slots = threading.BoundedSemaphore(max_in_flight)
+        self.in_flight = 0
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def enter(self):
+        """Claim an in-flight slot; False when the process is saturated"""
+        if not self.slots.acquire(blocking=False):
+            return False
+        with self.lock:
+            self.in_flight += 1
+        IN_FLIGHT.inc()
+        return True
+
+    def leave(self):
+        with self.lock:
+            self.in_flight -= 1
+        IN_FLIGHT.dec()
+        self.slots.release()
+
+    def overload_retry_after(self):
+        """Retry-After (whole seconds) for a request shed by the in-flight limit"""
+        return OVERLOAD_RETRY_AFTER + random.randint(0, OVERLOAD_RETRY_AFTER)
+
+    def upload_policy(self):
+        """Upload intervals pushed to devices, stretched with the current load"""
+        load = self.in_flight / self.max_in_flight
+        stretch = next((factor for level, factor in POLICY_STRETCH if load >= level), 1)
+        return {"idle_ms": IDLE_INTERVAL_MS * stretch, "moving_ms": MOVING_INTERVAL_MS * stretch}
+
+    def admit_device(self, device_id, now=None):
+        """0 if the device may send now, else Retry-After in whole seconds"""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            bucket = self.buckets.get(device_id)
+            if bucket is None:
+                if len(self.buckets) >= MAX_BUCKETS:
+                    # Full buckets carry no state worth keeping
+                    for key, idle in list(self.buckets.items()):
+                        idle.refill(now)
+                        if idle.tokens >= idle.capacity:
+                            del self.buckets[key]
+                bucket = self.buckets[device_id] = TokenBucket(self.device_rate, self.device_burst, now)
+            wait = bucket.take(now)
+        return math.ceil(wait) if wait else 0
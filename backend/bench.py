@@ -0,0 +1,381 @@
+# Detection Microbenchmarks - Ignition Hackathon
+# Cost per sample of the detection code that runs on every ingest and live
+# poll, so it stays cheap as the algorithms get richer:
+#
+#   scalar/*   per-sample functions in server.py (one leg/chest pair per call)
+#   batch/*    the batched paths: activity features + classifiers over a tick's
+#              rider windows, impact scoring over uploaded IMU bursts
+#
+# Each benchmark is timed timeit-style (loop count auto-ranged, gc off,
+# rounds interleaved across benchmarks, median and fastest round reported)
+# and run once under tracemalloc for the peak bytes it allocates. Results can
+# be appended to a history file keyed by git commit. The gate compares the
+# fastest round (the least noisy statistic) against the best of the last
+# BASELINE_RUNS saved runs on the same machine, so a slowdown just under the
+# tolerance cannot become the next baseline and creep. A slowdown that
+# persists when re-measured, or allocation growth, beyond the tolerance exits
+# 1 (and the run is not saved). A deliberate slowdown is accepted with
+# --rebaseline: the run is saved unchecked and earlier runs stop counting.
+# .github/workflows/bench.yml runs this on every push ("[bench-rebaseline]"
+# in the commit message passes --rebaseline).
+#
+# CLI:
+#   python bench.py                                    # synthetic samples
+#   python bench.py --replay replay.jsonl              # recorded/labeled samples (activity.py format)
+#   python bench.py --compare bench_history.jsonl --save bench_history.jsonl   # CI: gate, then record
+#   python bench.py --filter scalar --rounds 15
+#   python bench.py --rebaseline --save bench_history.jsonl                   # accept an intended slowdown
+
+import argparse
+import gc
+import json
+import logging
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+ROUND_SECONDS = 0.05  # Minimum duration of one timed round
+ROUNDS = 7
+TOLERANCE = 0.25  # Allowed slowdown of the fastest round before failing (fraction)
+ALLOC_TOLERANCE = 0.25  # Allowed growth in peak bytes/sample (fraction)
+ALLOC_SLACK = 64  # Bytes/sample of growth always tolerated (allocator noise)
+BASELINE_RUNS = 10  # The gate compares against the best of this many recent runs
+
+
+# =============================================
+# Sample sets
+# =============================================
+
+def load_pairs(replay=None, seed=1):
+    """Time-ordered records with LegSample/ChestSample pairs (recorded replay or synthetic rides)"""
+    import activity
+    from samples import ChestSample, LegSample
+
+    records = activity.load_replay(replay) if replay else activity.synthesize(riders=200, seconds=120, seed=seed)
+    for record in records:
+        record["leg_sample"] = LegSample.from_row(record["leg"])
+        record["chest_sample"] = ChestSample.from_row(record["chest"])
+    return records
+
+
+def activity_windows(records):
+    """One tick's batch: each rider's last WINDOW_SECONDS of compact leg/chest rows"""
+    import activity
+
+    riders = {}
+    for record in records:
+        window = riders.setdefault(record["rider_id"], ([], []))
+        window[0].append(activity._row(record["t"], record["leg_sample"], activity.LEG_FIELDS))
+        window[1].append(activity._row(record["t"], record["chest_sample"], activity.CHEST_FIELDS))
+    legs, chests = [], []
+    for leg, chest in riders.values():
+        end = leg[-1][0]
+        legs.append([row for row in leg if row[0] > end - activity.WINDOW_SECONDS])
+        chests.append([row for row in chest if row[0] > end - activity.WINDOW_SECONDS])
+    return legs, chests
+
+
+def impact_streams(riders=20, seconds=60, rate=50.0, seed=7):
+    """Per-rider IMU streams (road vibration, with a crash, fall or pothole in some)"""
+    import impact
+
+    rng = random.Random(seed)
+    scenarios = ('road', 'crash', 'pothole', 'fall')
+    streams = []
+    for r in range(riders):
+        x, _ = impact._synthetic_stream(rng, seconds, rate, scenarios[r % len(scenarios)], rng.uniform(10, seconds - 10))
+        streams.append(x)
+    return streams
+
+
+# =============================================
+# Benchmarks: name -> (setup -> (fn, samples per call))
+# =============================================
+
+def _scalar_magnitude(records):
+    import server
+
+    triples = [(r["leg_sample"].accel_x, r["leg_sample"].accel_y, r["leg_sample"].accel_z) for r in records]
+    magnitude = server.calculate_acceleration_magnitude
+
+    def run():
+        for ax, ay, az in triples:
+            magnitude(ax, ay, az)
+    return run, len(triples)
+
+
+def _scalar_fall(records):
+    import server
+
+    pairs = [(r["leg_sample"], r["chest_sample"]) for r in records]
+    check = server.check_fall_or_accident
+
+    def run():
+        for leg, chest in pairs:
+            check(leg, chest)
+    return run, len(pairs)
+
+
+def _scalar_activity(records):
+    import server
+
+    pairs = [(r["leg_sample"], r["chest_sample"]) for r in records]
+    detect = server.detect_activity_type
+
+    def run():
+        for leg, chest in pairs:
+            detect(leg, chest)
+    return run, len(pairs)
+
+
+def _batch_features(records):
+    import activity
+
+    legs, chests = activity_windows(records)
+    samples = sum(map(len, legs)) + sum(map(len, chests))
+    return (lambda: activity.batch_features(legs, chests)), samples
+
+
+def _batch_classifier(spec):
+    def setup(records):
+        import activity
+
+        legs, chests = activity_windows(records)
+        classifier = activity.load_classifier(spec)
+        samples = sum(map(len, legs)) + sum(map(len, chests))
+        return (lambda: classifier.predict_batch(activity.batch_features(legs, chests))), samples
+    return setup
+
+
+def _batch_impact(records):
+    import impact
+
+    rate = 50.0
+    per_burst = int(2 * rate)  # 2 s uploads
+    bursts = [
+        [((end - 1) / rate, {"rate_hz": rate, "samples": x[end - per_burst:end]})
+         for end in range(per_burst, len(x) + 1, per_burst)]
+        for x in impact_streams(rate=rate)
+    ]
+
+    def run():
+        # Fresh detector each call: every rider's whole stream in 2 s uploads, so each call does the same work
+        detector = impact.ImpactDetector()
+        for r, rider in enumerate(bursts):
+            for t_end, burst in rider:
+                detector.add_burst(f"rider-{r}", "chest", t_end, burst)
+    return run, sum(len(rider) for rider in bursts) * per_burst
+
+
+BENCHMARKS = {
+    "scalar/calculate_acceleration_magnitude": _scalar_magnitude,
+    "scalar/check_fall_or_accident": _scalar_fall,
+    "scalar/detect_activity_type": _scalar_activity,
+    "batch/activity_features": _batch_features,
+    "batch/activity_rules": _batch_classifier("rules"),
+    "batch/activity_boosted": _batch_classifier("boosted"),
+    "batch/impact_add_burst": _batch_impact,
+}
+
+
+# =============================================
+# Timing + allocations
+# =============================================
+
+def measure(benchmarks, rounds=ROUNDS, round_seconds=ROUND_SECONDS):
+    """
+    {name: {ns_per_sample (median round), min_ns_per_sample, alloc_bytes_per_sample, loops}}
+    for {name: (fn, samples)}. Rounds are interleaved across the benchmarks, so a
+    slow stretch of the machine hits one round of each rather than every round
+    of one.
+    """
+    loops = {}
+    for name, (fn, _) in benchmarks.items():
+        fn()  # Warm-up (lazy imports, caches)
+        loops[name] = 1
+        while True:
+            elapsed = _timed(fn, loops[name])
+            if elapsed >= round_seconds:
+                break
+            loops[name] = max(loops[name] * 2, int(loops[name] * round_seconds / max(elapsed, 1e-9) * 1.2))
+
+    per_call = {name: [] for name in benchmarks}
+    for _ in range(rounds):
+        for name, (fn, _) in benchmarks.items():
+            per_call[name].append(_timed(fn, loops[name]) / loops[name])
+
+    results = {}
+    for name, (fn, samples) in benchmarks.items():
+        times = sorted(per_call[name])
+        results[name] = {
+            "ns_per_sample": round(times[len(times) // 2] / samples * 1e9, 1),
+            "min_ns_per_sample": round(times[0] / samples * 1e9, 1),
+            "alloc_bytes_per_sample": round(_peak_bytes(fn) / samples, 1),
+            "loops": loops[name],
+        }
+    return results
+
+
+def _peak_bytes(fn):
+    """Peak bytes allocated during one call, above what was live before it"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        fn()
+        return max(tracemalloc.get_traced_memory()[1] - before, 0)
+    finally:
+        tracemalloc.stop()
+
+
+def _timed(fn, loops):
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        return time.perf_counter() - started
+    finally:
+        if enabled:
+            gc.enable()
+
+
+# =============================================
+# History + regression gate
+# =============================================
+
+def machine_id():
+    """Results are only comparable on the same host, CPU and Python"""
+    return f"{platform.node()}|{platform.machine()}|{platform.processor()}|py{platform.python_version()}"
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def load_baseline(path, machine, dataset, runs=BASELINE_RUNS):
+    """
+    Best result per benchmark over the last `runs` history entries from this
+    machine on the same sample set, none before the latest rebaseline
+    ({"commits": [...], "results": {...}}), or None
+    """
+    entries = []
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    if entry.get("machine") == machine and entry.get("dataset") == dataset:
+                        if entry.get("rebaseline"):
+                            entries = []
+                        entries.append(entry)
+    except FileNotFoundError:
+        pass
+    if not entries:
+        return None
+
+    best = {}
+    for entry in entries[-runs:]:
+        for name, result in entry["results"].items():
+            ns, alloc = result["min_ns_per_sample"], result["alloc_bytes_per_sample"]
+            if name in best:
+                ns, alloc = min(ns, best[name]["min_ns_per_sample"]), min(alloc, best[name]["alloc_bytes_per_sample"])
+            best[name] = {"min_ns_per_sample": ns, "alloc_bytes_per_sample": alloc}
+    return {"commits": [entry.get("commit") for entry in entries[-runs:]], "results": best}
+
+
+def regressions(results, baseline, tolerance=TOLERANCE, alloc_tolerance=ALLOC_TOLERANCE):
+    """Human-readable list of benchmarks that got slower or allocate more than allowed"""
+    found = []
+    for name, result in results.items():
+        before = baseline["results"].get(name)
+        if not before:
+            continue
+        ratio = result["min_ns_per_sample"] / max(before["min_ns_per_sample"], 1e-9)
+        if ratio > 1 + tolerance:
+            found.append(f"{name}: {before['min_ns_per_sample']:.0f} -> {result['min_ns_per_sample']:.0f} "
+                         f"ns/sample fastest round ({ratio:.2f}x)")
+        alloc_limit = before["alloc_bytes_per_sample"] * (1 + alloc_tolerance) + ALLOC_SLACK
+        if result["alloc_bytes_per_sample"] > alloc_limit:
+            found.append(f"{name}: {before['alloc_bytes_per_sample']:.0f} -> "
+                         f"{result['alloc_bytes_per_sample']:.0f} B/sample allocated")
+    return found
+
+
+def main():
+    """CLI entry point"""
+    parser = argparse.ArgumentParser(description="Detection microbenchmarks (ns/sample and allocations)")
+    parser.add_argument("--replay", help="Recorded/labeled JSONL replay (activity.py format; default: synthetic)")
+    parser.add_argument("--filter", help="Only benchmarks whose name contains this")
+    parser.add_argument("--rounds", type=int, default=ROUNDS)
+    parser.add_argument("--save", help="Append results to this history file (JSONL)")
+    parser.add_argument("--compare", help="Fail if slower / heavier than the best recent run in this history file")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="Allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--machine", help="Label to compare and save under (default: host, CPU and Python)")
+    parser.add_argument("--rebaseline", action="store_true",
+                        help="Skip the comparison and start a new baseline with this run (an intended slowdown)")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)  # Sampled per-sample log lines are not part of the cost being tracked
+
+    records = load_pairs(args.replay)
+    dataset = f"replay:{args.replay}" if args.replay else "synthetic"
+    names = [name for name in BENCHMARKS if not args.filter or args.filter in name]
+
+    machine = args.machine or machine_id()
+    baseline = load_baseline(args.compare, machine, dataset) if args.compare and not args.rebaseline else None
+    if args.rebaseline:
+        print("Rebaseline: not compared; earlier runs stop counting once this one is saved")
+    elif args.compare and baseline is None:
+        print(f"No baseline for this machine in {args.compare}; nothing to compare against")
+
+    print(f"{len(records)} sample pairs ({dataset}), {args.rounds} rounds")
+    print(f"{'benchmark':<42}{'ns/sample':>12}{'min':>10}{'B/sample':>10}{'vs base':>10}")
+    benchmarks = {name: BENCHMARKS[name](records) for name in names}
+    results = measure(benchmarks, rounds=args.rounds)
+    if baseline and regressions(results, baseline, args.tolerance):
+        # Confirm before failing: a real regression reproduces, a noisy stretch of the machine rarely does
+        flagged = {name for name in results if regressions({name: results[name]}, baseline, args.tolerance)}
+        again = measure({name: benchmarks[name] for name in flagged}, rounds=args.rounds)
+        for name, result in again.items():
+            if result["min_ns_per_sample"] < results[name]["min_ns_per_sample"]:
+                results[name] = result
+    for name, result in results.items():
+        before = baseline["results"].get(name) if baseline else None
+        change = f"{result['min_ns_per_sample'] / max(before['min_ns_per_sample'], 1e-9):.2f}x" if before else ""
+        print(f"{name:<42}{result['ns_per_sample']:>12.1f}{result['min_ns_per_sample']:>10.1f}"
+              f"{result['alloc_bytes_per_sample']:>10.1f}{change:>10}")
+
+    found = regressions(results, baseline, args.tolerance) if baseline else []
+    if found:
+        # Not saved: a regressed run must not become the next baseline
+        print(f"\nRegressions against the best of {len(baseline['commits'])} recent runs:")
+        for line in found:
+            print(f"  {line}")
+        sys.exit(1)
+    if baseline:
+        print(f"\nNo regressions against the best of {len(baseline['commits'])} recent runs")
+
+    if args.save:
+        with open(args.save, "a") as f:
+            f.write(json.dumps({
+                "commit": git_commit(),
+                "recorded_at": datetime.now().isoformat(),
+                "machine": machine,
+                "dataset": dataset,
+                "rebaseline": args.rebaseline,
+                "results": results,
+            }) + "\n")
+        print(f"Saved to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+# Sensor Calibration - Ignition Hackathon
+# Per-device IMU corrections, applied to every sample before orientation and
+# event detection. At boot each ESP32 averages its IMU while resting and posts
+# the gyro bias and rest accelerometer vector to /api/calibration. From those
+# the server derives:
+#   gyro offset     rad/s subtracted from every gyro reading
+#   accel scale     g / |rest accel| (per-chip sensitivity error)
+#   mount rotation  tilt that brings the rest gravity vector onto +z, so
+#                   posture and thresholds do not depend on how the board
+#                   was strapped on
+# Each calibration is a versioned row in Supabase (device_calibrations; the
+# database assigns the version), published to the workers' shared state and
+# cached in memory. Ingest never waits on Supabase: a device that is not cached
+# yet gets its last known calibration (or none, version 0) until a background
+# loader has read it. A correction is one multiply and one 3x3 matrix product,
+# for a single sample or a whole IMU burst.
+
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from metrics import SUPABASE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+GRAVITY = 9.81
+CALIBRATION_TTL = float(os.getenv("CALIBRATION_TTL", 300))  # Seconds before a cached entry is re-read
+MAX_GYRO_BIAS = 0.2  # rad/s (~11°/s); more means the device was moving during boot
+REST_TOLERANCE = 0.25 * GRAVITY  # |rest accel| must be this close to g
+
+
+class Calibration:
+    """One device's correction: accel' = R (s * accel), gyro' = R (gyro - b)"""
+
+    __slots__ = ("device_id", "version", "gyro_offset", "accel_scale", "rotation")
+
+    def __init__(self, device_id, version, gyro_offset, accel_scale, rotation):
+        self.device_id = device_id
+        self.version = version
+        self.gyro_offset = np.asarray(gyro_offset, dtype=float)
+        self.accel_scale = float(accel_scale)
+        self.rotation = np.asarray(rotation, dtype=float).reshape(3, 3)
+
+    @classmethod
+    def identity(cls, device_id):
+        """No-op calibration (version 0) for devices that never calibrated"""
+        return cls(device_id, 0, np.zeros(3), 1.0, np.eye(3))
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(
+            row["device_id"], row["version"],
+            [row["gyro_offset_x"], row["gyro_offset_y"], row["gyro_offset_z"]],
+            row["accel_scale"], row["rotation"]
+        )
+
+    def to_row(self):
+        return {
+            "device_id": self.device_id,
+            "version": self.version,
+            "gyro_offset_x": float(self.gyro_offset[0]),
+            "gyro_offset_y": float(self.gyro_offset[1]),
+            "gyro_offset_z": float(self.gyro_offset[2]),
+            "accel_scale": self.accel_scale,
+            "rotation": [round(float(v), 6) for v in self.rotation.ravel()],
+        }
+
+    def apply(self, accel, gyro):
+        """Correct (N, 3) accel (m/s²) and gyro (rad/s) arrays"""
+        return (accel * self.accel_scale) @ self.rotation.T, (gyro - self.gyro_offset) @ self.rotation.T
+
+    def correct_sample(self, sample):
+        """Correct one sample record in place and tag it with the calibration version"""
+        sample.calibration_version = self.version
+        if not self.version:
+            return sample
+        accel, gyro = self.apply(
+            np.array([[sample.accel_x, sample.accel_y, sample.accel_z]]),
+            np.array([[sample.gyro_x, sample.gyro_y, sample.gyro_z]])
+        )
+        sample.accel_x, sample.accel_y, sample.accel_z = (round(float(v), 3) for v in accel[0])
+        sample.gyro_x, sample.gyro_y, sample.gyro_z = (round(float(v), 4) for v in gyro[0])
+        return sample
+
+    def correct_burst(self, burst):
+        """Corrected copy of an IMU burst; samples become an (N, 6) array"""
+        samples = burst.get("samples")
+        samples = np.asarray(samples if samples is not None else [], dtype=float).reshape(-1, 6)
+        if self.version and len(samples):
+            accel, gyro = self.apply(samples[:, :3], samples[:, 3:])
+            samples = np.hstack([accel, gyro])
+        return {**burst, "samples": samples}
+
+
+def rotation_between(a, b):
+    """Rotation matrix taking unit vector a onto unit vector b (Rodrigues)"""
+    v = np.cross(a, b)
+    c = float(np.dot(a, b))
+    if c < -0.999999:
+        # Opposite vectors: half turn about any axis perpendicular to a
+        axis = np.cross(a, [1.0, 0.0, 0.0])
+        if np.linalg.norm(axis) < 1e-6:
+            axis = np.cross(a, [0.0, 1.0, 0.0])
+        axis /= np.linalg.norm(axis)
+        return 2 * np.outer(axis, axis) - np.eye(3)
+    vx = np.array([[0, -v[2], v[1]], [v[2], 0, -v[0]], [-v[1], v[0], 0]])
+    return np.eye(3) + vx + vx @ vx / (1 + c)
+
+
+def calibration_from_rest(device_id, version, gyro_bias, rest_accel):
+    """Derive a calibration from a boot-time rest estimate; ValueError if it is implausible"""
+    gyro_bias = np.asarray(gyro_bias, dtype=float).reshape(3)
+    rest_accel = np.asarray(rest_accel, dtype=float).reshape(3)
+    if not (np.isfinite(gyro_bias).all() and np.isfinite(rest_accel).all()):
+        raise ValueError("gyro_bias and rest_accel must be finite")
+    if np.abs(gyro_bias).max() > MAX_GYRO_BIAS:
+        raise ValueError(f"gyro_bias above {MAX_GYRO_BIAS} rad/s, device was not at rest")
+    norm = float(np.linalg.norm(rest_accel))
+    if abs(norm - GRAVITY) > REST_TOLERANCE:
+        raise ValueError(f"|rest_accel| = {norm:.2f} m/s², expected about {GRAVITY}")
+
+    rotation = rotation_between(rest_accel / norm, np.array([0.0, 0.0, 1.0]))
+    return Calibration(device_id, version, gyro_bias, GRAVITY / norm, rotation)
+
+
+class CalibrationStore:
+    """
+    Latest calibration per device, read through an in-memory cache (thread-safe).
+    With a shared state factory, the current row is kept in shared memory so a
+    new calibration reaches every worker at once, and Supabase is read once per
+    TTL for the whole host instead of once per worker. Lookups never wait on
+    Supabase: misses are loaded by a background thread.
+    """
+
+    def __init__(self, supabase_factory, shared_factory=None, ttl=CALIBRATION_TTL):
+        self.supabase_factory = supabase_factory
+        self.shared_factory = shared_factory
+        self.ttl = ttl
+        self.cache = {}  # device_id -> (Calibration, fetched_at)
+        self.pending = set()  # device_ids waiting for the loader
+        self.wakeup = threading.Event()
+        self.loader = None
+        self.lock = threading.Lock()
+
+    def get(self, device_id, wait=False):
+        """
+        Calibration to apply to a device's samples (identity if it has none).
+        A missing or expired entry is queued for the background loader and the
+        last known calibration is served meanwhile; wait=True loads it now
+        instead (for reads off the ingest path).
+        """
+        entry = self.cache.get(device_id)
+        row = self._shared_row(device_id)
+        if row is not None:
+            if entry is not None and entry[0].version == row["version"]:
+                return entry[0]
+            calibration = Calibration.from_row(row)
+            with self.lock:
+                self.cache[device_id] = (calibration, time.monotonic())
+            return calibration
+        if entry is not None and time.monotonic() - entry[1] < self.ttl:
+            return entry[0]
+
+        if wait:
+            return self._load(device_id)
+        self._queue(device_id)
+        return entry[0] if entry else Calibration.identity(device_id)
+
+    def put(self, device_id, gyro_bias, rest_accel):
+        """Store a new calibration version from a boot-time estimate and cache it"""
+        calibration = calibration_from_rest(device_id, None, gyro_bias, rest_accel)  # Validate before any I/O
+        row = calibration.to_row()
+        del row["version"]
+
+        # The database assigns the version (see store_device_calibration in setup.sql)
+        with SUPABASE_SECONDS.labels("store_device_calibration", "rpc").time():
+            result = self.supabase_factory().rpc(
+                "store_device_calibration", {f"p_{key}": value for key, value in row.items()}
+            ).execute()
+        calibration.version = result.data
+
+        self._remember(calibration)
+        logger.info(f"Calibration v{calibration.version} stored for {device_id}")
+        return calibration
+
+    def _load(self, device_id):
+        """Read a device's latest calibration from Supabase and share it"""
+        try:
+            calibration = self._fetch(device_id) or Calibration.identity(device_id)
+        except Exception as e:
+            # Keep serving the last known calibration; retry after the TTL
+            logger.error(f"Calibration lookup for {device_id} failed: {e}")
+            entry = self.cache.get(device_id)
+            calibration = entry[0] if entry else Calibration.identity(device_id)
+        return self._remember(calibration)
+
+    def _remember(self, calibration):
+        """
+        Cache and publish a calibration unless a newer version is already known
+        (a concurrent put can land between a fetch and its publish). Returns the
+        calibration now current.
+        """
+        with self.lock:
+            entry = self.cache.get(calibration.device_id)
+            if entry is not None and entry[0].version > calibration.version:
+                calibration = entry[0]
+            self.cache[calibration.device_id] = (calibration, time.monotonic())
+        return self._publish(calibration)
+
+    # ---------------------------------------------
+    # Loader (background thread)
+    # ---------------------------------------------
+
+    def _queue(self, device_id):
+        with self.lock:
+            if device_id in self.pending:
+                return
+            self.pending.add(device_id)
+            if self.loader is None or not self.loader.is_alive():
+                self.loader = threading.Thread(target=self._load_loop, name="calibration-loader", daemon=True)
+                self.loader.start()
+        self.wakeup.set()
+
+    def _load_loop(self):
+        while True:
+            self.wakeup.wait()
+            self.wakeup.clear()
+            with self.lock:
+                device_ids = list(self.pending)
+            for device_id in device_ids:
+                try:
+                    self._load(device_id)
+                finally:
+                    with self.lock:
+                        self.pending.discard(device_id)
+
+    # ---------------------------------------------
+    # Storage
+    # ---------------------------------------------
+
+    def _shared_row(self, device_id):
+        if self.shared_factory is None:
+            return None
+        try:
+            return self.shared_factory().get(f"calibration:{device_id}", max_age=self.ttl)
+        except Exception as e:
+            logger.error(f"Shared calibration lookup for {device_id} failed: {e}")
+            return None
+
+    def _publish(self, calibration):
+        """Share a calibration with every worker, keeping the newer of it and the shared row"""
+        if self.shared_factory is None:
+            return calibration
+        row = calibration.to_row()
+        try:
+            shared = self.shared_factory().update(
+                f"calibration:{calibration.device_id}",
+                lambda current: current if current and current["version"] > row["version"] else row
+            )
+        except Exception as e:
+            logger.error(f"Publishing calibration for {calibration.device_id} failed: {e}")
+            return calibration
+        return calibration if shared is row else Calibration.from_row(shared)
+
+    def _fetch(self, device_id):
+        with SUPABASE_SECONDS.labels("device_calibrations", "select").time():
+            result = self.supabase_factory().table("device_calibrations")\
+                .select("*")\
+                .eq("device_id", device_id)\
+                .order("version", desc=True)\
+                .limit(1)\
+                .execute()
+        return Calibration.from_row(result.data[0]) if result.data else None
@@ -0,0 +1,72 @@
+# Device Clock Trust - Ignition Hackathon
+# The firmwares stamp every sample with "device_time_ms" (Unix ms) from their
+# own clock: GPS time on the chest unit, SNTP on both. Device clocks can still
+# be wrong (no fix and no NTP reply, drift, a reboot), so the server keeps a
+# per-device offset estimate. Every request gives one observation
+#
+#   server receive time - device send time = clock offset + uplink delay
+#
+# where device send time = device_time_ms + age_ms of the newest sample. The
+# delay is never negative and usually small, so the minimum over a sliding
+# window of observations tracks the offset (the same idea as NTP's clock
+# filter). A device whose estimate stays within CLOCK_TRUST_MS is trusted as
+# is; otherwise its samples are shifted by the estimate. Either way samples
+# keep their capture spacing, so leg/chest alignment and jerk survive network
+# jitter and batching. The observation windows live in the workers' shared
+# state, so every request from a device feeds one estimate.
+
+import os
+import time
+from datetime import datetime
+
+from metrics import CLOCK_OFFSET_SECONDS
+from shared import LocalState
+
+CLOCK_TRUST_MS = int(os.getenv("CLOCK_TRUST_MS", 1000))  # Estimates within this are uplink delay, not clock error
+CLOCK_WINDOW = 600.0  # Seconds of observations kept per device (covers drift)
+CLOCK_OBSERVATIONS = 32
+CLOCK_STEP_MS = 10000  # A jump this large means the device clock was reset; start over
+
+
+class ClockOffsets:
+    """Per-device clock offset estimates from min-filtered receive/send differences (thread-safe)"""
+
+    def __init__(self, store=None, trust_ms=CLOCK_TRUST_MS):
+        self.store = store if store is not None else LocalState()  # SharedState across workers
+        self.trust_ms = trust_ms
+
+    def observe(self, device_id, sent_ms, received_ms):
+        """Add one observation; returns the current offset estimate (ms)"""
+        observed = round(received_ms - sent_ms, 1)
+
+        def add(window):
+            # [[received_ms, observed offset ms], ...], oldest first
+            window = [o for o in window or () if o[0] >= received_ms - CLOCK_WINDOW * 1000]
+            if window and abs(observed - min(o for _, o in window)) > CLOCK_STEP_MS:
+                window = []
+            window.append([round(received_ms), observed])
+            return window[-CLOCK_OBSERVATIONS:]
+
+        window = self.store.update(f"clock:{device_id}", add)
+        return min(o for _, o in window)
+
+    def correct(self, samples, received=None):
+        """
+        Re-stamp the device-clock samples of one request (a parse_batch result,
+        oldest first) when their device's clock is off by more than trust_ms.
+        `received` is the request's arrival time (epoch seconds).
+        """
+        stamped = [sample for sample in samples if sample.device_time_ms is not None]
+        if not stamped:
+            return samples
+        received_ms = (time.time() if received is None else received) * 1000
+        newest = stamped[-1]
+        offset = self.observe(newest.device_id, newest.device_time_ms + (newest.age_ms or 0), received_ms)
+        CLOCK_OFFSET_SECONDS.observe(abs(offset) / 1000)
+        if abs(offset) <= self.trust_ms:
+            return samples
+
+        for sample in stamped:
+            captured = datetime.fromtimestamp((sample.device_time_ms + offset) / 1000)
+            sample.timestamp, sample.epoch = captured.isoformat(), captured.timestamp()
+        return samples
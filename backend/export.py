@@ -0,0 +1,237 @@
+# Columnar Telemetry Export - Ignition Hackathon
+# Streams leg/chest/event rows for a time range into Parquet or Arrow IPC,
+# one page at a time, so memory stays bounded by EXPORT_PAGE_SIZE rows.
+#
+# CLI:
+#   python export.py chest --start 2025-11-01T00:00:00Z --end 2025-11-08T00:00:00Z \
+#       --format arrow --out chest-week.arrow
+#
+# Arrow files written by the CLI use the IPC *file* format, so analysis code can
+# memory-map them instead of re-parsing JSON:
+#   import pyarrow as pa
+#   table = pa.ipc.open_file(pa.memory_map('chest-week.arrow')).read_all()
+
+import argparse
+import os
+from datetime import datetime
+
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", 5000))
+EXPORT_COMPRESSION = os.getenv("EXPORT_COMPRESSION", "zstd")
+
+# Column types per exported table (mirrors supabase/setup.sql)
+_TIMESTAMP = "timestamp"
+_FLOAT = "float64"
+_INT = "int64"
+_SMALLINT = "int32"
+_TEXT = "string"
+_BOOL = "bool"
+
+_IMU_COLUMNS = [
+    ("accel_x", _FLOAT), ("accel_y", _FLOAT), ("accel_z", _FLOAT),
+    ("gyro_x", _FLOAT), ("gyro_y", _FLOAT), ("gyro_z", _FLOAT),
+    ("temperature", _FLOAT),
+]
+
+EXPORT_TABLES = {
+    "leg": ("esp32_leg_data", [
+        ("id", _INT), ("timestamp", _TIMESTAMP),
+        *_IMU_COLUMNS,
+        ("device_id", _TEXT), ("created_at", _TIMESTAMP),
+    ]),
+    "chest": ("esp32_chest_data", [
+        ("id", _INT), ("timestamp", _TIMESTAMP),
+        ("latitude", _FLOAT), ("longitude", _FLOAT), ("altitude", _FLOAT),
+        ("speed", _FLOAT), ("heading", _FLOAT), ("accuracy", _FLOAT),
+        ("satellites", _SMALLINT),
+        *_IMU_COLUMNS,
+        ("device_id", _TEXT), ("created_at", _TIMESTAMP),
+    ]),
+    "events": ("events", [
+        ("id", _INT), ("timestamp", _TIMESTAMP),
+        ("event_type", _TEXT), ("severity", _TEXT),
+        ("latitude", _FLOAT), ("longitude", _FLOAT), ("speed", _FLOAT),
+        ("leg_accel_x", _FLOAT), ("leg_accel_y", _FLOAT), ("leg_accel_z", _FLOAT),
+        ("chest_accel_x", _FLOAT), ("chest_accel_y", _FLOAT), ("chest_accel_z", _FLOAT),
+        ("telegram_notified", _BOOL), ("telegram_sent_at", _TIMESTAMP),
+        ("description", _TEXT), ("created_at", _TIMESTAMP),
+    ]),
+}
+
+EXPORT_FORMATS = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def _arrow_schema(columns):
+    """Build the pyarrow schema for a column list (pyarrow imported lazily)"""
+    import pyarrow as pa
+
+    types = {
+        _TIMESTAMP: pa.timestamp("us", tz="UTC"),
+        _FLOAT: pa.float64(),
+        _INT: pa.int64(),
+        _SMALLINT: pa.int32(),
+        _TEXT: pa.string(),
+        _BOOL: pa.bool_(),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in columns])
+
+
+def _parse_timestamp(value):
+    """Supabase ISO string -> aware datetime"""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def iter_pages(supabase, table_key, start, end, page_size=EXPORT_PAGE_SIZE):
+    """
+    Yield pages of rows for [start, end) using keyset pagination on id,
+    so each page is an indexed range scan rather than an OFFSET.
+    """
+    table, columns = EXPORT_TABLES[table_key]
+    select = ",".join(name for name, _ in columns)
+    last_id = 0
+
+    while True:
+        result = supabase.table(table)\
+            .select(select)\
+            .gte("timestamp", start)\
+            .lt("timestamp", end)\
+            .gt("id", last_id)\
+            .order("id")\
+            .limit(page_size)\
+            .execute()
+
+        rows = result.data or []
+        if not rows:
+            return
+
+        yield rows
+        last_id = rows[-1]["id"]
+
+        if len(rows) < page_size:
+            return
+
+
+def _to_record_batch(rows, columns, schema):
+    """Convert one page of JSON rows to an Arrow RecordBatch, column by column"""
+    import pyarrow as pa
+
+    arrays = []
+    for name, kind in columns:
+        values = [row.get(name) for row in rows]
+        if kind == _TIMESTAMP:
+            values = [_parse_timestamp(v) for v in values]
+        arrays.append(pa.array(values, type=schema.field(name).type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to a generator"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _open_writer(sink, schema, fmt, seekable_file=False):
+    """Parquet writer, or Arrow IPC writer (file format if writing to disk)"""
+    import pyarrow as pa
+
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(sink, schema, compression=EXPORT_COMPRESSION)
+
+    options = pa.ipc.IpcWriteOptions(compression=EXPORT_COMPRESSION)
+    if seekable_file:
+        return pa.ipc.new_file(sink, schema, options=options)
+    return pa.ipc.new_stream(sink, schema, options=options)
+
+
+def stream_export(supabase, table_key, start, end, fmt="arrow"):
+    """
+    Generator of encoded bytes for an HTTP response. Memory use is one page
+    of rows plus one encoded chunk, regardless of the time range.
+    """
+    import pyarrow as pa
+
+    _, columns = EXPORT_TABLES[table_key]
+    schema = _arrow_schema(columns)
+    sink = _ChunkSink()
+    writer = _open_writer(pa.PythonFile(sink, mode="w"), schema, fmt)
+
+    for rows in iter_pages(supabase, table_key, start, end):
+        writer.write_batch(_to_record_batch(rows, columns, schema))
+        chunk = sink.drain()
+        if chunk:
+            yield chunk
+
+    writer.close()
+    chunk = sink.drain()
+    if chunk:
+        yield chunk
+
+
+def export_to_file(supabase, table_key, start, end, path, fmt="arrow"):
+    """Write an export to disk; returns the number of rows written"""
+    import pyarrow as pa
+
+    _, columns = EXPORT_TABLES[table_key]
+    schema = _arrow_schema(columns)
+    total = 0
+
+    with pa.OSFile(path, "wb") as sink:
+        writer = _open_writer(sink, schema, fmt, seekable_file=True)
+        for rows in iter_pages(supabase, table_key, start, end):
+            writer.write_batch(_to_record_batch(rows, columns, schema))
+            total += len(rows)
+        writer.close()
+
+    return total
+
+
+def main():
+    """CLI entry point"""
+    from dotenv import load_dotenv
+    from supabase import create_client
+
+    parser = argparse.ArgumentParser(description="Export telemetry as Parquet or Arrow IPC")
+    parser.add_argument("table", choices=sorted(EXPORT_TABLES))
+    parser.add_argument("--start", required=True, help="ISO timestamp (inclusive)")
+    parser.add_argument("--end", required=True, help="ISO timestamp (exclusive)")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="arrow")
+    parser.add_argument("--out", required=True, help="Output file path")
+    args = parser.parse_args()
+
+    load_dotenv()
+    supabase = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_ROLE_KEY"))
+
+    total = export_to_file(supabase, args.table, args.start, args.end, args.out, args.format)
+    print(f"Exported {total} {args.table} rows to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# Geohash Helpers - Ignition Hackathon
+# Events and GPS points carry a geohash so spatial lookups become indexed
+# prefix scans (see section 13 of supabase/setup.sql). Also the small
+# vector helpers the per-sample detectors need, kept free of NumPy so
+# importing them stays cheap (orientation.py does the filtering).
+
+import math
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+EARTH_RADIUS_M = 6371000.0
+
+# Stored geohash length (~4.8 m x 4.8 m cells)
+GEOHASH_PRECISION = 9
+
+# Precisions aggregated into event_hotspots (~4.9 km, ~1.2 km, ~153 m cells)
+HOTSPOT_PRECISIONS = (5, 6, 7)
+
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Geohash for a point"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True  # Longitude bits first
+
+    while len(chars) < precision:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if longitude >= mid:
+                value = (value << 1) | 1
+                lon_range[0] = mid
+            else:
+                value <<= 1
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                value = (value << 1) | 1
+                lat_range[0] = mid
+            else:
+                value <<= 1
+                lat_range[1] = mid
+        even = not even
+        bits += 1
+
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+
+    return "".join(chars)
+
+
+def cell_size(precision):
+    """(lat_degrees, lon_degrees) covered by one cell at this precision"""
+    total_bits = precision * 5
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lon_bits)
+
+
+def cells_covering(min_lat, min_lon, max_lat, max_lon, precision):
+    """Geohash cells at `precision` that together cover the bounding box"""
+    lat_step, lon_step = cell_size(precision)
+    cells = set()
+
+    lat = min_lat
+    while True:
+        lon = min_lon
+        while True:
+            cells.add(encode(min(lat, max_lat), min(lon, max_lon), precision))
+            if lon >= max_lon:
+                break
+            lon += lon_step
+        if lat >= max_lat:
+            break
+        lat += lat_step
+
+    return cells
+
+
+def covering_prefixes(min_lat, min_lon, max_lat, max_lon, max_cells=16):
+    """Finest set of at most `max_cells` geohash prefixes covering the box"""
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_step, lon_step = cell_size(precision)
+        estimate = (math.ceil((max_lat - min_lat) / lat_step) + 1) * \
+                   (math.ceil((max_lon - min_lon) / lon_step) + 1)
+        if estimate <= max_cells:
+            return cells_covering(min_lat, min_lon, max_lat, max_lon, precision)
+    return {""}
+
+
+def bounding_box(latitude, longitude, radius_m):
+    """(min_lat, min_lon, max_lat, max_lon) around a point"""
+    lat_delta = math.degrees(radius_m / EARTH_RADIUS_M)
+    cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+    lon_delta = min(math.degrees(radius_m / (EARTH_RADIUS_M * cos_lat)), 180.0)
+    return (
+        max(latitude - lat_delta, -90.0),
+        max(longitude - lon_delta, -180.0),
+        min(latitude + lat_delta, 90.0),
+        min(longitude + lon_delta, 180.0),
+    )
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in metres"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = math.radians(lat2 - lat1)
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def hotspot_precision(min_lat, min_lon, max_lat, max_lon):
+    """Pick the hotspot grid that gives a useful number of clusters for the box"""
+    span = max(max_lat - min_lat, max_lon - min_lon)
+    if span > 0.5:
+        return HOTSPOT_PRECISIONS[0]
+    if span > 0.05:
+        return HOTSPOT_PRECISIONS[1]
+    return HOTSPOT_PRECISIONS[2]
+
+
+def gravity_direction(roll, pitch):
+    """Unit gravity vector in the sensor frame for a roll/pitch (degrees)"""
+    r = math.radians(roll)
+    p = math.radians(pitch)
+    return (-math.sin(p), math.sin(r) * math.cos(p), math.cos(r) * math.cos(p))
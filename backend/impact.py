@@ -0,0 +1,353 @@
+# Crash / Fall Impact Detection - Ignition Hackathon
+# The firmwares sample the MPU6050 at IMU_RATE_HZ and upload the buffered
+# readings with each payload ("imu_burst"). Each device keeps a few
+# seconds of that stream; every acceleration peak above IMPACT_THRESHOLD is
+# scored once its post-impact window has arrived:
+#
+#   peak      |a| at the impact (g)
+#   jerk      fastest change of |a| around the peak (g/s)
+#   free fall |a| near 0 g just before the impact (falling body / bike)
+#   stillness rider not moving after the impact (lying on the ground)
+#   speed     chest GPS speed drop across the impact
+#
+# Cues are combined into a severity score in [0, 1] and a confidence that
+# reflects how much of the evidence was actually observed.
+#
+# The buffers, speed history and last event per rider live in a state store
+# (the workers' shared detector state in server.py), so a crash whose bursts
+# reach different workers is still scored on the whole stream. A buffer keeps
+# only the samples a later peak can still need: the pre-impact window before
+# the point already scanned, and everything after it.
+#
+# CLI:
+#   python impact.py bench       # detection rate, false alarms, impact -> event latency
+
+import argparse
+import base64
+import math
+import random
+import time
+
+import numpy as np
+
+from shared import LocalState
+
+GRAVITY = 9.81
+
+IMPACT_THRESHOLD = 3.0 * GRAVITY  # Peak |a| that makes a candidate
+FREE_FALL_THRESHOLD = 0.4 * GRAVITY
+FREE_FALL_FULL_SECONDS = 0.25  # Free-fall cue saturates at this duration
+PRE_IMPACT_SECONDS = 1.0
+SETTLE_SECONDS = 0.5  # Bounce / slide right after the impact, not scored
+STILL_SECONDS = 1.5  # Stillness window after settling (firmware IMPACT_POST must exceed SETTLE + STILL)
+STILL_ACCEL_STD = 0.6  # m/s²
+STILL_GYRO = 0.3  # rad/s
+SPEED_WINDOW_SECONDS = 4.0
+MIN_MOVING_SPEED = 10.0  # km/h; below this a speed drop says nothing
+BUFFER_SECONDS = 10.0  # A device that sent a burst this recently has a live stream
+MAX_BUFFER_SAMPLES = 320  # Per device (~6.4 s at 50 Hz); keeps a packed buffer within one shared slot
+SPEED_HISTORY = 32  # Chest speed readings kept per rider
+REFRACTORY_SECONDS = 10.0  # One event per rider per crash
+
+# Cue weights for the severity score (sum to 1)
+WEIGHTS = {"peak": 0.25, "jerk": 0.10, "free_fall": 0.20, "stillness": 0.30, "speed_drop": 0.15}
+SEVERITY_LEVELS = ((0.75, 'CRITICAL'), (0.5, 'HIGH'), (0.3, 'MEDIUM'))
+
+
+class _DeviceStream:
+    """Recent IMU samples of one device: times (n,), readings (n, 6) accel + gyro"""
+
+    __slots__ = ("t", "x", "mag", "rate", "scanned_until")
+
+    def __init__(self, rate, state=None):
+        self.rate = rate
+        self.scanned_until = -math.inf
+        self.t = np.empty(0)
+        self.x = np.empty((0, 6))
+        if state and state["rate"] == rate:
+            # Times as float64, readings as float32 (plenty for m/s² and rad/s)
+            self.t = np.frombuffer(base64.b64decode(state["t"]), dtype=np.float64)
+            self.x = np.frombuffer(base64.b64decode(state["x"]), dtype=np.float32).reshape(-1, 6).astype(float)
+            if state["scanned"] is not None:
+                self.scanned_until = state["scanned"]
+        self.mag = np.linalg.norm(self.x[:, :3], axis=1)
+
+    def state(self):
+        """Packed, trimmed to what a later peak can still need"""
+        keep = self.t >= self.scanned_until - PRE_IMPACT_SECONDS - 0.1  # Pre-impact window and jerk span
+        keep[:-MAX_BUFFER_SAMPLES] = False
+        return {
+            "rate": self.rate,
+            "scanned": None if self.scanned_until == -math.inf else float(self.scanned_until),
+            "t": base64.b64encode(self.t[keep].tobytes()).decode(),
+            "x": base64.b64encode(self.x[keep].astype(np.float32).tobytes()).decode(),
+        }
+
+    def extend(self, t, x):
+        keep = self.t > t[-1] - BUFFER_SECONDS
+        self.t = np.concatenate([self.t[keep], t])
+        self.x = np.concatenate([self.x[keep], x])
+        self.mag = np.concatenate([self.mag[keep], np.linalg.norm(x[:, :3], axis=1)])
+
+
+def _new_rider():
+    return {"speeds": [], "last_event": None, "streams": {}}  # streams: device_id -> newest burst time
+
+
+class ImpactDetector:
+    """Per-device IMU buffers and per-rider speed history, kept in a state store (thread-safe)"""
+
+    def __init__(self, store=None):
+        self.store = store if store is not None else LocalState()  # SharedState across workers
+
+    def add_speed(self, rider_id, t, speed):
+        """Record a chest speed (km/h) for the speed-drop cue"""
+        if speed is None:
+            return
+
+        def add(rider):
+            rider = rider or _new_rider()
+            rider["speeds"] = (rider["speeds"] + [[t, float(speed)]])[-SPEED_HISTORY:]
+            return rider
+
+        self.store.update(f"impact:{rider_id}", add)
+
+    def has_stream(self, rider_id, now=None):
+        """True if any device of this rider uploaded IMU bursts recently"""
+        now = time.time() if now is None else now
+        rider = self.store.get(f"impact:{rider_id}")
+        return bool(rider) and any(t > now - BUFFER_SECONDS for t in rider["streams"].values())
+
+    def add_burst(self, rider_id, device_id, t_end, burst):
+        """
+        Append one uploaded burst ({"rate_hz": r, "samples": [[ax, ay, az, gx, gy, gz], ...]},
+        last sample taken at t_end) and score every impact whose post-impact window
+        is now complete. Returns a list of impact dicts (usually empty).
+        """
+        rate = float(burst.get("rate_hz") or 50)
+        samples = burst.get("samples")
+        samples = np.asarray(samples if samples is not None else [], dtype=float).reshape(-1, 6)
+        if not len(samples):
+            return []
+        t = t_end - np.arange(len(samples) - 1, -1, -1) / rate
+
+        streams = []
+
+        def extend(state):
+            stream = _DeviceStream(rate, state)
+            stream.extend(t, samples)
+
+            # Peaks whose stillness window is complete and that were not scored yet
+            ready_until = stream.t[-1] - SETTLE_SECONDS - STILL_SECONDS
+            candidates = np.flatnonzero(
+                (stream.mag > IMPACT_THRESHOLD) & (stream.t > stream.scanned_until) & (stream.t <= ready_until)
+            )
+            stream.scanned_until = max(stream.scanned_until, ready_until)
+            streams.append((stream, _strongest_per_cluster(candidates, stream.mag, int(rate * SETTLE_SECONDS))))
+            return stream.state()
+
+        self.store.update(f"impact-stream:{rider_id}:{device_id}", extend)
+        stream, peaks = streams[0]
+
+        impacts = []
+
+        def score(rider):
+            # Refractory and speed history are per rider, across both of its devices
+            rider = rider or _new_rider()
+            rider["streams"][device_id] = float(t[-1])
+            for i in peaks:
+                impact_t = float(stream.t[i])
+                if impact_t - (rider["last_event"] or -math.inf) < REFRACTORY_SECONDS:
+                    continue
+                result = score_impact(stream.t, stream.x, stream.mag, i, rate, rider["speeds"])
+                if result["severity"]:
+                    rider["last_event"] = impact_t
+                    result["device_id"] = device_id
+                    impacts.append(result)
+            return rider
+
+        self.store.update(f"impact:{rider_id}", score)
+        return impacts
+
+
+def _strongest_per_cluster(indices, mag, gap):
+    """Highest-|a| index of each run of candidate indices (runs split by > gap samples)"""
+    if not len(indices):
+        return []
+    splits = np.flatnonzero(np.diff(indices) > gap) + 1
+    return [int(cluster[mag[cluster].argmax()]) for cluster in np.split(indices, splits)]
+
+
+def _longest_run(mask):
+    """Length of the longest run of True values"""
+    if not mask.any():
+        return 0
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+    return int((edges[1::2] - edges[::2]).max())
+
+
+def score_impact(t, x, mag, i, rate, speed_history):
+    """Severity score, confidence and the individual cues for the peak at index i"""
+    impact_t = t[i]
+    dt = 1.0 / rate
+
+    # Peak and jerk (±0.1 s around the peak)
+    peak_g = mag[i] / GRAVITY
+    around = slice(max(i - int(0.1 * rate), 0), i + int(0.1 * rate) + 1)
+    jerk = np.abs(np.diff(mag[around])).max(initial=0.0) * rate / GRAVITY
+
+    # Free fall right before the impact
+    pre = (t >= impact_t - PRE_IMPACT_SECONDS) & (t < impact_t)
+    free_fall_s = _longest_run(mag[pre] < FREE_FALL_THRESHOLD) * dt
+
+    # Stillness after the bounce / slide
+    post = (t >= impact_t + SETTLE_SECONDS) & (t <= impact_t + SETTLE_SECONDS + STILL_SECONDS)
+    post_coverage = min(post.sum() / (STILL_SECONDS * rate), 1.0)
+    if post.any():
+        accel_std = mag[post].std()
+        gyro = np.linalg.norm(x[post, 3:6], axis=1).mean()
+        stillness = (np.clip(1 - accel_std / (2 * STILL_ACCEL_STD), 0, 1) *
+                     np.clip(1 - gyro / (2 * STILL_GYRO), 0, 1))
+    else:
+        stillness = 0.0
+
+    # Speed drop across the impact (chest GPS, one reading per upload)
+    before = [s for ts, s in speed_history if impact_t - SPEED_WINDOW_SECONDS <= ts <= impact_t]
+    after = [s for ts, s in speed_history if impact_t < ts <= impact_t + SPEED_WINDOW_SECONDS]
+    speed_drop = None
+    if before and after and max(before) >= MIN_MOVING_SPEED:
+        speed_drop = float(np.clip((max(before) - min(after)) / max(before), 0, 1))
+
+    cues = {
+        "peak": float(np.clip((peak_g - 3) / 5, 0, 1)),  # 3 g -> 0, 8 g -> 1
+        "jerk": float(np.clip(jerk / 200, 0, 1)),
+        "free_fall": float(np.clip(free_fall_s / FREE_FALL_FULL_SECONDS, 0, 1)),
+        "stillness": float(stillness),
+        "speed_drop": speed_drop,
+    }
+    score = sum(WEIGHTS[name] * (value or 0.0) for name, value in cues.items())
+
+    # Confidence: observed evidence (coverage) x how decisive the observed cues are
+    observed = [value for value in cues.values() if value is not None]
+    coverage = (1 - WEIGHTS["stillness"] * (1 - post_coverage) -
+                (WEIGHTS["speed_drop"] if speed_drop is None else 0.0))
+    decisiveness = float(np.mean([abs(value - 0.5) * 2 for value in observed]))
+    confidence = coverage * (0.5 + 0.5 * decisiveness)
+
+    severity = next((level for threshold, level in SEVERITY_LEVELS if score >= threshold), None)
+    return {
+        "impact_time": float(impact_t),
+        "severity": severity,
+        "severity_score": round(score, 3),
+        "confidence": round(confidence, 3),
+        "peak_g": round(float(peak_g), 2),
+        "free_fall_seconds": round(free_fall_s, 2),
+        "cues": cues,
+    }
+
+
+def describe(impact):
+    """Human-readable event description"""
+    cues = impact["cues"]
+    parts = [f"Impact {impact['peak_g']:.1f} g"]
+    if impact["free_fall_seconds"] > 0:
+        parts.append(f"free fall {impact['free_fall_seconds']:.2f} s")
+    if cues["stillness"] >= 0.5:
+        parts.append("no movement after impact")
+    if cues["speed_drop"] is not None and cues["speed_drop"] >= 0.5:
+        parts.append("sudden stop")
+    return (f"Potential fall or accident detected! {', '.join(parts)} "
+            f"(severity score {impact['severity_score']:.2f}, confidence {impact['confidence']:.2f})")
+
+
+# =============================================
+# Benchmark (synthetic high-rate streams)
+# =============================================
+
+def _synthetic_stream(rng, seconds, rate, scenario, impact_at):
+    """(n, 6) IMU readings and a speed track for one scenario"""
+    n = int(seconds * rate)
+    t = np.arange(n) / rate
+    x = np.zeros((n, 6))
+    x[:, 2] = GRAVITY
+    x[:, :3] += np.array([rng.gauss(0, 1) for _ in range(3 * n)]).reshape(n, 3) * 0.8  # Road vibration
+    x[:, 3:] += np.array([rng.gauss(0, 1) for _ in range(3 * n)]).reshape(n, 3) * 0.2
+    speed = np.full(n, 40.0)
+
+    k = int(impact_at * rate)
+    if scenario == 'pothole':
+        x[k:k + 3, 2] += rng.uniform(20, 40)
+    elif scenario == 'hard_brake':
+        x[k:k + int(1.5 * rate), 0] -= 9.0
+        speed[k:] = np.maximum(40 - 25 * (t[k:] - impact_at), 0)
+        x[k + int(1.5 * rate):, :] = [0, 0, GRAVITY, 0, 0, 0]
+    elif scenario in ('fall', 'crash'):
+        if scenario == 'fall':
+            x[k - int(0.3 * rate):k, :3] = 0.1 * GRAVITY  # Free fall
+            speed[:] = 4.0
+        x[k:k + 3, :3] += np.array([rng.uniform(-30, 30), rng.uniform(-30, 30), rng.uniform(35, 60)])
+        x[k + 3:k + int(SETTLE_SECONDS * rate), :3] += rng.uniform(5, 15)  # Slide / tumble
+        still = k + int(SETTLE_SECONDS * rate)
+        x[still:, :3] = [GRAVITY, 0, 0]  # Lying on the side
+        x[still:, :3] += np.array([rng.gauss(0, 1) for _ in range(3 * (n - still))]).reshape(-1, 3) * 0.05
+        x[still:, 3:] = 0.02
+        if scenario == 'crash':
+            speed[k:] = 0.0
+        else:
+            speed[:] = 0.0
+    return x, speed
+
+
+def main():
+    """CLI entry point"""
+    parser = argparse.ArgumentParser(description="Impact detector tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    bench = sub.add_parser("bench", help="Detection rate, false alarms and impact -> event latency")
+    bench.add_argument("--trials", type=int, default=200)
+    bench.add_argument("--rate", type=float, default=50.0, help="IMU sample rate (Hz)")
+    bench.add_argument("--upload-interval", type=float, default=2.0, help="Seconds between bursts")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    rate = args.rate
+    per_burst = int(args.upload_interval * rate)
+    scenarios = ('crash', 'fall', 'pothole', 'hard_brake')
+    stats = {s: {"detected": 0, "latency": [], "severity": {}} for s in scenarios}
+    cpu = []
+
+    for trial in range(args.trials):
+        scenario = scenarios[trial % len(scenarios)]
+        impact_at = rng.uniform(6, 8)
+        x, speed = _synthetic_stream(rng, 16, rate, scenario, impact_at)
+        detector = ImpactDetector()
+
+        for end in range(per_burst, len(x) + 1, per_burst):
+            t_end = (end - 1) / rate
+            if end % int(rate * 2) == 0:
+                detector.add_speed("rider", t_end, speed[end - 1])
+            started = time.perf_counter()
+            impacts = detector.add_burst("rider", "chest", t_end, {"rate_hz": rate, "samples": x[end - per_burst:end]})
+            cpu.append(time.perf_counter() - started)
+            if impacts:
+                # Event goes out when the burst carrying the post-impact window arrives
+                stats[scenario]["detected"] += 1
+                stats[scenario]["latency"].append(t_end - impact_at)
+                level = impacts[0]["severity"]
+                stats[scenario]["severity"][level] = stats[scenario]["severity"].get(level, 0) + 1
+                break
+
+    runs = args.trials // len(scenarios)
+    for scenario in scenarios:
+        s = stats[scenario]
+        line = f"{scenario:>10}: {s['detected']}/{runs} flagged"
+        if s["latency"]:
+            latency = np.array(s["latency"])
+            line += f", impact -> event p50 {np.percentile(latency, 50):.2f} s, p95 {np.percentile(latency, 95):.2f} s"
+            line += f", severity {s['severity']}"
+        print(line)
+    cpu = np.array(cpu) * 1e6
+    print(f"add_burst ({per_burst} samples): p50 {np.percentile(cpu, 50):.0f} µs, p99 {np.percentile(cpu, 99):.0f} µs")
+
+
+if __name__ == "__main__":
+    main()
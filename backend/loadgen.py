@@ -0,0 +1,603 @@
+# Fleet Load Generator - Ignition Hackathon
+# Simulates a fleet of riders, each wearing an ESP32 leg/chest pair, against
+# the backend, fully offline:
+#
+#   stubs     Supabase (PostgREST) and the Telegram Bot API are served by
+#             in-process stubs that record every inserted row and message
+#   backend   server.py is started in a subprocess pointed at the stubs
+#             (or pass --target to drive a backend you started yourself with
+#             SUPABASE_URL / TELEGRAM_API_URL set to the stub port)
+#   riders    synthetic rides (walking, scooter, motorcycle) with a GPS track
+#             and an IMU model; --crash-rate of them crash mid-ride
+#   devices   asyncio tasks that behave like the firmwares: same payloads,
+#             motion-dependent upload interval, 50 Hz IMU bursts, batching and
+#             Retry-After backoff on 429/503, immediate send after an impact
+#
+# Reported: request latency and shed rate per sensor, rows that reached
+# Supabase, events by type, crash detection rate, and the end-to-end
+# latencies sample -> event stored, sample -> Telegram notification and
+# crash -> notification.
+#
+# CLI:
+#   python loadgen.py --riders 1000 --duration 120 --processes 4
+#   python loadgen.py --riders 5000 --duration 300 --ramp 60 --crash-rate 0.02 \
+#       --target http://localhost:7777 --stub-port 54321
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+import geo
+
+GRAVITY = 9.81
+
+# Firmware behaviour (esp32-code/micropython_*_sensor.py)
+IDLE_INTERVAL = 30.0  # Seconds between samples while still (until the backend pushes a policy)
+MOVING_INTERVAL = 1.0
+MOTION_WINDOW = 1.0  # Seconds between motion checks
+STILL_SPEED = 1.0  # km/h
+STILL_HOLD = 10.0  # Seconds still before dropping to the idle interval
+IMU_RATE_HZ = 50
+IMU_BURST_MAX = 180
+IMPACT_POST = 2.5  # Seconds of aftermath in the burst sent after an impact
+MAX_PENDING = 20
+MAX_BATCH_EVERY = 8
+MAX_BACKOFF = 60.0
+
+# Ride models: cruise speed (km/h), max acceleration (m/s²), stop probability
+# per segment, chest lean (deg), vibration (m/s² std while moving)
+MODES = {
+    'walk': {"cruise": 5.0, "accel": 1.0, "stops": 0.1, "lean": 0.0, "vibration": 0.6, "step_hz": 1.8},
+    'scooter': {"cruise": 20.0, "accel": 1.5, "stops": 0.3, "lean": 5.0, "vibration": 0.8, "step_hz": 0.0},
+    'motorcycle': {"cruise": 45.0, "accel": 2.5, "stops": 0.3, "lean": 30.0, "vibration": 1.2, "step_hz": 0.0},
+}
+MODE_MIX = (('walk', 0.2), ('scooter', 0.3), ('motorcycle', 0.5))
+ORIGIN = (12.9716, 77.5946)  # Riders start on a grid around here
+GRID_SPACING = 0.02  # Degrees between riders' start points (~2 km)
+CRASH_MATCH_RADIUS_M = 200  # A FALL_DETECTED event this close to a crash belongs to it
+
+
+# =============================================
+# Stub Supabase + Telegram
+# =============================================
+
+class StubStats:
+    """Everything the stubs received (thread-safe)"""
+
+    def __init__(self):
+        self.rows = Counter()
+        self.events = []  # (received epoch, event row)
+        self.messages = []  # (received epoch, chat_id)
+        self.lock = threading.Lock()
+
+
+def _epoch(value):
+    """Backend ISO timestamp (local time, or with an offset) -> epoch seconds"""
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp() if value else None
+
+
+def stub_handler(stats, subscribers, supabase_delay, telegram_delay):
+    """Request handler class answering the PostgREST and Bot API calls the backend makes"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive, like the real services
+        disable_nagle_algorithm = True  # Headers and body go out as separate writes
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _body(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"null")
+
+        def do_GET(self):
+            time.sleep(supabase_delay)
+            table = self.path.split("?")[0].rsplit("/", 1)[-1]
+            if table == "telegram_users":
+                self._reply(200, [{"telegram_chat_id": 1000 + i} for i in range(subscribers)])
+            else:
+                self._reply(200, [])  # No calibrations or history: every rider starts fresh
+
+        def do_POST(self):
+            body = self._body()
+            received = time.time()
+            if "/sendMessage" in self.path:
+                time.sleep(telegram_delay)
+                with stats.lock:
+                    stats.messages.append((received, body.get("chat_id")))
+                self._reply(200, {"ok": True, "result": {"message_id": len(stats.messages)}})
+                return
+
+            time.sleep(supabase_delay)
+            path = self.path.split("?")[0]
+            if "/rpc/" in path:
+                self._reply(200, None)
+                return
+            table = path.rsplit("/", 1)[-1]
+            rows = body if isinstance(body, list) else [body]
+            with stats.lock:
+                stats.rows[table] += len(rows)
+                if table == "events":
+                    stats.events.extend((received, row) for row in rows)
+            self._reply(201, [])
+
+        def do_PATCH(self):
+            time.sleep(supabase_delay)
+            self._body()
+            self._reply(200, [])
+
+    return Handler
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # Clients dropping keep-alive connections at shutdown
+
+
+def start_stubs(port, subscribers=1, supabase_delay=0.0, telegram_delay=0.0):
+    """Serve both stubs on one port in a background thread; returns (server, stats)"""
+    stats = StubStats()
+    server = _StubServer(("127.0.0.1", port), stub_handler(stats, subscribers, supabase_delay, telegram_delay))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+def start_backend(port, stub_url, workdir):
+    """Run server.py's app in a subprocess pointed at the stubs; returns the Popen"""
+    env = dict(
+        os.environ,
+        SUPABASE_URL=stub_url,
+        SUPABASE_SERVICE_ROLE_KEY="stub",
+        TELEGRAM_API_URL=stub_url,
+        TELEGRAM_BOT_TOKEN="stub",
+        WAL_DIR=os.path.join(workdir, "wal"),
+        SHARED_STATE_PATH=os.path.join(workdir, "shared-state"),
+    )
+    with open(os.path.join(workdir, "backend.log"), "w") as log:
+        return subprocess.Popen(
+            [sys.executable, "-c", f"import server; server.app.run(host='127.0.0.1', port={port}, threaded=True)"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), env=env, stdout=log, stderr=subprocess.STDOUT
+        )
+
+
+def wait_healthy(target, timeout=30.0):
+    import httpx
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{target}/health", timeout=2.0).status_code == 200:
+                return True
+        except Exception:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+# =============================================
+# Synthetic rides
+# =============================================
+
+class Ride:
+    """
+    One rider's trip, precomputed at 1 Hz: speed (km/h), heading, position and
+    longitudinal acceleration; IMU readings are generated on demand for any
+    instant (seconds since the ride started).
+    """
+
+    def __init__(self, seed, mode, origin, duration, crash=False):
+        self.rng = np.random.default_rng(seed)
+        self.mode = mode
+        self.started = None  # Epoch the rider switched on (set by the driver)
+        self.params = params = MODES[mode]
+        rng = self.rng
+
+        n = int(duration) + 2
+        speed = np.zeros(n)
+        v, target, hold = 0.0, 0.0, 0.0
+        step = params["accel"] * 3.6  # km/h per second
+        for k in range(n):
+            if hold <= 0:
+                stopping = target > 0 and rng.random() < params["stops"]
+                target = 0.0 if stopping else params["cruise"] * rng.uniform(0.7, 1.2)
+                hold = rng.uniform(5, 20) if stopping else rng.uniform(20, 60)
+            hold -= 1
+            v += max(-step, min(step, target - v))
+            speed[k] = v
+
+        # Crash while moving with time left to send the aftermath; the rider stays down
+        self.crash_at = None
+        if crash:
+            candidates = np.flatnonzero(speed[10:n - 15] > min(15.0, params["cruise"] * 0.6)) + 10
+            if len(candidates):
+                k = int(rng.choice(candidates))
+                self.crash_at = k + rng.random()
+                speed[k + 1:] = 0.0
+                self.impact = np.array([rng.uniform(-30, 30), rng.uniform(-30, 30), rng.uniform(35, 60)])
+                self.tumble = rng.uniform(5, 15)
+
+        heading = (rng.uniform(0, 360) + np.cumsum(rng.normal(0, 4, n))) % 360
+        metres = speed / 3.6
+        self.speed = speed
+        self.heading = heading
+        self.accel = np.diff(speed, append=speed[-1]) / 3.6
+        self.lat = origin[0] + np.cumsum(metres * np.cos(np.radians(heading))) / 111320
+        self.lon = origin[1] + np.cumsum(metres * np.sin(np.radians(heading))) / (111320 * math.cos(math.radians(origin[0])))
+
+    def _index(self, t):
+        return min(max(int(t), 0), len(self.speed) - 2)
+
+    def speed_at(self, t):
+        k = self._index(t)
+        return float(self.speed[k] + (self.speed[k + 1] - self.speed[k]) * min(max(t - k, 0.0), 1.0))
+
+    def position_at(self, t):
+        k = self._index(t)
+        f = min(max(t - k, 0.0), 1.0)
+        return (float(self.lat[k] + (self.lat[k + 1] - self.lat[k]) * f),
+                float(self.lon[k] + (self.lon[k + 1] - self.lon[k]) * f))
+
+    def imu(self, kind, ts):
+        """(len(ts), 6) accel (m/s²) + gyro (rad/s) for the leg or chest unit"""
+        params, rng = self.params, self.rng
+        ts = np.asarray(ts, dtype=float)
+        k = np.clip(ts.astype(int), 0, len(self.speed) - 2)
+        moving = (self.speed[k] > 0.5).astype(float)
+        x = np.zeros((len(ts), 6))
+
+        # Gravity, tilted by the rider's forward lean (chest) + braking/accelerating
+        lean = math.radians(params["lean"]) if kind == 'chest' else 0.0
+        x[:, 0] = GRAVITY * math.sin(lean) + self.accel[k]
+        x[:, 2] = GRAVITY * math.cos(lean)
+        x[:, :3] += rng.normal(size=(len(ts), 3)) * (0.05 + params["vibration"] * moving)[:, None]
+        x[:, 3:] += rng.normal(size=(len(ts), 3)) * (0.005 + 0.05 * moving)[:, None]
+
+        if params["step_hz"]:
+            phase = 2 * math.pi * params["step_hz"] * ts
+            if kind == 'leg':
+                x[:, 4] += 2.0 * moving * np.sin(phase)  # Leg swing
+                x[:, 0] += 3.0 * moving * np.sin(phase)
+            else:
+                x[:, 2] += 1.5 * moving * np.sin(2 * phase)  # Bounce per step
+
+        if self.crash_at is not None:
+            after = ts - self.crash_at
+            spike = (after >= 0) & (after < 3 / IMU_RATE_HZ)
+            tumble = (after >= 3 / IMU_RATE_HZ) & (after < 0.5)
+            down = after >= 0.5
+            x[spike, :3] += self.impact
+            x[tumble, :3] += self.tumble
+            x[tumble, 3:] += rng.normal(size=(int(tumble.sum()), 3)) * 3.0
+            x[down] = [0, GRAVITY, 0, 0.02, 0.02, 0.02]  # Lying on the side
+            x[down, :3] += rng.normal(size=(int(down.sum()), 3)) * 0.05
+        return x
+
+    def sample(self, kind, t):
+        """One read_sample() payload (without device_id / timing fields)"""
+        a = self.imu(kind, [t])[0]
+        sample = {
+            "accel_x": round(a[0], 3), "accel_y": round(a[1], 3), "accel_z": round(a[2], 3),
+            "gyro_x": round(a[3], 3), "gyro_y": round(a[4], 3), "gyro_z": round(a[5], 3),
+            "temperature": round(30 + self.rng.normal(0, 0.2), 2),
+        }
+        if kind == 'chest':
+            lat, lon = self.position_at(t)
+            sample.update({
+                "latitude": round(lat + self.rng.normal(0, 3e-5), 6),
+                "longitude": round(lon + self.rng.normal(0, 3e-5), 6),
+                "altitude": round(900 + self.rng.normal(0, 2), 1),
+                "speed": round(max(self.speed_at(t) + self.rng.normal(0, 0.5), 0.0), 1),
+                "heading": round(float(self.heading[self._index(t)]), 1),
+                "accuracy": round(self.rng.uniform(0.8, 1.6), 2),
+                "satellites": int(self.rng.integers(7, 13)),
+            })
+        return sample
+
+    def burst(self, kind, start, end):
+        """IMU burst payload for (start, end], at most IMU_BURST_MAX samples"""
+        count = min(int((end - start) * IMU_RATE_HZ), IMU_BURST_MAX)
+        ts = end - np.arange(count - 1, -1, -1) / IMU_RATE_HZ
+        x = self.imu(kind, ts)
+        samples = np.hstack([x[:, :3].round(2), x[:, 3:].round(3)]).tolist()
+        return {"rate_hz": IMU_RATE_HZ, "samples": samples}
+
+
+# =============================================
+# Virtual devices
+# =============================================
+
+class FleetStats:
+    """What the virtual devices saw (one per simulator process, merged at the end)"""
+
+    def __init__(self):
+        self.latency = {'leg': [], 'chest': []}
+        self.status = {'leg': Counter(), 'chest': Counter()}
+        self.samples = Counter()  # sent / accepted / dropped
+        self.lag = []  # Seconds a device woke up late (simulator saturation)
+        self.crashes = []  # (epoch, latitude, longitude)
+
+    def merge(self, other):
+        """Add another worker process's stats"""
+        for kind in self.latency:
+            self.latency[kind] += other.latency[kind]
+            self.status[kind] += other.status[kind]
+        self.samples += other.samples
+        self.lag += other.lag
+        self.crashes += other.crashes
+
+
+async def run_device(client, url, kind, rider_id, ride, deadline, stats):
+    """One ESP32: sample, batch and upload like the firmware until the deadline"""
+    started = ride.started
+    device_id = f"SIM_{kind.upper()}_{rider_id}"
+    policy = {"idle_ms": IDLE_INTERVAL * 1000, "moving_ms": MOVING_INTERVAL * 1000}
+    pending = []
+    burst_start = time.time() - ride.rng.uniform(0, 1)
+    last_sample = -math.inf
+    still_since = None
+    batch_every, next_send, backoff = 1, 0.0, 0.0
+    impact_send = started + ride.crash_at + IMPACT_POST if ride.crash_at is not None else None
+    wake = time.time()
+
+    while wake < deadline:
+        now = time.time()
+        stats.lag.append(now - wake)
+        t = now - started
+
+        if ride.speed_at(t) < STILL_SPEED:
+            still_since = still_since or now
+        else:
+            still_since = None
+        moving = still_since is None or now - still_since < STILL_HOLD
+        interval = (policy["moving_ms"] if moving else policy["idle_ms"]) / 1000
+
+        impact_due = impact_send is not None and now >= impact_send
+        if impact_due or now - last_sample >= interval:
+            last_sample = now
+            sample = ride.sample(kind, t)
+            sample.update(device_id=device_id, rider_id=rider_id, captured=now)
+            pending.append(sample)
+            if len(pending) > MAX_PENDING:
+                pending.pop(0)
+                stats.samples['dropped'] += 1
+
+            if impact_due or (len(pending) >= batch_every and now >= next_send):
+                if impact_due:
+                    if kind == 'chest':
+                        stats.crashes.append((started + ride.crash_at, *ride.position_at(ride.crash_at)))
+                    impact_send = None
+                sent, retry_after, new_policy = await send_batch(client, url, kind, ride, pending, burst_start, stats)
+                pending = pending[sent:]
+                if new_policy:
+                    policy.update({key: float(new_policy[key]) for key in policy if key in new_policy})
+                if not pending:
+                    burst_start = time.time()
+                if retry_after > 0:
+                    batch_every = min(batch_every * 2, MAX_BATCH_EVERY)
+                    backoff, next_send = 0.0, time.time() + retry_after
+                elif retry_after < 0:
+                    backoff = min(max(backoff * 2, MOVING_INTERVAL), MAX_BACKOFF)
+                    next_send = time.time() + backoff
+                else:
+                    batch_every, backoff = max(batch_every // 2, 1), 0.0
+
+        wake = now + MOTION_WINDOW
+        if impact_send is not None:
+            wake = min(wake, impact_send)
+        await asyncio.sleep(max(wake - time.time(), 0))
+
+
+async def send_batch(client, url, kind, ride, pending, burst_start, stats):
+    """POST pending samples like the firmware's send_batch; returns (sent, retry_after s, policy)"""
+    now = time.time()
+    batch = []
+    for sample in pending:
+        item = {key: value for key, value in sample.items() if key != "captured"}
+        item["age_ms"] = int((now - sample["captured"]) * 1000)
+        item["device_time_ms"] = int(sample["captured"] * 1000)
+        batch.append(item)
+    newest = pending[-1]["captured"]
+    batch[-1]["imu_burst"] = ride.burst(kind, burst_start - ride.started, newest - ride.started)
+
+    stats.samples['sent'] += len(batch)
+    try:
+        response = await client.post(url, json=batch if len(batch) > 1 else batch[0])
+    except Exception:
+        stats.status[kind]['error'] += 1
+        return 0, -1, None
+    stats.latency[kind].append(time.time() - now)
+    stats.status[kind][response.status_code] += 1
+
+    if response.status_code in (200, 201, 202):
+        stats.samples['accepted'] += len(batch)
+        return len(batch), 0, response.json().get("policy")
+    if response.status_code in (429, 503):
+        body = response.json()
+        stats.samples['accepted'] += body.get("accepted", 0)
+        return body.get("accepted", 0), float(response.headers.get("Retry-After", 5)), body.get("policy")
+    return len(batch), 0, None  # Rejected; the firmware drops these
+
+
+# =============================================
+# Run + report
+# =============================================
+
+def plan_rider(i, riders, crash_rate, seed):
+    """(rider_id, mode, origin, crash, seed) for rider i; the same in every process"""
+    rng = np.random.default_rng([seed, i])
+    modes, weights = zip(*MODE_MIX)
+    side = math.ceil(math.sqrt(riders))
+    origin = (ORIGIN[0] + (i // side - side / 2) * GRID_SPACING, ORIGIN[1] + (i % side - side / 2) * GRID_SPACING)
+    return f"sim{i:05d}", str(rng.choice(modes, p=weights)), origin, bool(rng.random() < crash_rate), seed * 100003 + i
+
+
+async def drive(args, target, indices, began):
+    """Run the riders in `indices` (switching on over the ramp from `began`) until the deadline"""
+    import httpx
+
+    duration = args.ramp + args.duration
+    deadline = began + duration
+    stats = FleetStats()
+    # Devices queue for a connection, like firmware retrying a busy socket; only I/O times out
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    async with httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(5.0, pool=None)) as client:
+
+        async def rider(i):
+            rider_id, mode, origin, crash, seed = plan_rider(i, args.riders, args.crash_rate, args.seed)
+            ride = Ride(seed, mode, origin, duration, crash)
+            await asyncio.sleep(max(began + ride.rng.uniform(0, args.ramp) - time.time(), 0))
+            ride.started = time.time()
+            await asyncio.gather(*(
+                run_device(client, f"{target}/api/esp32-{kind}", kind, rider_id, ride, deadline, stats)
+                for kind in ('leg', 'chest')
+            ))
+
+        await asyncio.gather(*(rider(i) for i in indices))
+    return stats
+
+
+def drive_slice(args, target, indices, began):
+    """Worker process entry point"""
+    return asyncio.run(drive(args, target, indices, began))
+
+
+def drive_fleet(args, target):
+    """Spread the riders over --processes workers (one asyncio loop each) and merge their stats"""
+    began = time.time() + 1.0  # Time for the workers to start
+    slices = [range(p, args.riders, args.processes) for p in range(args.processes)]
+    if args.processes == 1:
+        return drive_slice(args, target, slices[0], began)
+
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    stats = FleetStats()
+    with ProcessPoolExecutor(args.processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+        for part in pool.map(drive_slice, [args] * args.processes, [target] * args.processes, slices, [began] * args.processes):
+            stats.merge(part)
+    return stats
+
+
+def _percentiles(values, unit=1000, suffix="ms"):
+    if not values:
+        return "n/a"
+    values = np.asarray(values) * unit
+    return (f"p50 {np.percentile(values, 50):.0f} {suffix}, p95 {np.percentile(values, 95):.0f} {suffix}, "
+            f"p99 {np.percentile(values, 99):.0f} {suffix}")
+
+
+def report(stats, stub_stats, elapsed):
+    print(f"\nRan {elapsed:.0f} s")
+    for kind in ('leg', 'chest'):
+        total = sum(stats.status[kind].values())
+        print(f"{kind:>6}: {total} requests ({total / elapsed:.0f}/s) {dict(stats.status[kind])}, "
+              f"{_percentiles(stats.latency[kind])}")
+    print(f"samples: {dict(stats.samples)}")
+    print(f"simulator wake-up lag: {_percentiles(stats.lag)} (high = the generator, not the backend, is saturated)")
+
+    with stub_stats.lock:
+        rows, events, messages = dict(stub_stats.rows), list(stub_stats.events), len(stub_stats.messages)
+    print(f"\nSupabase rows: {rows}")
+    print(f"events: {dict(Counter((row['event_type'], row['severity']) for _, row in events))}")
+    print(f"telegram messages: {messages}")
+
+    # Event rows carry the triggering sample's capture time and the notification time
+    stored = [received - _epoch(row['timestamp']) for received, row in events if row.get('timestamp')]
+    notified = [_epoch(row['telegram_sent_at']) - _epoch(row['timestamp'])
+                for _, row in events if row.get('telegram_sent_at') and row.get('timestamp')]
+    print(f"sample -> event stored: {_percentiles(stored)}")
+    print(f"sample -> notification: {_percentiles(notified)}")
+
+    # Each crash is matched to the first FALL_DETECTED event near where it happened
+    falls = [(received, row) for received, row in events
+             if row['event_type'] == 'FALL_DETECTED' and row.get('latitude') is not None]
+    detected, crash_to_event, crash_to_notify = 0, [], []
+    for crashed_at, lat, lon in stats.crashes:
+        matches = [(received, row) for received, row in falls
+                   if received >= crashed_at and geo.haversine_m(lat, lon, row['latitude'], row['longitude']) <= CRASH_MATCH_RADIUS_M]
+        if matches:
+            received, row = min(matches, key=lambda match: match[0])
+            detected += 1
+            crash_to_event.append(received - crashed_at)
+            if row.get('telegram_sent_at'):
+                crash_to_notify.append(_epoch(row['telegram_sent_at']) - crashed_at)
+    print(f"crashes detected: {detected}/{len(stats.crashes)}")
+    print(f"crash -> event stored: {_percentiles(crash_to_event)}")
+    print(f"crash -> notification: {_percentiles(crash_to_notify)}")
+
+
+def main():
+    """CLI entry point"""
+    parser = argparse.ArgumentParser(description="Simulate a fleet of ESP32 leg/chest pairs against the backend")
+    parser.add_argument("--riders", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds of full load (after the ramp)")
+    parser.add_argument("--ramp", type=float, default=10.0, help="Seconds over which riders switch on")
+    parser.add_argument("--crash-rate", type=float, default=0.05, help="Fraction of riders that crash")
+    parser.add_argument("--connections", type=int, default=200, help="Concurrent HTTP connections per process")
+    parser.add_argument("--processes", type=int, default=1, help="Simulator processes (one asyncio loop each)")
+    parser.add_argument("--target", help="Backend base URL (default: start server.py against the stubs)")
+    parser.add_argument("--port", type=int, default=7788, help="Port for the started backend")
+    parser.add_argument("--stub-port", type=int, default=54321, help="Port for the Supabase/Telegram stubs")
+    parser.add_argument("--subscribers", type=int, default=1, help="Linked Telegram chats notified per alert")
+    parser.add_argument("--supabase-delay", type=float, default=0.0, help="Stub Supabase latency (s)")
+    parser.add_argument("--telegram-delay", type=float, default=0.0, help="Stub Telegram latency (s)")
+    parser.add_argument("--drain", type=float, default=3.0, help="Seconds to wait for WAL flushes at the end")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    stub_server, stub_stats = start_stubs(args.stub_port, args.subscribers, args.supabase_delay, args.telegram_delay)
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    backend = None
+    with tempfile.TemporaryDirectory(prefix="ignition-loadgen-") as workdir:
+        target = args.target
+        if target:
+            print(f"Stubs on {stub_url}; the backend at {target} must use it as SUPABASE_URL and TELEGRAM_API_URL")
+        else:
+            backend = start_backend(args.port, stub_url, workdir)
+            target = f"http://127.0.0.1:{args.port}"
+            print(f"Backend on {target} (log: {workdir}/backend.log), stubs on {stub_url}")
+        try:
+            target = target.rstrip('/')
+            if not wait_healthy(target):
+                raise SystemExit(f"Backend at {target} did not become healthy")
+            plans = [plan_rider(i, args.riders, args.crash_rate, args.seed) for i in range(args.riders)]
+            print(f"Driving {args.riders} riders ({dict(Counter(plan[1] for plan in plans))}, "
+                  f"{sum(plan[3] for plan in plans)} crashing) for {args.ramp + args.duration:.0f} s "
+                  f"in {args.processes} process(es)...")
+
+            started = time.time()
+            stats = drive_fleet(args, target)
+            elapsed = time.time() - started
+            time.sleep(args.drain)  # Let the backend's WAL flush the last rows
+            report(stats, stub_stats, elapsed)
+        finally:
+            if backend:
+                backend.terminate()
+                backend.wait(timeout=10)
+            stub_server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# Metrics & Tracing - Ignition Hackathon
+# Prometheus metrics served at GET /metrics, plus lightweight per-request
+# spans. Each span is observed in REQUEST_STAGE_SECONDS and echoed in the
+# response's Server-Timing header, so a slow stage shows up both in Prometheus
+# and in the browser's network tab.
+#
+# Each worker process counts into its own registry. With several workers,
+# point PROMETHEUS_MULTIPROC_DIR at an empty directory before they start:
+# prometheus_client then keeps the values in per-process files and /metrics
+# merges every worker's (gauges per their multiprocess_mode below).
+
+import os
+import random
+import time
+from contextlib import contextmanager
+
+from flask import g, request
+from prometheus_client import Counter, Gauge, Histogram
+
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", 0.01))  # Fraction of per-sample log lines kept
+
+# Sub-millisecond detectors up to multi-second Supabase stalls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_SECONDS = Histogram(
+    "ignition_request_seconds", "HTTP request latency",
+    ["endpoint", "method", "status"], buckets=LATENCY_BUCKETS
+)
+REQUEST_STAGE_SECONDS = Histogram(
+    "ignition_request_stage_seconds", "Time spent in each stage of a request",
+    ["endpoint", "stage"], buckets=LATENCY_BUCKETS
+)
+INGEST_SECONDS = Histogram(
+    "ignition_ingest_seconds", "Sensor sample handling time (request in to 202 out)",
+    ["sensor"], buckets=LATENCY_BUCKETS
+)
+SUPABASE_SECONDS = Histogram(
+    "ignition_supabase_seconds", "Supabase call latency",
+    ["table", "operation"], buckets=LATENCY_BUCKETS
+)
+DETECTION_SECONDS = Histogram(
+    "ignition_detection_seconds", "Detector run time",
+    ["detector"], buckets=LATENCY_BUCKETS
+)
+TELEGRAM_SEND_SECONDS = Histogram(
+    "ignition_telegram_send_seconds", "Telegram sendMessage latency",
+    buckets=LATENCY_BUCKETS
+)
+EVENTS_TOTAL = Counter(
+    "ignition_events_total", "Events created",
+    ["event_type", "severity"]
+)
+REQUESTS_SHED_TOTAL = Counter(
+    "ignition_requests_shed_total", "Requests rejected to shed load (429/503)",
+    ["endpoint", "reason"]
+)
+CLOCK_OFFSET_SECONDS = Histogram(
+    "ignition_device_clock_offset_seconds", "Estimated |device clock offset| per ingest request",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 30.0, 300.0, 3600.0)
+)
+IN_FLIGHT = Gauge("ignition_requests_in_flight", "Requests being handled", multiprocess_mode="livesum")
+WAL_PENDING = Gauge("ignition_wal_pending_samples", "Rows waiting in the ingest WALs", multiprocess_mode="livesum")
+WAL_USED_BYTES = Gauge(
+    "ignition_wal_used_bytes", "Bytes of the ingest WALs holding unflushed rows", multiprocess_mode="livesum"
+)
+ACTIVITY_RIDERS = Gauge(
+    "ignition_activity_riders", "Riders classified in the last activity batch", multiprocess_mode="livemostrecent"
+)
+
+
+def sampled(rate=None):
+    """True for roughly `rate` (default LOG_SAMPLE_RATE) of calls; gate per-sample logging with it"""
+    return random.random() < (LOG_SAMPLE_RATE if rate is None else rate)
+
+
+@contextmanager
+def span(stage, detector=None):
+    """
+    Time one stage of the current request (histogram + Server-Timing entry).
+    Stages that run a detector also record it in DETECTION_SECONDS.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        REQUEST_STAGE_SECONDS.labels(request.endpoint or "unknown", stage).observe(elapsed)
+        if detector:
+            DETECTION_SECONDS.labels(detector).observe(elapsed)
+        spans = g.get("spans")
+        if spans is not None:
+            spans.append((stage, elapsed))
+
+
+def server_timing(spans, total):
+    """Server-Timing header value, e.g. 'wal;dur=0.41, total;dur=2.10' (milliseconds)"""
+    entries = [f"{stage};dur={elapsed * 1000:.2f}" for stage, elapsed in spans]
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
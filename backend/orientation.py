@@ -0,0 +1,164 @@
+# Orientation Estimation - Ignition Hackathon
+# Per-device Madgwick (IMU) filter. Each device's attitude quaternion is
+# updated incrementally from its gyro and accelerometer. The filter runs over
+# the 50 Hz IMU burst that comes with each upload. One gyro reading per upload
+# (0.5-1 Hz) is far too coarse to integrate, and does worse than raw
+# accelerometer tilt, so samples without a burst get no filtered attitude.
+# Each device's quaternion lives in the workers' shared state, so the filter
+# carries on from the previous burst whichever worker ingested it.
+# madgwick_step is the same update for many devices at once in NumPy.
+#
+# Posture from raw accelerometer vectors is dominated by linear acceleration
+# whenever the rider brakes or turns; here the gyro carries the attitude
+# through those moments and the accelerometer only corrects slow drift, and
+# only while |a| is close to 1 g.
+
+import math
+
+import numpy as np
+
+from shared import LocalState
+
+GRAVITY = 9.81
+MADGWICK_BETA = 0.1  # Accelerometer correction gain (rad/s)
+ACCEL_TRUST_BAND = 0.2 * GRAVITY  # Skip correction when | |a| - g | exceeds this
+MAX_GYRO_DT = 0.5  # Seconds between IMU readings; longer gaps (missed bursts) re-level from the accelerometer
+
+
+def quaternion_from_accel(accel):
+    """Level attitude (yaw = 0) from gravity alone, shape (N, 3) -> (N, 4)"""
+    ax, ay, az = accel[:, 0], accel[:, 1], accel[:, 2]
+    roll = np.arctan2(ay, az)
+    pitch = np.arctan2(-ax, np.sqrt(ay * ay + az * az))
+    cr, sr = np.cos(roll / 2), np.sin(roll / 2)
+    cp, sp = np.cos(pitch / 2), np.sin(pitch / 2)
+    return np.stack([cr * cp, sr * cp, cr * sp, -sr * sp], axis=1)
+
+
+def madgwick_step(q, gyro, accel, dt, beta=MADGWICK_BETA):
+    """
+    One Madgwick IMU update for N devices at once.
+    q (N, 4) [w, x, y, z], gyro (N, 3) rad/s, accel (N, 3) m/s², dt (N,) s
+    """
+    w, x, y, z = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
+    gx, gy, gz = gyro[:, 0], gyro[:, 1], gyro[:, 2]
+
+    # Rate of change from the gyro: 0.5 * q ⊗ (0, g)
+    q_dot = 0.5 * np.stack([
+        -x * gx - y * gy - z * gz,
+        w * gx + y * gz - z * gy,
+        w * gy - x * gz + z * gx,
+        w * gz + x * gy - y * gx,
+    ], axis=1)
+
+    # Gradient-descent correction towards the measured gravity direction
+    norm = np.linalg.norm(accel, axis=1)
+    trusted = (np.abs(norm - GRAVITY) < ACCEL_TRUST_BAND) & (norm > 0)
+    a = accel / np.where(norm > 0, norm, 1.0)[:, None]
+    f = np.stack([
+        2 * (x * z - w * y) - a[:, 0],
+        2 * (w * x + y * z) - a[:, 1],
+        2 * (0.5 - x * x - y * y) - a[:, 2],
+    ], axis=1)
+    step = np.stack([
+        -2 * y * f[:, 0] + 2 * x * f[:, 1],
+        2 * z * f[:, 0] + 2 * w * f[:, 1] - 4 * x * f[:, 2],
+        -2 * w * f[:, 0] + 2 * z * f[:, 1] - 4 * y * f[:, 2],
+        2 * x * f[:, 0] + 2 * y * f[:, 1],
+    ], axis=1)
+    # Normalized while the error is large; proportional near convergence, so a
+    # level sensor is not nudged by a unit-length step of rounding noise
+    step /= np.maximum(np.linalg.norm(step, axis=1), 1.0)[:, None]
+    q_dot -= (beta * trusted)[:, None] * step
+
+    q = q + q_dot * dt[:, None]
+    return q / np.linalg.norm(q, axis=1)[:, None]
+
+
+def madgwick_burst(q, samples, dt, beta=MADGWICK_BETA):
+    """
+    madgwick_step for one device through consecutive readings, in plain floats
+    (the steps are sequential, and per-step NumPy overhead would dominate).
+    q (4,) [w, x, y, z], samples (N, 6) [ax, ay, az, gx, gy, gz], dt (N,) s
+    """
+    w, x, y, z = (float(v) for v in q)
+    for (ax, ay, az, gx, gy, gz), step_dt in zip(samples.tolist(), dt.tolist()):
+        dw = 0.5 * (-x * gx - y * gy - z * gz)
+        dx = 0.5 * (w * gx + y * gz - z * gy)
+        dy = 0.5 * (w * gy - x * gz + z * gx)
+        dz = 0.5 * (w * gz + x * gy - y * gx)
+
+        norm = math.sqrt(ax * ax + ay * ay + az * az)
+        if norm > 0 and abs(norm - GRAVITY) < ACCEL_TRUST_BAND:
+            ax, ay, az = ax / norm, ay / norm, az / norm
+            f0 = 2 * (x * z - w * y) - ax
+            f1 = 2 * (w * x + y * z) - ay
+            f2 = 2 * (0.5 - x * x - y * y) - az
+            sw = -2 * y * f0 + 2 * x * f1
+            sx = 2 * z * f0 + 2 * w * f1 - 4 * x * f2
+            sy = -2 * w * f0 + 2 * z * f1 - 4 * y * f2
+            sz = 2 * x * f0 + 2 * y * f1
+            scale = beta / max(math.sqrt(sw * sw + sx * sx + sy * sy + sz * sz), 1.0)
+            dw -= scale * sw
+            dx -= scale * sx
+            dy -= scale * sy
+            dz -= scale * sz
+
+        w, x, y, z = w + dw * step_dt, x + dx * step_dt, y + dy * step_dt, z + dz * step_dt
+        norm = math.sqrt(w * w + x * x + y * y + z * z)
+        w, x, y, z = w / norm, x / norm, y / norm, z / norm
+    return np.array([w, x, y, z])
+
+
+def euler_angles(q):
+    """(roll, pitch, lean) in degrees; lean is the tilt of the sensor's z axis from vertical"""
+    w, x, y, z = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
+    roll = np.degrees(np.arctan2(2 * (w * x + y * z), 1 - 2 * (x * x + y * y)))
+    pitch = np.degrees(np.arcsin(np.clip(2 * (w * y - z * x), -1, 1)))
+    lean = np.degrees(np.arccos(np.clip(1 - 2 * (x * x + y * y), -1, 1)))
+    return roll, pitch, lean
+
+
+class OrientationBank:
+    """Quaternion state for every device, kept in a state store as [w, x, y, z, last_t]"""
+
+    def __init__(self, store=None):
+        self.store = store if store is not None else LocalState()  # SharedState across workers
+
+    def update_burst(self, device_id, t_end, burst):
+        """
+        Run one device's filter through an uploaded IMU burst ({"rate_hz": r,
+        "samples": (N, 6)}, last reading taken at t_end). Readings already folded
+        in are skipped. Returns (roll, pitch, lean) in degrees at t_end.
+        """
+        rate = float(burst.get("rate_hz") or 50)
+        samples = np.asarray(burst["samples"], dtype=float).reshape(-1, 6)
+        t = t_end - np.arange(len(samples) - 1, -1, -1) / rate
+
+        def step(state):
+            q, last_t = (np.array(state[:4]), state[4]) if state else (None, -math.inf)
+            fresh = t > last_t
+            if not fresh.any():
+                return state
+            ts, readings = t[fresh], samples[fresh]
+            dt = np.diff(ts, prepend=last_t)
+            if q is None or not dt[0] <= MAX_GYRO_DT:
+                # New device or a gap in the bursts: re-level from the first reading
+                q = quaternion_from_accel(readings[:1, :3])[0]
+                dt[0] = 0.0
+            return [*madgwick_burst(q, readings, dt).tolist(), float(ts[-1])]
+
+        state = self.store.update(f"attitude:{device_id}", step)
+        return euler_angles(np.array([state[:4]]))
+
+    def update(self, sample):
+        """
+        Filtered (roll, pitch, lean_angle) for a sample record, from its IMU burst.
+        (None, None, None) without one: posture then comes from the raw accelerometer.
+        """
+        burst = sample.imu_burst
+        if not burst or not len(burst["samples"]):
+            return None, None, None
+        roll, pitch, lean = self.update_burst(sample.device_id, sample.epoch, burst)
+        return round(float(roll[0]), 2), round(float(pitch[0]), 2), round(float(lean[0]), 2)
+
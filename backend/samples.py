@@ -0,0 +1,251 @@
+# Typed Sensor Samples - Ignition Hackathon
+# Ingest payloads are checked against a fixed schema and parsed once into
+# __slots__ records before anything touches the WAL, Supabase or a detector.
+# Unknown keys, wrong types, NaN/inf and out-of-range values are rejected
+# with every bad field listed. Each record type's validator is a tuple of
+# per-field check functions built at import time, so a parse is one pass over
+# the schema.
+#
+# Detection code reads attributes (sample.accel_x) instead of repeating
+# `.get(..., 0) or 0`: IMU fields are required, so they are always floats.
+
+import math
+from datetime import datetime, timedelta
+
+MAX_BURST_SAMPLES = 1000  # ~20 s at 50 Hz; the firmware caps its bursts at 180
+MAX_BATCH = 32  # Samples per request (firmware queues samples while shed)
+MAX_AGE_MS = 10 * 60 * 1000  # Oldest queued sample accepted
+MAX_DEVICE_TIME_MS = 4102444800000  # 2100-01-01; wrong-but-sane device clocks are corrected, not rejected
+
+
+class ValidationError(ValueError):
+    """Payload does not match the schema; `errors` lists every bad field"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("; ".join(errors))
+
+
+# =============================================
+# Field checks
+# =============================================
+
+def _number(lo, hi, integer=False):
+    """Check for a finite int/float in [lo, hi] (bools are rejected)"""
+    def check(value):
+        if type(value) not in (int, float):
+            raise TypeError(f"expected a number, got {type(value).__name__}")
+        if not math.isfinite(value) or not lo <= value <= hi:
+            raise ValueError(f"{value} outside [{lo}, {hi}]")
+        if integer and value != int(value):
+            raise ValueError("expected an integer")
+        return int(value) if integer else float(value)
+    return check
+
+
+def _text(max_length):
+    def check(value):
+        if type(value) is not str:
+            raise TypeError(f"expected a string, got {type(value).__name__}")
+        if not 0 < len(value) <= max_length:
+            raise ValueError(f"expected 1-{max_length} characters")
+        return value
+    return check
+
+
+def _timestamp(value):
+    """ISO 8601 string -> (string, epoch seconds)"""
+    if type(value) is not str:
+        raise TypeError(f"expected an ISO 8601 string, got {type(value).__name__}")
+    return value, datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+def _imu_burst(value):
+    """{"rate_hz", "samples": [[ax, ay, az, gx, gy, gz], ...]} -> same with an (N, 6) float array"""
+    import numpy as np
+
+    if type(value) is not dict or set(value) - {"rate_hz", "samples"}:
+        raise TypeError("expected {\"rate_hz\", \"samples\"}")
+    rate = _number(1, 1000)(value.get("rate_hz", 50))
+    samples = value.get("samples") or []
+    if type(samples) is not list or len(samples) > MAX_BURST_SAMPLES:
+        raise ValueError(f"samples must be a list of at most {MAX_BURST_SAMPLES} rows")
+    try:
+        samples = np.array(samples, dtype=float).reshape(-1, 6)
+    except (TypeError, ValueError):
+        raise ValueError("samples must be rows of 6 numbers")
+    if not np.isfinite(samples).all():
+        raise ValueError("samples must be finite")
+    return {"rate_hz": rate, "samples": samples}
+
+
+IMU_CHECKS = (
+    ("accel_x", _number(-200.0, 200.0), True),  # m/s² (±16 g plus margin)
+    ("accel_y", _number(-200.0, 200.0), True),
+    ("accel_z", _number(-200.0, 200.0), True),
+    ("gyro_x", _number(-40.0, 40.0), True),  # rad/s (±2000 °/s plus margin)
+    ("gyro_y", _number(-40.0, 40.0), True),
+    ("gyro_z", _number(-40.0, 40.0), True),
+    ("temperature", _number(-40.0, 125.0), False),  # °C, MPU6050 operating range
+)
+
+GPS_CHECKS = (
+    ("latitude", _number(-90.0, 90.0), False),
+    ("longitude", _number(-180.0, 180.0), False),
+    ("altitude", _number(-500.0, 10000.0), False),  # m
+    ("speed", _number(0.0, 500.0), False),  # km/h
+    ("heading", _number(0.0, 360.0), False),  # degrees
+    ("accuracy", _number(0.0, 100.0), False),  # HDOP
+    ("satellites", _number(0, 64, integer=True), False),
+)
+
+# Fields every payload may carry; none of them is stored as a column
+COMMON_CHECKS = (
+    ("device_id", _text(50), False),
+    ("rider_id", _text(64), False),
+    ("imu_burst", _imu_burst, False),
+    ("age_ms", _number(0, MAX_AGE_MS, integer=True), False),  # Time the sample spent queued on the device
+    ("device_time_ms", _number(0, MAX_DEVICE_TIME_MS, integer=True), False),  # Capture time, device clock (Unix ms)
+)
+
+
+# =============================================
+# Records
+# =============================================
+
+NON_COLUMNS = ("rider_id", "imu_burst", "age_ms", "device_time_ms", "epoch")  # Parsed but not stored
+
+
+def _fields(checks, derived):
+    """Slots of a record: stored columns first, then NON_COLUMNS"""
+    payload = tuple(name for name, _, _ in checks if name not in NON_COLUMNS)
+    return ("timestamp",) + payload + derived + NON_COLUMNS
+
+
+class SensorSample:
+    """
+    Base for typed samples. Subclasses list their payload checks and the
+    values the backend derives later (orientation, smoothing, ...).
+    """
+
+    __slots__ = ()
+    CHECKS = ()
+    DERIVED = ()
+    DEFAULT_DEVICE_ID = None
+
+    def __init_subclass__(cls):
+        cls.FIELDS = cls.__slots__
+        cls.COLUMNS = tuple(name for name in cls.FIELDS if name not in NON_COLUMNS)
+        cls.ACCEPTED = frozenset(name for name, _, _ in cls.CHECKS) | {"timestamp"}
+
+    def __init__(self, **values):
+        for name in self.FIELDS:
+            setattr(self, name, values.get(name))
+
+    @classmethod
+    def parse(cls, payload):
+        """Validate a request payload into a record; raises ValidationError before any I/O"""
+        if type(payload) is not dict:
+            raise ValidationError(["body must be a JSON object"])
+
+        errors = []
+        unknown = payload.keys() - cls.ACCEPTED
+        if unknown:
+            errors.append(f"unknown field(s): {', '.join(sorted(unknown))}")
+
+        record = cls()
+        for name, check, required in cls.CHECKS:
+            value = payload.get(name)
+            if value is None:
+                if required:
+                    errors.append(f"{name}: required")
+                continue
+            try:
+                setattr(record, name, check(value))
+            except (TypeError, ValueError) as e:
+                errors.append(f"{name}: {e}")
+
+        timestamp = payload.get("timestamp")
+        if timestamp is not None:
+            try:
+                record.timestamp, record.epoch = _timestamp(timestamp)
+            except (TypeError, ValueError) as e:
+                errors.append(f"timestamp: {e}")
+
+        if errors:
+            raise ValidationError(errors)
+
+        if record.device_time_ms is not None:
+            # Device clock (GPS/NTP); ClockOffsets re-stamps it at ingest if it is off
+            captured = datetime.fromtimestamp(record.device_time_ms / 1000)
+            record.timestamp, record.epoch = captured.isoformat(), captured.timestamp()
+        elif record.timestamp is None:
+            # No device clock: captured `age_ms` before arrival
+            captured = datetime.now() - timedelta(milliseconds=record.age_ms or 0)
+            record.timestamp, record.epoch = captured.isoformat(), captured.timestamp()
+        if record.device_id is None:
+            record.device_id = cls.DEFAULT_DEVICE_ID
+        return record
+
+    @classmethod
+    def parse_batch(cls, payload):
+        """
+        One sample object or a JSON array of up to MAX_BATCH of them -> list of
+        records, oldest first. All-or-nothing: any invalid sample rejects the batch.
+        """
+        if type(payload) is not list:
+            return [cls.parse(payload)]
+        if not 0 < len(payload) <= MAX_BATCH:
+            raise ValidationError([f"batch must hold 1-{MAX_BATCH} samples"])
+
+        records = []
+        errors = []
+        for i, item in enumerate(payload):
+            try:
+                records.append(cls.parse(item))
+            except ValidationError as e:
+                errors.extend(f"[{i}] {error}" for error in e.errors)
+        if errors:
+            raise ValidationError(errors)
+        return records
+
+    @classmethod
+    def from_row(cls, row):
+        """Record from a trusted database row (extra columns are ignored)"""
+        record = cls(**row)
+        for name, _, required in cls.CHECKS:
+            if required and getattr(record, name) is None:
+                setattr(record, name, 0.0)
+        if record.timestamp:
+            record.epoch = _timestamp(record.timestamp)[1]
+        return record
+
+    def to_row(self):
+        """Column dict for Supabase (None values are left to the database defaults)"""
+        row = {}
+        for name in self.COLUMNS:
+            value = getattr(self, name)
+            if value is not None:
+                row[name] = value
+        return row
+
+
+class LegSample(SensorSample):
+    """Leg ESP32 sample (MPU6050)"""
+
+    CHECKS = IMU_CHECKS + COMMON_CHECKS
+    DERIVED = ("calibration_version", "roll", "pitch", "lean_angle")
+    DEFAULT_DEVICE_ID = "ESP32_LEG"
+    __slots__ = _fields(CHECKS, DERIVED)
+
+
+class ChestSample(SensorSample):
+    """Chest ESP32 sample (MPU6050 + GPS)"""
+
+    CHECKS = GPS_CHECKS + IMU_CHECKS + COMMON_CHECKS
+    DERIVED = (
+        "calibration_version", "roll", "pitch", "lean_angle",
+        "smoothed_latitude", "smoothed_longitude", "smoothed_speed", "smoothed_heading", "geohash"
+    )
+    DEFAULT_DEVICE_ID = "ESP32_CHEST"
+    __slots__ = _fields(CHECKS, DERIVED)
@@ -1,14 +1,30 @@
 # Flask Backend for Ignition Hackathon - Rider Telemetry
 # Port: 7777 (internal) → /ignition-hackathon/ (via NGINX)
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
+from flask_compress import Compress
 import os
 from dotenv import load_dotenv
-from supabase import create_client, Client
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from export import EXPORT_TABLES, EXPORT_FORMATS, stream_export
+from wal import open_wal, WALFull
+from tracking import TrackSmoother
+from admission import AdmissionController
+from clock import ClockOffsets
+from samples import ChestSample, LegSample, ValidationError
+from metrics import (
+    ACTIVITY_RIDERS, DETECTION_SECONDS, EVENTS_TOTAL, INGEST_SECONDS,
+    REQUESTS_SHED_TOTAL, REQUEST_SECONDS, SUPABASE_SECONDS, TELEGRAM_SEND_SECONDS,
+    sampled, server_timing, span
+)
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+import geo
 import logging
 import math
+import sys
+import threading
+import time
 
 # Load environment variables
 load_dotenv()
@@ -17,63 +33,207 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app)
 
+# gzip/brotli responses, negotiated from Accept-Encoding
+app.config['COMPRESS_MIMETYPES'] = ['application/json']
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_MIN_SIZE'] = 256
+Compress(app)
+
 # Logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+def lazy(factory):
+    """
+    Call `factory` once, on first use, and return the same object afterwards
+    (thread-safe). Network clients and NumPy-backed state are built this way so
+    importing the app (worker spawn, tests, tooling) stays cheap.
+    """
+    lock = threading.Lock()
+    instance = []
+    
+    def get():
+        if not instance:
+            with lock:
+                if not instance:
+                    instance.append(factory())
+        return instance[0]
+    
+    get.__name__ = factory.__name__
+    get.__doc__ = factory.__doc__
+    return get
+
+
 # Supabase Configuration
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+
+
+@lazy
+def get_supabase():
+    """Shared Supabase client (one HTTP connection pool per process)"""
+    from supabase import create_client
+    return create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+
 
 # Telegram Configuration
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org").rstrip('/')
+
+
+@lazy
+def get_telegram_session():
+    """HTTP session for Bot API calls (reuses the connection to Telegram)"""
+    import requests
+    return requests.Session()
+
 
 # Settings
 HARSH_BRAKE_THRESHOLD = -8.0  # m/s²
 HARSH_ACCEL_THRESHOLD = 6.0   # m/s²
 FALL_DETECTION_THRESHOLD = 15.0  # Combined sensor difference
+MAX_NEAR_RADIUS_M = 5000  # /api/events/near search radius cap
+MAX_NEAR_CANDIDATES = 1000  # Rows fetched before the exact distance filter
+MAX_SPATIAL_RESULTS = 500
+EVENTS_PAGE_SIZE = 50  # /api/events/recent default page
+MAX_EVENTS_PAGE = 200  # Page size cap; older events are reached with ?before=
+LIVE_EVENTS_LIMIT = 50  # Events per /api/live-data delta; has_more asks the client to poll again
+LIVE_EVENTS_SETTLE = 10  # Seconds; well over twice the longest event insert, see live_event_cursor
+PIN_VERIFY_RATE_LIMIT = 10  # PIN attempts per client per minute
+DEFAULT_RIDER = "default"  # Samples without a rider_id belong to the single deployed rider
+
+# Local write-ahead buffer in front of Supabase inserts (opened on first use)
+ingest_wal = None
+ingest_wal_lock = threading.Lock()
+
+# Load shedding: global in-flight cap and per-device token buckets
+admission = AdmissionController()
+
+
+@lazy
+def get_shared_state():
+    """Latest frames, predictions, calibrations and subscribers shared by all worker processes (see shared.py)"""
+    from shared import SharedState
+    return SharedState()
+
+
+@lazy
+def get_detector_state():
+    """Activity windows and IMU buffers shared by all worker processes (larger slots, own file)"""
+    from shared import SharedState, DETECTOR_SLOTS, DETECTOR_SLOT_SIZE, DETECTOR_STATE_PATH
+    return SharedState(DETECTOR_STATE_PATH, slots=DETECTOR_SLOTS, slot_size=DETECTOR_SLOT_SIZE)
+
+
+@lazy
+def get_track_smoother():
+    """Per-device Kalman smoothing of chest GPS (position, speed, heading)"""
+    return TrackSmoother(get_shared_state())
+
+
+@lazy
+def get_clock_offsets():
+    """Per-device clock offset estimates (device_time_ms -> server time)"""
+    return ClockOffsets(get_shared_state())
+
+
+@lazy
+def get_calibration_store():
+    """Versioned per-device IMU calibrations (cached; see calibration.py)"""
+    from calibration import CalibrationStore
+    return CalibrationStore(get_supabase, get_shared_state)
+
+
+@lazy
+def get_orientation_bank():
+    """Per-device attitude (roll/pitch/lean) from gyro + accel"""
+    from orientation import OrientationBank
+    return OrientationBank(get_shared_state())
+
+
+@lazy
+def get_activity_engine():
+    """
+    Windowed activity classification, batched across riders every tick
+    (classifier plugin from ACTIVITY_CLASSIFIER, loaded on first tick)
+    """
+    from activity import ActivityEngine
+    return ActivityEngine(on_tick=record_activity_tick, on_results=publish_activity, store=get_detector_state())
+
+
+@lazy
+def get_impact_detector():
+    """Windowed crash/fall scoring over the firmware's high-rate IMU bursts"""
+    from impact import ImpactDetector
+    return ImpactDetector(get_detector_state())
+
+
+@lazy
+def get_dashboard_summary():
+    """Rolling per-rider speed, distance, activity and event aggregates (see summary.py)"""
+    from shared import SharedState
+    from summary import DashboardSummary, SUMMARY_SLOTS, SUMMARY_SLOT_SIZE, SUMMARY_STATE_PATH
+    return DashboardSummary(SharedState(SUMMARY_STATE_PATH, slots=SUMMARY_SLOTS, slot_size=SUMMARY_SLOT_SIZE))
+
+
+# Sample records behind the shared "<kind>:<rider_id>" frames
+FRAME_TYPES = {'leg': LegSample, 'chest': ChestSample}
+TELEGRAM_SUBSCRIBERS_KEY = "telegram:subscribers"
+TELEGRAM_SUBSCRIBERS_TTL = 60  # Seconds; linking a chat clears it right away
+
+# Recent PIN attempts per client IP (in memory; checked before any DB call)
+pin_attempts = {}
+pin_attempts_lock = threading.Lock()
+
+# Endpoints whose latency is also reported as ingest latency, by sensor
+INGEST_ENDPOINTS = {'receive_leg_data': 'leg', 'receive_chest_data': 'chest'}
+
+# Never shed: probes and scrapes must answer while the process is saturated
+ADMISSION_EXEMPT = {'health_check', 'prometheus_metrics'}
 
 
 # =============================================
 # HELPER FUNCTIONS
 # =============================================
 
+def first_present(*values):
+    """First value that is not None"""
+    for value in values:
+        if value is not None:
+            return value
+    return None
+
+
 def calculate_acceleration_magnitude(accel_x, accel_y, accel_z):
     """Calculate total acceleration magnitude"""
     return math.sqrt(accel_x**2 + accel_y**2 + accel_z**2)
 
 
-def detect_activity_type(leg_data, chest_data):
+def detect_activity_type(leg, chest):
     """
     Detect if rider is walking, on scooter, motorcycle, or stationary
+    (from a LegSample and a ChestSample)
     Based on:
     - Speed (from chest GPS)
     - Gyroscope magnitude (leg movement intensity)
     - Posture difference (chest vs leg orientation)
     """
     try:
-        # Get speed from chest GPS (ensure it's a number)
-        speed = float(chest_data.get('speed', 0) or 0)
+        # Get speed from chest GPS (Kalman-smoothed when available, so GPS
+        # jitter does not flip the activity between ranges)
+        speed = first_present(chest.smoothed_speed, chest.speed, 0.0)
         
         # Calculate gyroscope magnitude for leg (movement detection)
-        leg_gyro_magnitude = math.sqrt(
-            (leg_data.get('gyro_x', 0) or 0)**2 + 
-            (leg_data.get('gyro_y', 0) or 0)**2 + 
-            (leg_data.get('gyro_z', 0) or 0)**2
-        )
+        leg_gyro_magnitude = math.sqrt(leg.gyro_x**2 + leg.gyro_y**2 + leg.gyro_z**2)
         
-        # Calculate posture difference (orientation difference)
-        leg_accel = [
-            leg_data.get('accel_x', 0) or 0,
-            leg_data.get('accel_y', 0) or 0,
-            leg_data.get('accel_z', 9.8) or 9.8  # Default to gravity
-        ]
-        chest_accel = [
-            chest_data.get('accel_x', 0) or 0,
-            chest_data.get('accel_y', 0) or 0,
-            chest_data.get('accel_z', 9.8) or 9.8  # Default to gravity
-        ]
+        # Posture difference: angle between the two sensors' gravity directions.
+        # Prefer the burst-filtered attitude; raw accel includes braking/turning forces.
+        if None not in (leg.roll, leg.pitch, chest.roll, chest.pitch):
+            leg_accel = geo.gravity_direction(leg.roll, leg.pitch)
+            chest_accel = geo.gravity_direction(chest.roll, chest.pitch)
+        else:
+            leg_accel = [leg.accel_x, leg.accel_y, leg.accel_z]
+            chest_accel = [chest.accel_x, chest.accel_y, chest.accel_z]
         
         # Calculate angle difference (dot product approach)
         leg_mag = math.sqrt(sum(x**2 for x in leg_accel))
@@ -86,7 +246,8 @@ def detect_activity_type(leg_data, chest_data):
             cos_angle = max(-1, min(1, cos_angle))  # Clamp to [-1, 1]
             angle_diff = math.degrees(math.acos(cos_angle))
         
-        logger.info(f"Activity Detection - Speed: {speed:.2f} km/h, Gyro: {leg_gyro_magnitude:.3f}, Angle: {angle_diff:.1f}°")
+        if sampled():
+            logger.info(f"Activity Detection - Speed: {speed:.2f} km/h, Gyro: {leg_gyro_magnitude:.3f}, Angle: {angle_diff:.1f}°")
         
         # Detection logic (prioritize speed ranges)
         
@@ -133,22 +294,14 @@ def check_harsh_acceleration(accel_x):
     return accel_x > HARSH_ACCEL_THRESHOLD
 
 
-def check_fall_or_accident(leg_data, chest_data):
+def check_fall_or_accident(leg, chest):
     """
     Detect potential fall or accident
     If both sensors show drastically different readings
     """
     try:
-        leg_total = calculate_acceleration_magnitude(
-            leg_data.get('accel_x', 0),
-            leg_data.get('accel_y', 0),
-            leg_data.get('accel_z', 0)
-        )
-        chest_total = calculate_acceleration_magnitude(
-            chest_data.get('accel_x', 0),
-            chest_data.get('accel_y', 0),
-            chest_data.get('accel_z', 0)
-        )
+        leg_total = calculate_acceleration_magnitude(leg.accel_x, leg.accel_y, leg.accel_z)
+        chest_total = calculate_acceleration_magnitude(chest.accel_x, chest.accel_y, chest.accel_z)
         
         difference = abs(leg_total - chest_total)
         
@@ -161,51 +314,253 @@ def check_fall_or_accident(leg_data, chest_data):
         return False, 0
 
 
-def create_event(event_type, severity, leg_data, chest_data, description=""):
-    """Create event in database and trigger Telegram alert if needed"""
+def process_imu_burst(rider_id, sample, leg, chest):
+    """Feed the sample's IMU burst (ending at its capture time) to the impact detector; create an event per scored impact"""
+    try:
+        from impact import describe as describe_impact
+        
+        for impact in get_impact_detector().add_burst(rider_id, sample.device_id, sample.epoch, sample.imu_burst):
+            create_event(
+                "FALL_DETECTED",
+                impact["severity"],
+                leg,
+                chest,
+                describe_impact(impact),
+                extra={"severity_score": impact["severity_score"], "confidence": impact["confidence"]}
+            )
+    except Exception as e:
+        logger.error(f"Impact detection error: {e}")
+
+
+def get_ingest_wal():
+    """Open this worker's WAL slot on first use and start its flusher"""
+    global ingest_wal
+    if ingest_wal is None:
+        with ingest_wal_lock:
+            if ingest_wal is None:
+                ingest_wal = open_wal(get_supabase())
+                ingest_wal.start()
+    return ingest_wal
+
+
+def shed(reason, retry_after, message="Server busy, retry later", status=429, **extra):
+    """Load-shedding response with Retry-After (devices back off and batch)"""
+    REQUESTS_SHED_TOTAL.labels(request.endpoint or 'unknown', reason).inc()
+    body = {"error": message, "reason": reason, "retry_after": retry_after, "policy": admission.upload_policy()}
+    body.update(extra)
+    return jsonify(body), status, {"Retry-After": str(retry_after)}
+
+
+def run_query(table, query, operation="select"):
+    """Execute a Supabase query, timed per table"""
+    with SUPABASE_SECONDS.labels(table, operation).time():
+        return query.execute()
+
+
+def record_activity_tick(riders, seconds):
+    """ActivityEngine observer: batch classification time and size"""
+    DETECTION_SECONDS.labels("activity_batch").observe(seconds)
+    ACTIVITY_RIDERS.set(riders)
+
+
+def publish_activity(results):
+    """ActivityEngine observer: share each rider's latest prediction with every worker"""
+    try:
+        shared = get_shared_state()
+        for rider_id, (activity, confidence, at) in results.items():
+            shared.put(f"activity:{rider_id}", [activity, confidence, at])
+    except Exception as e:
+        logger.error(f"Error publishing activity: {e}")
+
+
+def latest_activity(rider_id):
+    """(activity, confidence) most recently published for a rider by any worker, or None if stale"""
+    from activity import RESULT_TTL
+    try:
+        prediction = get_shared_state().get(f"activity:{rider_id}", max_age=RESULT_TTL)
+    except Exception as e:
+        logger.error(f"Error reading activity: {e}")
+        return None
+    return (prediction[0], prediction[1]) if prediction else None
+
+
+def publish_frame(kind, rider_id, row):
+    """Share a rider's latest leg/chest row with every worker"""
+    try:
+        get_shared_state().put(f"{kind}:{rider_id}", row)
+    except Exception as e:
+        logger.error(f"Error publishing {kind} frame: {e}")
+
+
+def latest_frame(kind, rider_id):
+    """(row, seq) of a rider's latest leg/chest frame from any worker, or None"""
+    try:
+        entry = get_shared_state().entry(f"{kind}:{rider_id}")
+    except Exception as e:
+        logger.error(f"Error reading {kind} frame: {e}")
+        return None
+    return (entry[0], entry[1]) if entry else None
+
+
+def latest_sample(kind, rider_id):
+    """A rider's latest leg/chest sample record from any worker, or None"""
+    frame = latest_frame(kind, rider_id)
+    return FRAME_TYPES[kind].from_row(frame[0]) if frame else None
+
+
+def is_pin_verify_rate_limited(client_ip):
+    """Sliding one-minute window of PIN attempts per client"""
+    now = time.monotonic()
+    with pin_attempts_lock:
+        recent = [t for t in pin_attempts.get(client_ip, []) if now - t < 60]
+        limited = len(recent) >= PIN_VERIFY_RATE_LIMIT
+        if not limited:
+            recent.append(now)
+        pin_attempts[client_ip] = recent
+        
+        # Keep the table from growing without bound
+        if len(pin_attempts) > 10000:
+            for ip, attempts in list(pin_attempts.items()):
+                if not attempts or now - attempts[-1] >= 60:
+                    del pin_attempts[ip]
+    
+    return limited
+
+
+def get_latest_leg_from_db():
+    """Latest leg sample from Supabase (fallback before any worker has published one)"""
+    try:
+        result = run_query("esp32_leg_data", get_supabase().table("esp32_leg_data")
+            .select("*")
+            .order("timestamp", desc=True)
+            .limit(1))
+        return LegSample.from_row(result.data[0]) if result.data else None
+    except Exception as e:
+        logger.error(f"Error fetching latest leg data: {e}")
+        return None
+
+
+def latest_row(table):
+    """Newest row of a sensor table and its id ({} and 0 if the table is empty)"""
+    result = run_query(table, get_supabase().table(table)
+        .select("*")
+        .order("timestamp", desc=True)
+        .limit(1))
+    row = result.data[0] if result.data else {}
+    return row, row.get('id') or 0
+
+
+def parse_live_cursor(value):
+    """
+    Parse a live-data cursor 'leg.chest.event_id' (None if absent/invalid).
+    Sensor parts are Supabase row ids, or negated shared-frame sequences when
+    the row came from shared memory.
+    """
+    if not value:
+        return None
+    try:
+        leg_id, chest_id, event_id = (int(part) for part in value.split('.'))
+        return leg_id, chest_id, event_id
+    except ValueError:
+        return None
+
+
+def parse_event_cursor(value):
+    """Parse an events cursor '<timestamp>,<id>' into (ISO timestamp, id); raises ValueError"""
+    timestamp, _, event_id = value.rpartition(',')
+    parsed = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    return parsed.isoformat(), int(event_id)
+
+
+def format_event_cursor(event):
+    """Cursor continuing after an event row (the oldest one on a page)"""
+    return f"{event['timestamp']},{event['id']}"
+
+
+def format_live_cursor(seq):
+    """Inverse of parse_live_cursor"""
+    return '.'.join(str(part) for part in seq)
+
+
+def live_event_cursor(events, cursor):
+    """
+    Event id the live-data cursor may move to. Ids are drawn before the insert
+    commits, so with several WAL flushers a lower id can become visible after
+    a higher one. The cursor only passes events inserted (created_at) more
+    than LIVE_EVENTS_SETTLE ago, by which time every lower id has committed;
+    newer ones are sent again on the next poll and the client keeps one copy.
+    """
+    horizon = datetime.now(timezone.utc) - timedelta(seconds=LIVE_EVENTS_SETTLE)
+    settled = [
+        e['id'] for e in events
+        if e.get('created_at') and datetime.fromisoformat(e['created_at'].replace('Z', '+00:00')) <= horizon
+    ]
+    return max(settled + [cursor])
+
+
+def create_event(event_type, severity, leg, chest, description="", extra=None):
+    """Create event in database and trigger Telegram alert if needed (leg/chest are sample records)"""
     try:
         event_data = {
+            "timestamp": chest.timestamp or datetime.now().isoformat(),
             "event_type": event_type,
             "severity": severity,
-            "latitude": chest_data.get('latitude'),  # GPS is on chest now
-            "longitude": chest_data.get('longitude'),
-            "speed": chest_data.get('speed'),
-            "leg_accel_x": leg_data.get('accel_x'),
-            "leg_accel_y": leg_data.get('accel_y'),
-            "leg_accel_z": leg_data.get('accel_z'),
-            "chest_accel_x": chest_data.get('accel_x'),
-            "chest_accel_y": chest_data.get('accel_y'),
-            "chest_accel_z": chest_data.get('accel_z'),
+            "latitude": first_present(chest.smoothed_latitude, chest.latitude),  # GPS is on chest now
+            "longitude": first_present(chest.smoothed_longitude, chest.longitude),
+            "speed": first_present(chest.smoothed_speed, chest.speed),
+            "leg_accel_x": leg.accel_x,
+            "leg_accel_y": leg.accel_y,
+            "leg_accel_z": leg.accel_z,
+            "chest_accel_x": chest.accel_x,
+            "chest_accel_y": chest.accel_y,
+            "chest_accel_z": chest.accel_z,
             "description": description
         }
+        if extra:
+            event_data.update(extra)
+        if event_data["latitude"] is not None and event_data["longitude"] is not None:
+            event_data["geohash"] = geo.encode(event_data["latitude"], event_data["longitude"])
         
-        result = supabase.table("events").insert(event_data).execute()
+        # Notify first so the notification status is stored with the event
+        if severity in ['HIGH', 'CRITICAL'] and notify_telegram(event_type, event_data):
+            event_data["telegram_notified"] = True
+            event_data["telegram_sent_at"] = datetime.now().isoformat()
         
-        # Trigger Telegram notification for critical events
-        if severity in ['HIGH', 'CRITICAL']:
-            notify_telegram(event_type, event_data)
+        # Queued through the WAL like sensor samples
+        get_ingest_wal().append("events", event_data)
+        EVENTS_TOTAL.labels(event_type, severity).inc()
+        get_dashboard_summary().add_event(chest.rider_id or leg.rider_id or DEFAULT_RIDER, chest.epoch or time.time(), severity)
         
-        return result
+        return event_data
         
     except Exception as e:
         logger.error(f"Error creating event: {e}")
         return None
 
 
+def get_telegram_subscribers():
+    """Chat ids of linked users with notifications enabled (shared by all workers, refreshed every TTL)"""
+    shared = get_shared_state()
+    chat_ids = shared.get(TELEGRAM_SUBSCRIBERS_KEY, max_age=TELEGRAM_SUBSCRIBERS_TTL)
+    if chat_ids is None:
+        users = run_query("telegram_users", get_supabase().table("telegram_users")
+            .select("telegram_chat_id")
+            .eq("is_linked", True)
+            .eq("notifications_enabled", True))
+        chat_ids = [user['telegram_chat_id'] for user in users.data or []]
+        try:
+            shared.put(TELEGRAM_SUBSCRIBERS_KEY, chat_ids)
+        except ValueError:
+            pass  # Too many to share; every worker queries Supabase
+    return chat_ids
+
+
 def notify_telegram(event_type, event_data):
-    """Send notification to linked Telegram users"""
+    """Send notification to linked Telegram users; returns True if anyone was notified"""
     try:
-        import requests
-        
-        # Get all linked users with notifications enabled
-        users = supabase.table("telegram_users")\
-            .select("telegram_chat_id")\
-            .eq("is_linked", True)\
-            .eq("notifications_enabled", True)\
-            .execute()
-        
-        if not users.data:
-            return
+        chat_ids = get_telegram_subscribers()
+        if not chat_ids:
+            return False
         
         # Prepare message
         message = f"🚨 *{event_type.replace('_', ' ')}*\n\n"
@@ -225,24 +580,210 @@ def notify_telegram(event_type, event_data):
         message += f"\n\n⏰ Time: {datetime.now().strftime('%H:%M:%S')}"
         
         # Send to all users
-        for user in users.data:
-            chat_id = user['telegram_chat_id']
-            url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+        for chat_id in chat_ids:
+            url = f"{TELEGRAM_API_URL}/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
             payload = {
                 "chat_id": chat_id,
                 "text": message,
                 "parse_mode": "Markdown"
             }
-            requests.post(url, json=payload, timeout=5)
+            with TELEGRAM_SEND_SECONDS.time():
+                get_telegram_session().post(url, json=payload, timeout=5)
         
-        # Update event as notified
-        supabase.table("events")\
-            .update({"telegram_notified": True, "telegram_sent_at": datetime.now().isoformat()})\
-            .eq("id", event_data.get('id'))\
-            .execute()
+        return True
         
     except Exception as e:
         logger.error(f"Telegram notification error: {e}")
+        return False
+
+
+# =============================================
+# INGEST PIPELINE
+# =============================================
+
+def ingest_leg_sample(sample):
+    """Calibrate, enrich, queue and run detection for one leg sample (raises WALFull)"""
+    # Rider grouping for activity windows (not a telemetry column)
+    rider_id = sample.rider_id or DEFAULT_RIDER
+    
+    # Device calibration (gyro bias, accel scale, mounting tilt) before any detection
+    with span("calibration"):
+        calibration = get_calibration_store().get(sample.device_id)
+        calibration.correct_sample(sample)
+        if sample.imu_burst:
+            sample.imu_burst = calibration.correct_burst(sample.imu_burst)
+    
+    # Filtered attitude (from the IMU burst) for posture detection and the dashboard
+    with span("orientation", detector="orientation"):
+        sample.roll, sample.pitch, sample.lean_angle = get_orientation_bank().update(sample)
+    
+    # Queue for Supabase (acknowledged once it is in the local WAL)
+    row = sample.to_row()
+    with span("wal"):
+        get_ingest_wal().append("esp32_leg_data", row)
+    with span("shared"):
+        publish_frame('leg', rider_id, row)
+    with span("activity"):
+        get_activity_engine().add(rider_id, 'leg', sample, t=sample.epoch)
+        get_activity_engine().start()
+    if sample.imu_burst:
+        with span("impact", detector="impact"):
+            process_imu_burst(rider_id, sample, sample, latest_sample('chest', rider_id) or ChestSample())
+    
+    if sampled():
+        logger.info(f"Leg data received: Accel({sample.accel_x}, {sample.accel_y}, {sample.accel_z})")
+
+
+def ingest_chest_sample(sample):
+    """Calibrate, enrich, queue and run detection for one chest sample (raises WALFull)"""
+    # Rider grouping for activity windows (not a telemetry column)
+    rider_id = sample.rider_id or DEFAULT_RIDER
+    
+    # Device calibration (gyro bias, accel scale, mounting tilt) before any detection
+    with span("calibration"):
+        calibration = get_calibration_store().get(sample.device_id)
+        calibration.correct_sample(sample)
+        if sample.imu_burst:
+            sample.imu_burst = calibration.correct_burst(sample.imu_burst)
+    
+    # Smoothed track (position, speed, heading) for detection, rides and the map
+    with span("tracking", detector="gps_kalman"):
+        smoothed = get_track_smoother().update(sample)
+    if smoothed:
+        sample.smoothed_latitude = smoothed['latitude']
+        sample.smoothed_longitude = smoothed['longitude']
+        sample.smoothed_speed = smoothed['speed']
+        sample.smoothed_heading = smoothed['heading']
+    
+    # Filtered attitude (from the IMU burst) for posture detection and the dashboard
+    with span("orientation", detector="orientation"):
+        sample.roll, sample.pitch, sample.lean_angle = get_orientation_bank().update(sample)
+    
+    # Spatial index key for GPS points
+    if sample.latitude is not None and sample.longitude is not None:
+        sample.geohash = geo.encode(sample.latitude, sample.longitude)
+    
+    # Queue for Supabase (acknowledged once it is in the local WAL)
+    row = sample.to_row()
+    with span("wal"):
+        get_ingest_wal().append("esp32_chest_data", row)
+    with span("shared"):
+        publish_frame('chest', rider_id, row)
+    with span("activity"):
+        get_activity_engine().add(rider_id, 'chest', sample, t=sample.epoch)
+        get_activity_engine().start()
+    get_impact_detector().add_speed(rider_id, sample.epoch, first_present(sample.smoothed_speed, sample.speed))
+    
+    # Leg sample for the activity fallback and event checks
+    # (shared memory; Supabase before any worker saw one)
+    leg = latest_sample('leg', rider_id)
+    if leg is None:
+        with span("latest_leg"):
+            leg = get_latest_leg_from_db()
+    
+    # Dashboard trends (rolling windows, O(1) per sample)
+    with span("summary"):
+        prediction = latest_activity(rider_id)
+        activity = prediction[0] if prediction else (detect_activity_type(leg, sample) if leg else None)
+        get_dashboard_summary().add_sample(
+            rider_id, sample.epoch,
+            speed=first_present(sample.smoothed_speed, sample.speed),
+            latitude=first_present(sample.smoothed_latitude, sample.latitude),
+            longitude=first_present(sample.smoothed_longitude, sample.longitude),
+            activity=activity
+        )
+    
+    if sampled():
+        logger.info(f"Chest data received: GPS({sample.latitude}, {sample.longitude}), Speed: {sample.speed}")
+    
+    # Check for events (harsh brake, acceleration, fall detection)
+    if sample.imu_burst:
+        with span("impact", detector="impact"):
+            process_imu_burst(rider_id, sample, leg or LegSample(), sample)
+    
+    if leg:
+        # Check harsh braking
+        if check_harsh_brake(leg.accel_x):
+            create_event(
+                "HARSH_BRAKE",
+                "MEDIUM",
+                leg,
+                sample,
+                f"Harsh braking detected: {leg.accel_x} m/s²"
+            )
+        
+        # Check harsh acceleration
+        if check_harsh_acceleration(leg.accel_x):
+            create_event(
+                "HARSH_ACCEL",
+                "LOW",
+                leg,
+                sample,
+                f"Harsh acceleration detected: {leg.accel_x} m/s²"
+            )
+        
+        # Check fall/accident (single-sample comparison; riders whose
+        # firmware uploads IMU bursts are scored by the impact detector)
+        if not get_impact_detector().has_stream(rider_id):
+            is_fall, difference = check_fall_or_accident(leg, sample)
+            if is_fall:
+                create_event(
+                    "FALL_DETECTED",
+                    "CRITICAL",
+                    leg,
+                    sample,
+                    f"Potential fall or accident detected! Sensor difference: {difference:.2f}"
+                )
+
+
+# =============================================
+# METRICS & TRACING
+# =============================================
+
+@app.before_request
+def admit_request():
+    """Start the request timer and claim an in-flight slot (429 when saturated)"""
+    g.request_started = time.perf_counter()
+    g.spans = []
+    if request.endpoint in ADMISSION_EXEMPT:
+        return None
+    if not admission.enter():
+        return shed("overloaded", admission.overload_retry_after())
+    g.admitted = True
+    return None
+
+
+@app.teardown_request
+def release_request_slot(exc):
+    if g.pop('admitted', False):
+        admission.leave()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Request latency histograms and a Server-Timing header with the request's spans"""
+    started = g.get('request_started')
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    endpoint = request.endpoint or 'unknown'
+    
+    REQUEST_SECONDS.labels(endpoint, request.method, response.status_code).observe(elapsed)
+    if endpoint in INGEST_ENDPOINTS:
+        INGEST_SECONDS.labels(INGEST_ENDPOINTS[endpoint]).observe(elapsed)
+    response.headers['Server-Timing'] = server_timing(g.spans, elapsed)
+    return response
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus scrape endpoint (every worker's values with PROMETHEUS_MULTIPROC_DIR, see metrics.py)"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import CollectorRegistry, multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
 
 
 # =============================================
@@ -273,27 +814,39 @@ def receive_leg_data():
         "gyro_z": 0.02,
         "temperature": 28.5
     }
+    or an array of such samples, oldest first, that the device queued while
+    shed (each with "age_ms"). 429/503 responses carry Retry-After; they
+    and 202s carry the upload "policy" (idle_ms / moving_ms).
     """
     try:
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({"error": "No data provided"}), 400
+        # Typed records (unknown keys, bad types and out-of-range values rejected before any I/O)
+        received = time.time()
+        try:
+            samples = LegSample.parse_batch(request.get_json(silent=True))
+        except ValidationError as e:
+            return jsonify({"error": "Invalid leg sample", "details": e.errors}), 400
         
-        # Add timestamp if not provided
-        if 'timestamp' not in data:
-            data['timestamp'] = datetime.now().isoformat()
+        # Per-device rate limit (one token per request, so batches are cheap)
+        retry_after = admission.admit_device(samples[0].device_id)
+        if retry_after:
+            return shed("rate_limited", retry_after)
         
-        # Insert into database
-        result = supabase.table("esp32_leg_data").insert(data).execute()
+        # Capture times on the server's clock (device clocks are checked against arrival)
+        get_clock_offsets().correct(samples, received)
         
-        logger.info(f"Leg data received: Accel({data.get('accel_x')}, {data.get('accel_y')}, {data.get('accel_z')})")
+        for accepted, sample in enumerate(samples):
+            try:
+                ingest_leg_sample(sample)
+            except WALFull as e:
+                logger.warning(f"Shedding leg samples: {e}")
+                return shed("wal_full", 5, "Ingest buffer full, retry later", status=503, accepted=accepted)
         
         return jsonify({
             "status": "success",
-            "message": "Leg sensor data recorded",
-            "id": result.data[0]['id'] if result.data else None
-        }), 201
+            "message": "Leg sensor data queued",
+            "accepted": len(samples),
+            "policy": admission.upload_policy()
+        }), 202
         
     except Exception as e:
         logger.error(f"Error receiving leg data: {e}")
@@ -321,73 +874,84 @@ def receive_chest_data():
         "gyro_z": 0.01,
         "temperature": 27.8
     }
+    or an array of such samples, oldest first (see receive_leg_data)
     """
     try:
-        data = request.get_json()
+        # Typed records (unknown keys, bad types and out-of-range values rejected before any I/O)
+        received = time.time()
+        try:
+            samples = ChestSample.parse_batch(request.get_json(silent=True))
+        except ValidationError as e:
+            return jsonify({"error": "Invalid chest sample", "details": e.errors}), 400
         
-        if not data:
-            return jsonify({"error": "No data provided"}), 400
+        # Per-device rate limit (one token per request, so batches are cheap)
+        retry_after = admission.admit_device(samples[0].device_id)
+        if retry_after:
+            return shed("rate_limited", retry_after)
         
-        # Add timestamp if not provided
-        if 'timestamp' not in data:
-            data['timestamp'] = datetime.now().isoformat()
+        # Capture times on the server's clock (device clocks are checked against arrival)
+        get_clock_offsets().correct(samples, received)
         
-        # Insert into database
-        result = supabase.table("esp32_chest_data").insert(data).execute()
+        for accepted, sample in enumerate(samples):
+            try:
+                ingest_chest_sample(sample)
+            except WALFull as e:
+                logger.warning(f"Shedding chest samples: {e}")
+                return shed("wal_full", 5, "Ingest buffer full, retry later", status=503, accepted=accepted)
         
-        logger.info(f"Chest data received: GPS({data.get('latitude')}, {data.get('longitude')}), Speed: {data.get('speed')}")
+        return jsonify({
+            "status": "success",
+            "message": "Chest sensor data queued",
+            "accepted": len(samples),
+            "policy": admission.upload_policy()
+        }), 202
         
-        # Check for events (harsh brake, acceleration, fall detection)
-        # Get latest leg data to compare
-        leg_data_result = supabase.table("esp32_leg_data")\
-            .select("*")\
-            .order("timestamp", desc=True)\
-            .limit(1)\
-            .execute()
+    except Exception as e:
+        logger.error(f"Error receiving chest data: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/calibration', methods=['POST'])
+def receive_calibration():
+    """
+    Boot-time IMU calibration from an ESP32 (averaged while the device rests)
+    Expected JSON:
+    {
+        "device_id": "ESP32_LEG",
+        "gyro_bias": [0.012, -0.004, 0.001],
+        "rest_accel": [0.35, -0.12, 9.74],
+        "samples": 100
+    }
+    """
+    try:
+        data = request.get_json()
         
-        if leg_data_result.data:
-            leg_data = leg_data_result.data[0]
-            chest_data = data
-            
-            # Check harsh braking
-            if check_harsh_brake(leg_data.get('accel_x', 0)):
-                create_event(
-                    "HARSH_BRAKE",
-                    "MEDIUM",
-                    leg_data,
-                    chest_data,
-                    f"Harsh braking detected: {leg_data.get('accel_x')} m/s²"
-                )
-            
-            # Check harsh acceleration
-            if check_harsh_acceleration(leg_data.get('accel_x', 0)):
-                create_event(
-                    "HARSH_ACCEL",
-                    "LOW",
-                    leg_data,
-                    chest_data,
-                    f"Harsh acceleration detected: {leg_data.get('accel_x')} m/s²"
-                )
-            
-            # Check fall/accident
-            is_fall, difference = check_fall_or_accident(leg_data, chest_data)
-            if is_fall:
-                create_event(
-                    "FALL_DETECTED",
-                    "CRITICAL",
-                    leg_data,
-                    chest_data,
-                    f"Potential fall or accident detected! Sensor difference: {difference:.2f}"
-                )
+        if not data or not data.get('device_id'):
+            return jsonify({"error": "device_id is required"}), 400
+        
+        try:
+            calibration = get_calibration_store().put(data['device_id'], data.get('gyro_bias'), data.get('rest_accel'))
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": f"Invalid calibration: {e}"}), 400
         
         return jsonify({
             "status": "success",
-            "message": "Chest sensor data recorded",
-            "id": result.data[0]['id'] if result.data else None
+            "device_id": calibration.device_id,
+            "version": calibration.version
         }), 201
         
     except Exception as e:
-        logger.error(f"Error receiving chest data: {e}")
+        logger.error(f"Error storing calibration: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/calibration/<device_id>', methods=['GET'])
+def get_calibration(device_id):
+    """Calibration currently applied to a device's samples (version 0 = none)"""
+    try:
+        return jsonify(get_calibration_store().get(device_id, wait=True).to_row()), 200
+    except Exception as e:
+        logger.error(f"Error fetching calibration: {e}")
         return jsonify({"error": str(e)}), 500
 
 
@@ -396,43 +960,79 @@ def get_live_data():
     """
     Get latest combined sensor data for frontend
     Returns matched data from both sensors (within 2 seconds)
+    
+    Optional: ?since=<seq> (the "seq" from a previous response) returns a delta.
+    Sensor rows and activity_type are only included if they changed, and
+    recent_events only holds events newer than the cursor: the oldest
+    LIVE_EVENTS_LIMIT of them, newest first. The cursor advances only past the
+    events returned, and not past the last few seconds of inserts (see
+    live_event_cursor), so recent events may be sent twice: de-dupe them by
+    id. has_more is true when more are waiting.
     """
     try:
-        # Get latest leg data
-        leg_result = supabase.table("esp32_leg_data")\
-            .select("*")\
-            .order("timestamp", desc=True)\
-            .limit(1)\
-            .execute()
+        since = parse_live_cursor(request.args.get('since'))
+        rider_id = request.args.get('rider_id', DEFAULT_RIDER)
         
-        # Get latest chest data
-        chest_result = supabase.table("esp32_chest_data")\
-            .select("*")\
-            .order("timestamp", desc=True)\
-            .limit(1)\
-            .execute()
+        # Latest frames from shared memory (any worker's ingest); Supabase only until one exists
+        with span("shared"):
+            leg_frame = latest_frame('leg', rider_id)
+            chest_frame = latest_frame('chest', rider_id)
         
-        leg_data = leg_result.data[0] if leg_result.data else {}
-        chest_data = chest_result.data[0] if chest_result.data else {}
+        with span("query"):
+            # Cursor parts: Supabase row ids, or negated shared-frame sequences
+            leg_data, leg_part = (leg_frame[0], -leg_frame[1]) if leg_frame else latest_row("esp32_leg_data")
+            chest_data, chest_part = (chest_frame[0], -chest_frame[1]) if chest_frame else latest_row("esp32_chest_data")
+            
+            # Get recent events (only the ones the client has not seen yet, oldest
+            # first from the cursor so none are skipped when many arrive at once)
+            events_query = get_supabase().table("events").select("*")
+            if since:
+                events_query = events_query.gt("id", since[2]).order("id").limit(LIVE_EVENTS_LIMIT + 1)
+            else:
+                events_query = events_query.order("timestamp", desc=True).limit(10)
+            events_result = run_query("events", events_query)
         
-        # Detect activity type
-        activity = detect_activity_type(leg_data, chest_data) if leg_data and chest_data else 'UNKNOWN'
+        recent_events = events_result.data if events_result.data else []
+        if since:
+            event_part = live_event_cursor(recent_events[:LIVE_EVENTS_LIMIT], since[2])
+            # A full page of unsettled events cannot move the cursor; wait for the next poll
+            has_more = len(recent_events) > LIVE_EVENTS_LIMIT and event_part > since[2]
+            recent_events = recent_events[:LIVE_EVENTS_LIMIT][::-1]
+        else:
+            event_part = live_event_cursor(recent_events, min([e['id'] for e in recent_events], default=1) - 1)
+            has_more = False
         
-        # Get recent events
-        events_result = supabase.table("events")\
-            .select("*")\
-            .order("timestamp", desc=True)\
-            .limit(10)\
-            .execute()
+        seq = (leg_part, chest_part, event_part)
         
         response = {
             "timestamp": datetime.now().isoformat(),
-            "leg_sensor": leg_data,
-            "chest_sensor": chest_data,
-            "activity_type": activity,
-            "recent_events": events_result.data if events_result.data else []
+            "seq": format_live_cursor(seq),
+            "recent_events": recent_events,
+            "has_more": has_more
         }
         
+        leg_changed = not since or seq[0] != since[0]
+        chest_changed = not since or seq[1] != since[1]
+        
+        if leg_changed:
+            response["leg_sensor"] = leg_data
+        if chest_changed:
+            response["chest_sensor"] = chest_data
+        if leg_changed or chest_changed:
+            # Windowed classifier when any worker has a fresh prediction,
+            # otherwise the threshold rules on the latest pair of rows
+            prediction = latest_activity(rider_id)
+            if prediction:
+                response["activity_type"], response["activity_confidence"] = prediction
+            else:
+                with span("activity", detector="activity_rules"):
+                    if leg_data and chest_data:
+                        response["activity_type"] = detect_activity_type(LegSample.from_row(leg_data), ChestSample.from_row(chest_data))
+                    else:
+                        response["activity_type"] = 'UNKNOWN'
+        if since:
+            response["delta"] = True
+        
         return jsonify(response), 200
         
     except Exception as e:
@@ -440,6 +1040,21 @@ def get_live_data():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/dashboard/summary', methods=['GET'])
+def get_dashboard_summary_route():
+    """
+    Rolling trends for one rider: average / max speed, distance, time per
+    activity and event counts over the last minute, 5 minutes, hour and today.
+    Served from in-memory aggregates, so the cost does not grow with history.
+    """
+    try:
+        rider_id = request.args.get('rider_id', DEFAULT_RIDER)
+        return jsonify(get_dashboard_summary().summary(rider_id)), 200
+    except Exception as e:
+        logger.error(f"Error fetching dashboard summary: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route('/api/telegram/verify-pin', methods=['POST'])
 def verify_telegram_pin():
     """
@@ -453,33 +1068,19 @@ def verify_telegram_pin():
         if not pin:
             return jsonify({"success": False, "message": "PIN is required"}), 400
         
-        # Check if PIN exists and not expired
-        pin_result = supabase.table("telegram_pins")\
-            .select("*")\
-            .eq("pin_code", pin)\
-            .eq("is_used", False)\
-            .gt("expires_at", datetime.now().isoformat())\
-            .execute()
+        client_ip = request.headers.get('X-Real-IP', request.remote_addr)
+        if is_pin_verify_rate_limited(client_ip):
+            return jsonify({"success": False, "message": "Too many attempts. Try again in a minute."}), 429
         
-        if not pin_result.data:
-            return jsonify({"success": False, "message": "Invalid or expired PIN"}), 404
+        # Use the PIN and link the user atomically (see link_telegram_pin in setup.sql)
+        result = run_query("link_telegram_pin", get_supabase().rpc("link_telegram_pin", {"p_pin": pin}), operation="rpc")
+        chat_id = result.data
         
-        pin_data = pin_result.data[0]
-        chat_id = pin_data['telegram_chat_id']
-        
-        # Mark PIN as used
-        supabase.table("telegram_pins")\
-            .update({"is_used": True, "used_at": datetime.now().isoformat()})\
-            .eq("pin_code", pin)\
-            .execute()
-        
-        # Link user
-        supabase.table("telegram_users")\
-            .update({"is_linked": True, "linked_at": datetime.now().isoformat()})\
-            .eq("telegram_chat_id", chat_id)\
-            .execute()
+        if not chat_id:
+            return jsonify({"success": False, "message": "Invalid or expired PIN"}), 404
         
         logger.info(f"Telegram account linked: chat_id={chat_id}, pin={pin}")
+        get_shared_state().delete(TELEGRAM_SUBSCRIBERS_KEY)  # Next alert re-reads the subscribers
         
         return jsonify({
             "success": True,
@@ -493,21 +1094,64 @@ def verify_telegram_pin():
 
 @app.route('/api/events/recent', methods=['GET'])
 def get_recent_events():
-    """Get recent events with optional filtering"""
+    """
+    Events, newest first, one keyset page at a time
+    Query: ?limit=<n, max MAX_EVENTS_PAGE>&before=<timestamp,id>&type=<A,B>&severity=<A,B>
+           &start=<iso>&end=<iso>&min_lat&min_lon&max_lat&max_lon
+    Pass the response's next_before as ?before= for the next (older) page; it
+    is null on the last page. Each page is an index range scan on
+    (timestamp, id), however deep into history it is; a bounding box is
+    narrowed through the geohash index first.
+    """
     try:
-        limit = request.args.get('limit', 50, type=int)
-        event_type = request.args.get('type', None)
+        limit = max(1, min(request.args.get('limit', EVENTS_PAGE_SIZE, type=int), MAX_EVENTS_PAGE))
+        event_types = [t for t in request.args.get('type', '').split(',') if t]
+        severities = [s for s in request.args.get('severity', '').split(',') if s]
+        start = request.args.get('start')
+        end = request.args.get('end')
+        bbox = [request.args.get(key, type=float) for key in ('min_lat', 'min_lon', 'max_lat', 'max_lon')]
         
-        query = supabase.table("events").select("*")
+        try:
+            before = parse_event_cursor(request.args['before']) if request.args.get('before') else None
+        except ValueError:
+            return jsonify({"error": "before must be '<timestamp>,<id>' (a previous next_before)"}), 400
+        if bbox != [None] * 4 and (None in bbox or bbox[0] > bbox[2] or bbox[1] > bbox[3]):
+            return jsonify({"error": "A bounding box needs min_lat, min_lon, max_lat and max_lon"}), 400
         
-        if event_type:
-            query = query.eq("event_type", event_type)
+        query = get_supabase().table("events").select("*")
+        if event_types:
+            query = query.in_("event_type", event_types)
+        if severities:
+            query = query.in_("severity", severities)
+        if start:
+            query = query.gte("timestamp", start)
+        if end:
+            query = query.lt("timestamp", end)
+        if None not in bbox:
+            # Geohash prefixes covering the box -> indexed prefix scans (as in
+            # /api/events/near); the exact range check trims the cells' overhang
+            prefixes = geo.covering_prefixes(*bbox)
+            if prefixes != {""}:
+                query = query.or_(",".join(f"geohash.like.{prefix}*" for prefix in sorted(prefixes)))
+            query = query.gte("latitude", bbox[0]).lte("latitude", bbox[2])\
+                .gte("longitude", bbox[1]).lte("longitude", bbox[3])
+        if before:
+            # Strictly older than the cursor row; id breaks timestamp ties
+            timestamp, event_id = before
+            query = query.or_(f'timestamp.lt."{timestamp}",and(timestamp.eq."{timestamp}",id.lt.{event_id})')
         
-        result = query.order("timestamp", desc=True).limit(limit).execute()
+        with span("query"):
+            result = run_query("events", query
+                .order("timestamp", desc=True)
+                .order("id", desc=True)
+                .limit(limit))
+        events = result.data or []
+        next_before = format_event_cursor(events[-1]) if len(events) == limit else None
         
         return jsonify({
-            "events": result.data if result.data else [],
-            "count": len(result.data) if result.data else 0
+            "events": events,
+            "count": len(events),
+            "next_before": next_before
         }), 200
         
     except Exception as e:
@@ -515,10 +1159,151 @@ def get_recent_events():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/events/near', methods=['GET'])
+def get_events_near():
+    """
+    Events within a radius of a point, nearest first
+    Query: ?lat=<deg>&lon=<deg>&radius=<metres, default 500>&type=<A,B>&limit=<n>
+    """
+    try:
+        lat = request.args.get('lat', type=float)
+        lon = request.args.get('lon', type=float)
+        radius = min(request.args.get('radius', 500, type=float), MAX_NEAR_RADIUS_M)
+        limit = min(request.args.get('limit', 50, type=int), MAX_SPATIAL_RESULTS)
+        event_types = [t for t in request.args.get('type', '').split(',') if t]
+        
+        if lat is None or lon is None or not -90 <= lat <= 90 or not -180 <= lon <= 180:
+            return jsonify({"error": "Valid lat and lon are required"}), 400
+        
+        # Geohash prefixes covering the search circle -> indexed prefix scans
+        prefixes = geo.covering_prefixes(*geo.bounding_box(lat, lon, radius))
+        query = get_supabase().table("events")\
+            .select("*")\
+            .or_(",".join(f"geohash.like.{prefix}*" for prefix in sorted(prefixes)))
+        if event_types:
+            query = query.in_("event_type", event_types)
+        result = run_query("events", query.order("timestamp", desc=True).limit(MAX_NEAR_CANDIDATES))
+        
+        # Exact distance filter on the (small) candidate set
+        events = []
+        for event in result.data or []:
+            distance = geo.haversine_m(lat, lon, event['latitude'], event['longitude'])
+            if distance <= radius:
+                event['distance_m'] = round(distance, 1)
+                events.append(event)
+        events.sort(key=lambda e: e['distance_m'])
+        events = events[:limit]
+        
+        return jsonify({
+            "events": events,
+            "count": len(events)
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Error fetching nearby events: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/events/hotspots', methods=['GET'])
+def get_event_hotspots():
+    """
+    Clusters of events inside a bounding box (pre-aggregated on insert)
+    Query: ?min_lat&min_lon&max_lat&max_lon&type=<A,B> (default harsh brakes and falls)
+    """
+    try:
+        bbox = [request.args.get(key, type=float) for key in ('min_lat', 'min_lon', 'max_lat', 'max_lon')]
+        limit = min(request.args.get('limit', 100, type=int), MAX_SPATIAL_RESULTS)
+        event_types = [t for t in request.args.get('type', 'HARSH_BRAKE,FALL_DETECTED').split(',') if t]
+        
+        if None in bbox or bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+            return jsonify({"error": "min_lat, min_lon, max_lat and max_lon are required"}), 400
+        min_lat, min_lon, max_lat, max_lon = bbox
+        
+        precision = geo.hotspot_precision(min_lat, min_lon, max_lat, max_lon)
+        result = run_query("event_hotspots", get_supabase().table("event_hotspots")
+            .select("cell,event_type,event_count,sum_latitude,sum_longitude,last_event_at")
+            .eq("precision", precision)
+            .in_("event_type", event_types)
+            .gte("latitude", min_lat)
+            .lte("latitude", max_lat)
+            .gte("longitude", min_lon)
+            .lte("longitude", max_lon)
+            .order("event_count", desc=True)
+            .limit(limit * len(event_types)))
+        
+        # Merge the per-type rows of each cell into one cluster
+        clusters = {}
+        for row in result.data or []:
+            cluster = clusters.setdefault(row['cell'], {
+                "cell": row['cell'],
+                "count": 0,
+                "by_type": {},
+                "sum_latitude": 0.0,
+                "sum_longitude": 0.0,
+                "last_event_at": row['last_event_at']
+            })
+            cluster["count"] += row['event_count']
+            cluster["by_type"][row['event_type']] = row['event_count']
+            cluster["sum_latitude"] += row['sum_latitude']
+            cluster["sum_longitude"] += row['sum_longitude']
+            cluster["last_event_at"] = max(cluster["last_event_at"] or '', row['last_event_at'] or '') or None
+        
+        hotspots = []
+        for cluster in clusters.values():
+            cluster["latitude"] = cluster.pop("sum_latitude") / cluster["count"]
+            cluster["longitude"] = cluster.pop("sum_longitude") / cluster["count"]
+            hotspots.append(cluster)
+        hotspots.sort(key=lambda c: c["count"], reverse=True)
+        hotspots = hotspots[:limit]
+        
+        return jsonify({
+            "precision": precision,
+            "hotspots": hotspots,
+            "count": len(hotspots)
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Error fetching event hotspots: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/export/<table>', methods=['GET'])
+def export_telemetry(table):
+    """
+    Stream a time range of telemetry as compressed columnar data
+    Query: ?start=<iso>&end=<iso>&format=arrow|parquet
+    table: leg, chest or events
+    """
+    start = request.args.get('start')
+    end = request.args.get('end')
+    fmt = request.args.get('format', 'arrow')
+    
+    if table not in EXPORT_TABLES:
+        return jsonify({"error": f"Unknown table, expected one of {sorted(EXPORT_TABLES)}"}), 400
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"Unknown format, expected one of {sorted(EXPORT_FORMATS)}"}), 400
+    if not start or not end:
+        return jsonify({"error": "start and end are required"}), 400
+    
+    extension = 'arrows' if fmt == 'arrow' else 'parquet'
+    filename = f"{table}_{start[:10]}_{end[:10]}.{extension}"
+    
+    return Response(
+        stream_with_context(stream_export(get_supabase(), table, start, end, fmt)),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
 # =============================================
 # RUN SERVER
 # =============================================
 
 if __name__ == '__main__':
-    port = int(os.getenv('PORT', 7777))
-    app.run(host='0.0.0.0', port=port, debug=True)
+    if '--profile-startup' in sys.argv[1:]:
+        # Cold-start breakdown by imported package (python -X importtime)
+        from startup_profile import print_startup_profile
+        print_startup_profile(__file__)
+    else:
+        port = int(os.getenv('PORT', 7777))
+        app.run(host='0.0.0.0', port=port, debug=True)
@@ -0,0 +1,257 @@
+# Shared State Across Workers - Ignition Hackathon
+# A small key -> JSON store in a memory-mapped file (tmpfs by default), so
+# every worker process on the host sees the same latest frames, activity
+# predictions, device calibrations and Telegram subscribers without going
+# back to Supabase. The per-device detector state lives here too (clock
+# offsets, GPS tracks, attitudes; activity windows and IMU buffers in a
+# second file with larger slots), so each rider is smoothed and classified
+# on all of its samples, whichever worker ingested them.
+#
+#   reads   lock-free: each slot is a seqlock (odd sequence = write in
+#           progress); a reader copies the slot and retries if the sequence
+#           moved underneath it
+#   writes  serialized across processes with flock on the file (and a thread
+#           lock inside the process)
+#
+# Every write bumps the slot's sequence, so it doubles as a change cursor:
+# a poller that remembers the sequence knows whether a key changed.
+#
+# File layout:
+#   [0:64)      header: magic, version, slot count, slot size
+#   [64:...)    slots: u64 sequence | u32 key length | u32 value length |
+#               f64 updated (epoch) | key | JSON value
+# Keys are placed by crc32 with linear probing and never move; a value length
+# of 0 marks a deleted key.
+
+import fcntl
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+
+SHARED_STATE_PATH = os.getenv(
+    "SHARED_STATE_PATH",
+    "/dev/shm/ignition-state" if os.path.isdir("/dev/shm") else os.path.join(tempfile.gettempdir(), "ignition-state")
+)
+SHARED_SLOTS = int(os.getenv("SHARED_SLOTS", 4096))
+SHARED_SLOT_SIZE = 4096  # Bytes per key (a chest frame is ~700)
+DETECTOR_STATE_PATH = os.getenv("DETECTOR_STATE_PATH", SHARED_STATE_PATH + "-detectors")
+DETECTOR_SLOTS = int(os.getenv("DETECTOR_SLOTS", 2048))  # Riders + devices
+DETECTOR_SLOT_SIZE = 16384  # Bytes per key (an activity window or IMU buffer is up to ~12 KB packed)
+MAX_KEY_BYTES = 128
+READ_RETRIES = 100
+
+MAGIC = b"ISHM"
+VERSION = 1
+HEADER = struct.Struct("<4sIII")  # magic, version, slots, slot size
+HEADER_SIZE = 64
+SEQ = struct.Struct("<Q")
+ENTRY = struct.Struct("<QIId")  # sequence, key length, value length, updated
+
+
+class SharedStateFull(Exception):
+    """Every slot holds another key"""
+
+
+class SharedState:
+    """Cross-process key -> JSON store; safe for threads and forked workers alike"""
+
+    def __init__(self, path=SHARED_STATE_PATH, slots=SHARED_SLOTS, slot_size=SHARED_SLOT_SIZE):
+        self.path = path
+        self.slots = slots
+        self.slot_size = slot_size
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+
+        size = HEADER_SIZE + slots * slot_size
+        self.file = os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o600), "r+b")
+        with self._write_lock():
+            if os.fstat(self.file.fileno()).st_size != size:
+                self.file.truncate(0)  # Zero everything if the layout changed
+                self.file.truncate(size)
+            self.map = mmap.mmap(self.file.fileno(), size)
+            if HEADER.unpack_from(self.map, 0) != (MAGIC, VERSION, slots, slot_size):
+                self.map[:] = bytes(size)
+                HEADER.pack_into(self.map, 0, MAGIC, VERSION, slots, slot_size)
+
+    def _write_lock(self):
+        if self.pid != os.getpid():
+            # Forked after opening: flock is per open file, so the child needs its own
+            self.file = open(self.path, "r+b")
+            self.lock = threading.Lock()
+            self.pid = os.getpid()
+        return _FileLock(self.lock, self.file)
+
+    def _offset(self, index):
+        return HEADER_SIZE + index * self.slot_size
+
+    def _read_slot(self, offset):
+        """Consistent (sequence, key, value bytes, updated) snapshot of one slot"""
+        for _ in range(READ_RETRIES):
+            seq, key_len, value_len, updated = ENTRY.unpack_from(self.map, offset)
+            if seq & 1:
+                continue
+            start = offset + ENTRY.size
+            key = self.map[start:start + key_len]
+            value = self.map[start + key_len:start + key_len + value_len]
+            if SEQ.unpack_from(self.map, offset)[0] == seq:
+                return seq, key, value, updated
+        raise TimeoutError(f"Slot at {offset} kept changing while being read")
+
+    def _find(self, key, claim=False):
+        """Offset of the key's slot; with claim, the first empty slot on its probe path"""
+        start = zlib.crc32(key) % self.slots
+        for i in range(self.slots):
+            offset = self._offset((start + i) % self.slots)
+            _, found, _, _ = self._read_slot(offset)
+            if found == key:
+                return offset
+            if not found:
+                return offset if claim else None
+        if claim:
+            raise SharedStateFull(f"All {self.slots} shared slots are in use")
+        return None
+
+    def entry(self, key, max_age=None):
+        """(value, sequence, updated) for a key, or None if absent, deleted or older than max_age seconds"""
+        key = key.encode()
+        offset = self._find(key)
+        if offset is None:
+            return None
+        seq, found, value, updated = self._read_slot(offset)
+        if found != key or not value:
+            return None
+        if max_age is not None and updated < time.time() - max_age:
+            return None
+        return json.loads(value), seq // 2, updated
+
+    def get(self, key, max_age=None, default=None):
+        entry = self.entry(key, max_age)
+        return default if entry is None else entry[0]
+
+    def put(self, key, value):
+        """Store a JSON-serializable value; returns the key's new sequence"""
+        key = key.encode()
+        return self._write(key, self._encode(key, value))
+
+    def update(self, key, fn, default=None):
+        """
+        Atomic read-modify-write: store fn(current value, or default if absent)
+        and return it. The write lock is held throughout, so concurrent updates
+        from other workers are serialized rather than lost.
+        """
+        key = key.encode()
+        with self._write_lock():
+            current = default
+            offset = self._find(key)
+            if offset is not None:
+                _, found, value, _ = self._read_slot(offset)
+                if found == key and value:
+                    current = json.loads(value)
+            value = fn(current)
+            self._store(key, self._encode(key, value))
+        return value
+
+    def delete(self, key):
+        """Mark a key deleted (its slot stays reserved for it)"""
+        key = key.encode()
+        if self._find(key) is not None:
+            self._write(key, b"")
+
+    def items(self, prefix=""):
+        """[(key, value)] of every live key starting with prefix (a full scan: for periodic jobs, not per sample)"""
+        prefix = prefix.encode()
+        found = []
+        for index in range(self.slots):
+            _, key, value, _ = self._read_slot(self._offset(index))
+            if value and key.startswith(prefix):
+                found.append((key.decode(), json.loads(value)))
+        return found
+
+    def _encode(self, key, value):
+        data = json.dumps(value, separators=(",", ":")).encode()
+        if len(key) > MAX_KEY_BYTES or ENTRY.size + len(key) + len(data) > self.slot_size:
+            raise ValueError(f"Key or value too large for a {self.slot_size}-byte slot")
+        return data
+
+    def _write(self, key, data):
+        with self._write_lock():
+            return self._store(key, data)
+
+    def _store(self, key, data):
+        """Write one slot (write lock held)"""
+        offset = self._find(key, claim=True)
+        seq = SEQ.unpack_from(self.map, offset)[0]
+        SEQ.pack_into(self.map, offset, seq + 1)  # Readers back off
+        ENTRY.pack_into(self.map, offset, seq + 1, len(key), len(data), time.time())
+        start = offset + ENTRY.size
+        self.map[start:start + len(key) + len(data)] = key + data
+        SEQ.pack_into(self.map, offset, seq + 2)
+        return (seq + 2) // 2
+
+
+class LocalState:
+    """
+    The SharedState interface for a single process (CLIs, benchmarks): a dict
+    under a lock. Values are kept as given rather than copied through JSON.
+    """
+
+    def __init__(self):
+        self.values = {}  # key -> (value, sequence, updated)
+        self.lock = threading.Lock()
+
+    def entry(self, key, max_age=None):
+        entry = self.values.get(key)
+        if entry is None or (max_age is not None and entry[2] < time.time() - max_age):
+            return None
+        return entry
+
+    def get(self, key, max_age=None, default=None):
+        entry = self.entry(key, max_age)
+        return default if entry is None else entry[0]
+
+    def put(self, key, value):
+        with self.lock:
+            return self._store(key, value)
+
+    def update(self, key, fn, default=None):
+        with self.lock:
+            entry = self.values.get(key)
+            value = fn(default if entry is None else entry[0])
+            self._store(key, value)
+        return value
+
+    def delete(self, key):
+        with self.lock:
+            self.values.pop(key, None)
+
+    def items(self, prefix=""):
+        return [(key, entry[0]) for key, entry in list(self.values.items()) if key.startswith(prefix)]
+
+    def _store(self, key, value):
+        entry = self.values.get(key)
+        seq = entry[1] + 1 if entry else 1
+        self.values[key] = (value, seq, time.time())
+        return seq
+
+
+class _FileLock:
+    """Thread lock + exclusive flock, held together"""
+
+    __slots__ = ("lock", "file")
+
+    def __init__(self, lock, file):
+        self.lock = lock
+        self.file = file
+
+    def __enter__(self):
+        self.lock.acquire()
+        fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        self.lock.release()
@@ -0,0 +1,62 @@
+# Startup Profiling - Ignition Hackathon
+# Runs a service module in a fresh interpreter with `python -X importtime`
+# (without starting it) and prints where the cold start goes, grouped by
+# top-level package.
+#
+#   python server.py --profile-startup
+#   python telegram-bot/tele-bot.py --profile-startup
+#   python backend/startup_profile.py path/to/script.py
+
+import os
+import subprocess
+import sys
+import time
+
+# Executes the script's module-level code only (run_name != '__main__')
+_LOADER = "import runpy, sys; runpy.run_path(sys.argv[1], run_name='startup_profile')"
+
+
+def _run(args, cwd):
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, *args], cwd=cwd, capture_output=True, text=True)
+    return time.perf_counter() - started, result
+
+
+def import_breakdown(stderr):
+    """{top-level package: cumulative microseconds} from -X importtime output"""
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.startswith("  "):
+            continue  # Nested import, already counted in its parent
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(cumulative)
+    return packages
+
+
+def print_startup_profile(script, top=15):
+    script = os.path.abspath(script)
+    cwd = os.path.dirname(script)
+
+    baseline, _ = _run(["-c", "pass"], cwd)
+    total, result = _run(["-X", "importtime", "-c", _LOADER, script], cwd)
+    if result.returncode != 0:
+        print(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "startup failed")
+        sys.exit(result.returncode)
+
+    packages = import_breakdown(result.stderr)
+    imports = sum(packages.values()) / 1e6
+
+    print(f"Cold start of {os.path.basename(script)}: {total * 1000:.0f} ms "
+          f"(interpreter {baseline * 1000:.0f} ms, imports {imports * 1000:.0f} ms)")
+    print(f"{'package':<28}{'ms':>10}")
+    for package, us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"{package:<28}{us / 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("usage: python startup_profile.py SCRIPT")
+    print_startup_profile(sys.argv[1])
@@ -0,0 +1,231 @@
+# Dashboard Aggregates - Ignition Hackathon
+# Per-rider trends for /api/dashboard/summary, maintained as samples and
+# events arrive: mean / max speed, distance, time per activity and event
+# counts over the last minute, 5 minutes, hour and today.
+#
+# Each window is a ring of fixed-width buckets with running totals. A sample
+# adds to its bucket and to the totals; buckets that fall out of the window
+# are subtracted as the ring advances. Updates are O(1) and a read costs at
+# most one pass over a window's buckets (for the max speed), never over the
+# samples themselves.
+#
+# Each rider's windows are one key in a shared-memory store (shared.py, in a
+# file of its own with larger slots), updated with an atomic read-modify-write.
+# Every worker adds to and reads the same aggregates, whichever one ingested
+# the sample. The windows are flat arrays of doubles, so the round-trip is a
+# byte copy (~0.3 ms per sample).
+
+import base64
+import functools
+import os
+import time
+from array import array
+from datetime import datetime
+
+import geo
+from activity import ACTIVITIES
+from shared import SHARED_STATE_PATH
+
+WINDOWS = (
+    # name, span (s), bucket width (s), aligned to local midnight
+    ("1m", 60, 5, False),
+    ("5m", 300, 10, False),
+    ("1h", 3600, 60, False),
+    ("day", 86400, 86400, True),
+)
+ACTIVITY_KINDS = ACTIVITIES + ('UNKNOWN',)
+MAX_SAMPLE_GAP = 120.0  # Seconds; longer silences are not counted as riding time
+MAX_PLAUSIBLE_SPEED = 100.0  # m/s; faster jumps between fixes are GPS glitches, not distance
+SUMMARY_STATE_PATH = os.getenv("SUMMARY_STATE_PATH", SHARED_STATE_PATH + "-summary")
+SUMMARY_SLOTS = int(os.getenv("SUMMARY_SLOTS", 1024))  # Riders
+SUMMARY_SLOT_SIZE = 16384  # Bytes per rider (every window is ~13.7 KB packed)
+
+# Bucket / total layout: one float per field
+SAMPLES, SPEED_SUM, DISTANCE, EVENTS, CRITICAL = range(5)
+ACTIVITY_FIELD = {activity: 5 + i for i, activity in enumerate(ACTIVITY_KINDS)}
+FIELDS = 5 + len(ACTIVITY_KINDS)
+TOTALS = 1  # Window array: [head bucket number, totals..., slots...]
+STRIDE = 2 + FIELDS  # Per slot: bucket number (-1 if empty), max speed, fields
+
+
+@functools.lru_cache(maxsize=None)
+def _empty_ring(count):
+    data = array('d', [0.0]) * (TOTALS + FIELDS + count * STRIDE)
+    data[0] = -1.0
+    for slot in range(count):
+        data[TOTALS + FIELDS + slot * STRIDE] = -1.0
+    return data.tobytes()
+
+
+class RollingWindow:
+    """
+    Bucket ring with running totals over the last `span` seconds (not thread-safe).
+    All state is one flat array of doubles (see TOTALS / STRIDE), so it moves
+    through shared memory as raw bytes.
+    """
+
+    __slots__ = ("span", "width", "aligned", "count", "data")
+
+    def __init__(self, span, width, aligned=False, state=None):
+        self.span = span
+        self.width = width
+        self.aligned = aligned
+        self.count = max(1, span // width)
+        self.data = array('d', base64.b64decode(state)) if state else array('d')
+        if len(self.data) != TOTALS + FIELDS + self.count * STRIDE:
+            # Fresh (or a layout from an older version): empty ring, no head yet
+            self.data = array('d', _empty_ring(self.count))
+
+    def state(self):
+        return base64.b64encode(self.data.tobytes()).decode()
+
+    def _base(self, slot):
+        return TOTALS + FIELDS + slot * STRIDE
+
+    def _bucket(self, t):
+        if self.aligned:
+            t += time.localtime(t).tm_gmtoff
+        return int(t // self.width)
+
+    def advance(self, t):
+        """Expire buckets that fell out of the window by time t"""
+        number = self._bucket(t)
+        head = int(self.data[0])
+        if head < 0 or number - head >= self.count:
+            for slot in range(self.count):
+                self._clear(slot)
+        else:
+            for expired in range(head + 1, number + 1):
+                self._clear(expired % self.count)
+        if number > head:
+            self.data[0] = number
+
+    def _clear(self, slot):
+        data = self.data
+        base = self._base(slot)
+        if data[base] < 0:
+            return
+        for i in range(FIELDS):
+            data[TOTALS + i] -= data[base + 2 + i]
+            data[base + 2 + i] = 0.0
+        data[base] = -1.0
+        data[base + 1] = 0.0
+
+    def add(self, t, field, value=1.0, speed=None):
+        """Add `value` to one field of the bucket holding t (late samples still inside the window count)"""
+        self.advance(t)
+        number = self._bucket(t)
+        data = self.data
+        if number <= data[0] - self.count:
+            return
+        base = self._base(number % self.count)
+        data[base] = number
+        data[base + 2 + field] += value
+        data[TOTALS + field] += value
+        if speed is not None and speed > data[base + 1]:
+            data[base + 1] = speed
+
+    def snapshot(self, now):
+        self.advance(now)
+        totals = self.data[TOTALS:TOTALS + FIELDS]
+        samples = round(totals[SAMPLES])
+        if self.aligned:
+            # Calendar windows cover the time since they started (e.g. today so far)
+            seconds = round((now + time.localtime(now).tm_gmtoff) % self.width)
+        else:
+            seconds = self.span
+        return {
+            "seconds": seconds,
+            "samples": samples,
+            "avg_speed": round(totals[SPEED_SUM] / samples, 1) if samples else None,
+            "max_speed": round(max(self.data[self._base(slot) + 1] for slot in range(self.count)), 1) if samples else None,
+            "distance_km": round(max(totals[DISTANCE], 0.0) / 1000, 3),
+            "events": round(totals[EVENTS]),
+            "critical_events": round(totals[CRITICAL]),
+            "activity_seconds": {
+                activity: round(max(totals[field], 0.0)) for activity, field in ACTIVITY_FIELD.items()
+            },
+        }
+
+
+class _Rider:
+    __slots__ = ("windows", "last_t", "last_position")
+
+    def __init__(self, state=None):
+        state = state or {"t": None, "p": None, "w": {}}
+        self.windows = {
+            name: RollingWindow(span, width, aligned, state["w"].get(name)) for name, span, width, aligned in WINDOWS
+        }
+        self.last_t = state["t"]
+        self.last_position = state["p"]
+
+    def state(self):
+        return {"t": self.last_t, "p": self.last_position, "w": {name: window.state() for name, window in self.windows.items()}}
+
+
+class DashboardSummary:
+    """Rolling speed / distance / activity / event aggregates per rider (shared by all workers)"""
+
+    def __init__(self, store):
+        self.store = store  # SharedState (or anything with get / update)
+
+    def _update(self, rider_id, fn):
+        """Apply fn(rider) to a rider's aggregates as one atomic read-modify-write"""
+        def apply(state):
+            rider = _Rider(state)
+            fn(rider)
+            return rider.state()
+        self.store.update(f"summary:{rider_id}", apply)
+
+    def add_sample(self, rider_id, t, speed=None, latitude=None, longitude=None, activity=None):
+        """
+        One chest sample at capture time t: speed (km/h) and position feed the
+        speed and distance stats, and the time since the rider's previous sample
+        is credited to `activity`.
+        """
+        field = ACTIVITY_FIELD.get(activity, ACTIVITY_FIELD['UNKNOWN'])
+        position = [latitude, longitude] if latitude is not None and longitude is not None else None
+
+        def apply(rider):
+            dt = t - rider.last_t if rider.last_t is not None else 0.0
+            distance = 0.0
+            if 0 < dt <= MAX_SAMPLE_GAP and position and rider.last_position:
+                distance = geo.haversine_m(*rider.last_position, *position)
+                if distance > MAX_PLAUSIBLE_SPEED * dt:
+                    distance = 0.0
+
+            for window in rider.windows.values():
+                if speed is not None:
+                    window.add(t, SAMPLES, 1.0, speed)
+                    window.add(t, SPEED_SUM, speed)
+                if distance:
+                    window.add(t, DISTANCE, distance)
+                if 0 < dt <= MAX_SAMPLE_GAP:
+                    window.add(t, field, dt)
+
+            # Late (batched) samples count in their buckets but do not move the track
+            if dt >= 0:
+                rider.last_t = t
+                if position:
+                    rider.last_position = position
+
+        self._update(rider_id, apply)
+
+    def add_event(self, rider_id, t, severity):
+        def apply(rider):
+            for window in rider.windows.values():
+                window.add(t, EVENTS)
+                if severity == 'CRITICAL':
+                    window.add(t, CRITICAL)
+
+        self._update(rider_id, apply)
+
+    def summary(self, rider_id, now=None):
+        """Every window's aggregates for a rider (all zero if nothing was seen)"""
+        now = time.time() if now is None else now
+        rider = _Rider(self.store.get(f"summary:{rider_id}"))
+        return {
+            "rider_id": rider_id,
+            "generated_at": datetime.fromtimestamp(now).isoformat(),
+            "windows": {name: window.snapshot(now) for name, window in rider.windows.items()},
+        }
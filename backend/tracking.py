@@ -0,0 +1,176 @@
+# GPS Track Smoothing - Ignition Hackathon
+# Per-device streaming Kalman filter over chest GPS fixes. Position and
+# GPS speed/heading are the measurements; the chest IMU's dynamic
+# acceleration sets how much the filter lets velocity change between fixes
+# (hard braking or cornering -> trust the new fix more). Cost per sample is
+# constant: two independent 2-state filters (east and north axes). Each
+# device's filter state is a short list in the workers' shared state, so the
+# track is continuous whichever worker ingests the next fix.
+#
+# The IMU is not a control input to the prediction. Without a magnetometer,
+# and with an unknown strap yaw, its horizontal axes cannot be rotated into
+# east/north. And one reading per upload (1-30 s apart) says nothing about
+# the acceleration over the interval between fixes. Its magnitude is still a
+# fair measure of how hard the rider is manoeuvring.
+
+import math
+
+from admission import IDLE_INTERVAL_MS, POLICY_STRETCH
+from shared import LocalState
+
+EARTH_RADIUS_M = 6371000.0
+GRAVITY = 9.81
+
+GPS_UERE_M = 5.0  # Position error per unit of HDOP
+GPS_SPEED_SIGMA = 0.5  # m/s
+BASE_ACCEL_SIGMA = 1.0  # m/s², cruising process noise
+STATIONARY_SPEED = 0.5  # m/s; below this GPS heading is noise
+# Longer gaps start a new track: twice the slowest upload interval a device
+# can be told to use (idle, fully stretched under load), so idle riders keep
+# their track between samples
+MAX_GAP_SECONDS = 2 * IDLE_INTERVAL_MS / 1000 * max(factor for _, factor in POLICY_STRETCH)
+
+
+class _Axis:
+    """Constant-velocity Kalman filter along one axis (metres, m/s)"""
+
+    __slots__ = ("p", "v", "pp", "pv", "vv")
+
+    def __init__(self, position, velocity, position_var, velocity_var):
+        self.p = position
+        self.v = velocity
+        self.pp = position_var
+        self.pv = 0.0
+        self.vv = velocity_var
+
+    def predict(self, dt, accel_var):
+        self.p += self.v * dt
+        dt2 = dt * dt
+        self.pp += 2 * dt * self.pv + dt2 * self.vv + accel_var * dt2 * dt2 / 4
+        self.pv += dt * self.vv + accel_var * dt2 * dt / 2
+        self.vv += accel_var * dt2
+
+    def update_position(self, z, variance):
+        s = self.pp + variance
+        k0 = self.pp / s
+        k1 = self.pv / s
+        residual = z - self.p
+        self.p += k0 * residual
+        self.v += k1 * residual
+        self.vv -= k1 * self.pv
+        self.pv *= 1 - k0
+        self.pp *= 1 - k0
+
+    def update_velocity(self, z, variance):
+        s = self.vv + variance
+        k0 = self.pv / s
+        k1 = self.vv / s
+        residual = z - self.v
+        self.p += k0 * residual
+        self.v += k1 * residual
+        self.pp -= k0 * self.pv
+        self.pv *= 1 - k1
+        self.vv *= 1 - k1
+
+
+class GpsKalmanFilter:
+    """Smoothed position/speed/heading for one device"""
+
+    def __init__(self, latitude, longitude, timestamp):
+        # Local tangent plane around the first fix of the track
+        self.lat0 = latitude
+        self.lon0 = longitude
+        self.m_per_deg_lat = math.pi * EARTH_RADIUS_M / 180
+        self.m_per_deg_lon = self.m_per_deg_lat * math.cos(math.radians(latitude))
+        self.timestamp = timestamp
+        self.east = _Axis(0.0, 0.0, GPS_UERE_M ** 2, 25.0)
+        self.north = _Axis(0.0, 0.0, GPS_UERE_M ** 2, 25.0)
+
+    def update(self, timestamp, latitude, longitude, speed_kmh=None, heading=None,
+               hdop=None, imu_accel=None):
+        """Advance to `timestamp` and fold in one GPS fix (+ chest IMU reading)"""
+        dt = max(timestamp - self.timestamp, 0.0)
+        self.timestamp = max(timestamp, self.timestamp)
+
+        # Process noise: baseline plus whatever linear acceleration the IMU feels
+        accel_sigma = BASE_ACCEL_SIGMA
+        if imu_accel is not None:
+            accel_sigma += abs(math.sqrt(sum(a * a for a in imu_accel)) - GRAVITY)
+        accel_var = accel_sigma * accel_sigma
+
+        if dt > 0:
+            self.east.predict(dt, accel_var)
+            self.north.predict(dt, accel_var)
+
+        # Position measurement
+        position_var = (max(hdop or 1.0, 1.0) * GPS_UERE_M) ** 2
+        self.east.update_position((longitude - self.lon0) * self.m_per_deg_lon, position_var)
+        self.north.update_position((latitude - self.lat0) * self.m_per_deg_lat, position_var)
+
+        # Velocity measurement from GPS speed over ground + course
+        if speed_kmh is not None:
+            speed = speed_kmh / 3.6
+            if speed < STATIONARY_SPEED:
+                self.east.update_velocity(0.0, STATIONARY_SPEED ** 2)
+                self.north.update_velocity(0.0, STATIONARY_SPEED ** 2)
+            elif heading is not None:
+                course = math.radians(heading)
+                self.east.update_velocity(speed * math.sin(course), GPS_SPEED_SIGMA ** 2)
+                self.north.update_velocity(speed * math.cos(course), GPS_SPEED_SIGMA ** 2)
+
+        return self.state()
+
+    def to_state(self):
+        """Filter state as a flat list (see from_state)"""
+        e, n = self.east, self.north
+        return [self.lat0, self.lon0, self.timestamp, e.p, e.v, e.pp, e.pv, e.vv, n.p, n.v, n.pp, n.pv, n.vv]
+
+    @classmethod
+    def from_state(cls, state):
+        kf = cls(state[0], state[1], state[2])
+        kf.east.p, kf.east.v, kf.east.pp, kf.east.pv, kf.east.vv = state[3:8]
+        kf.north.p, kf.north.v, kf.north.pp, kf.north.pv, kf.north.vv = state[8:13]
+        return kf
+
+    def state(self):
+        """Current smoothed frame"""
+        speed = math.hypot(self.east.v, self.north.v)
+        return {
+            "latitude": self.lat0 + self.north.p / self.m_per_deg_lat,
+            "longitude": self.lon0 + self.east.p / self.m_per_deg_lon,
+            "speed": speed * 3.6,
+            "heading": math.degrees(math.atan2(self.east.v, self.north.v)) % 360 if speed >= STATIONARY_SPEED else None,
+        }
+
+
+class TrackSmoother:
+    """Kalman filters keyed by device_id, kept in a state store (thread-safe)"""
+
+    def __init__(self, store=None):
+        self.store = store if store is not None else LocalState()  # SharedState across workers
+
+    def update(self, sample):
+        """
+        Smooth one chest sample record. Returns {latitude, longitude, speed,
+        heading} or None if the sample has no GPS fix.
+        """
+        if sample.latitude is None or sample.longitude is None:
+            return None
+
+        smoothed = []
+
+        def step(state):
+            kf = GpsKalmanFilter.from_state(state) if state else None
+            if kf is None or abs(sample.epoch - kf.timestamp) > MAX_GAP_SECONDS:
+                kf = GpsKalmanFilter(sample.latitude, sample.longitude, sample.epoch)
+            smoothed.append(kf.update(
+                sample.epoch, sample.latitude, sample.longitude,
+                speed_kmh=sample.speed,
+                heading=sample.heading,
+                hdop=sample.accuracy,
+                imu_accel=(sample.accel_x, sample.accel_y, sample.accel_z)
+            ))
+            return kf.to_state()
+
+        self.store.update(f"track:{sample.device_id}", step)
+        return smoothed[0]
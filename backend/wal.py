@@ -0,0 +1,282 @@
+# Write-Ahead Buffer for Sensor Ingest - Ignition Hackathon
+# Samples are appended to a local memory-mapped log and acknowledged right
+# away; a background thread bulk-inserts them into Supabase in arrival order.
+# If Supabase is slow or down, samples wait in the log (and survive restarts)
+# instead of being lost.
+#
+# File layout:
+#   [0:64)   header: magic, version, write offset, flush offset
+#   [64:...) records: u32 length | u32 crc32 | JSON {"t": table, "r": row}
+
+import fcntl
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+from metrics import SUPABASE_SECONDS, WAL_PENDING, WAL_USED_BYTES
+
+logger = logging.getLogger(__name__)
+
+WAL_DIR = os.getenv("WAL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "wal"))
+WAL_SIZE_MB = int(os.getenv("WAL_SIZE_MB", 64))
+WAL_SLOTS = int(os.getenv("WAL_SLOTS", 16))  # One log file per worker process
+WAL_FLUSH_BATCH = int(os.getenv("WAL_FLUSH_BATCH", 500))  # Rows per bulk insert
+WAL_FLUSH_INTERVAL = float(os.getenv("WAL_FLUSH_INTERVAL", 0.2))  # Seconds when idle
+WAL_MAX_BACKOFF = 30.0
+
+MAGIC = b"IWAL"
+VERSION = 1
+HEADER = struct.Struct("<4sIQQ")  # magic, version, write_off, flush_off
+HEADER_SIZE = 64
+RECORD = struct.Struct("<II")  # length, crc32
+
+
+class WALFull(Exception):
+    """Raised when the log has no room left; callers should shed load"""
+
+
+class WriteAheadLog:
+    """Single-process append log with an ordered background flusher"""
+
+    def __init__(self, supabase, path, size=WAL_SIZE_MB * 1024 * 1024):
+        self.supabase = supabase
+        self.path = path
+        self.lock = threading.Lock()
+        self.has_data = threading.Event()
+        self.pending = 0
+        self.flusher = None
+
+        self.file = os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o644), "r+b")
+        try:
+            # Exclusive per process; another worker must use another slot
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self.file.close()
+            raise
+        if os.fstat(self.file.fileno()).st_size < size:
+            self.file.truncate(size)
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        self.size = len(self.map)
+
+        self._recover()
+
+    # ---------------------------------------------
+    # Header / recovery
+    # ---------------------------------------------
+
+    def _read_header(self):
+        magic, version, write_off, flush_off = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            return HEADER_SIZE, HEADER_SIZE
+        return write_off, flush_off
+
+    def _write_header(self):
+        HEADER.pack_into(self.map, 0, MAGIC, VERSION, self.write_off, self.flush_off)
+
+    def _recover(self):
+        """Re-validate unflushed records; drop a torn tail from a crash"""
+        self.write_off, self.flush_off = self._read_header()
+        if not HEADER_SIZE <= self.flush_off <= self.write_off <= self.size:
+            logger.error(f"WAL {self.path}: bad header, starting empty")
+            self.write_off = self.flush_off = HEADER_SIZE
+
+        offset = self.flush_off
+        count = 0
+        for offset, _ in self._iter_records(self.flush_off, self.write_off):
+            count += 1
+        if offset != self.write_off:
+            logger.warning(f"WAL {self.path}: truncated torn tail at {offset}")
+            self.write_off = offset
+
+        self.pending = count
+        self._write_header()
+        if count:
+            logger.info(f"WAL {self.path}: recovered {count} unflushed samples")
+            self.has_data.set()
+
+    def _iter_records(self, start, end):
+        """Yield (next_offset, payload) for each valid record in [start, end)"""
+        offset = start
+        while offset + RECORD.size <= end:
+            length, crc = RECORD.unpack_from(self.map, offset)
+            body_start = offset + RECORD.size
+            body_end = body_start + length
+            if body_end > end:
+                return
+            payload = self.map[body_start:body_end]
+            if zlib.crc32(payload) != crc:
+                return
+            offset = body_end
+            yield offset, payload
+
+    # ---------------------------------------------
+    # Append (request threads)
+    # ---------------------------------------------
+
+    def append(self, table, row):
+        """Durably queue one row for insertion; raises WALFull under backpressure"""
+        payload = json.dumps({"t": table, "r": row}, separators=(",", ":")).encode()
+        needed = RECORD.size + len(payload)
+
+        with self.lock:
+            if self.write_off + needed > self.size:
+                self._compact()
+            if self.write_off + needed > self.size:
+                raise WALFull(f"WAL full ({self.pending} samples pending)")
+
+            RECORD.pack_into(self.map, self.write_off, len(payload), zlib.crc32(payload))
+            self.map[self.write_off + RECORD.size:self.write_off + needed] = payload
+            # Publish the record only after its bytes are in place
+            self.write_off += needed
+            self.pending += 1
+            self._write_header()
+
+        self.has_data.set()
+        self._ensure_flusher()
+
+    def _compact(self):
+        """Slide unflushed records to the front of the file (lock held)"""
+        if self.flush_off == HEADER_SIZE:
+            return
+        live = self.write_off - self.flush_off
+        self.map.move(HEADER_SIZE, self.flush_off, live)
+        self.flush_off = HEADER_SIZE
+        self.write_off = HEADER_SIZE + live
+        self._write_header()
+
+    # ---------------------------------------------
+    # Flusher (background thread)
+    # ---------------------------------------------
+
+    def _ensure_flusher(self):
+        if self.flusher is None or not self.flusher.is_alive():
+            with self.lock:
+                if self.flusher is None or not self.flusher.is_alive():
+                    self.flusher = threading.Thread(target=self._flush_loop, name="wal-flusher", daemon=True)
+                    self.flusher.start()
+
+    def start(self):
+        """Start flushing (e.g. to drain samples recovered at startup)"""
+        self._ensure_flusher()
+
+    def _read_batch(self):
+        """Copy up to WAL_FLUSH_BATCH records starting at the flush offset"""
+        with self.lock:
+            batch = []
+            start = self.flush_off
+            for offset, payload in self._iter_records(self.flush_off, self.write_off):
+                record = json.loads(payload)
+                batch.append((offset - start, record["t"], record["r"]))
+                if len(batch) >= WAL_FLUSH_BATCH:
+                    break
+            return batch
+
+    def _advance(self, consumed_bytes, consumed_records):
+        """Mark records as flushed; relative so it stays valid across compaction"""
+        with self.lock:
+            self.flush_off += consumed_bytes
+            self.pending -= consumed_records
+            if self.flush_off == self.write_off:
+                # Fully drained: rewind so the file never needs compaction
+                self.flush_off = self.write_off = HEADER_SIZE
+            self._write_header()
+
+    def _flush_loop(self):
+        backoff = WAL_FLUSH_INTERVAL
+        while True:
+            self.has_data.wait(WAL_FLUSH_INTERVAL)
+            WAL_PENDING.set(self.pending)
+            WAL_USED_BYTES.set(self.write_off - self.flush_off)
+            batch = self._read_batch()
+            if not batch:
+                self.has_data.clear()
+                continue
+
+            try:
+                self._flush_batch(batch)
+                backoff = WAL_FLUSH_INTERVAL
+            except Exception as e:
+                logger.error(f"WAL flush failed ({self.pending} pending), retrying in {backoff:.1f}s: {e}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, WAL_MAX_BACKOFF)
+
+    def _flush_batch(self, batch):
+        """Bulk-insert consecutive rows of the same table, preserving order"""
+        from postgrest.exceptions import APIError
+
+        consumed = 0
+        i = 0
+        while i < len(batch):
+            table = batch[i][1]
+            j = i
+            while j < len(batch) and batch[j][1] == table:
+                j += 1
+
+            try:
+                self._insert(table, [row for _, _, row in batch[i:j]])
+            except APIError as e:
+                if not is_row_error(e):
+                    raise
+                # Isolate the bad row(s) so the rest of the run still lands. Each row
+                # is marked flushed as soon as it is settled, so a failure partway
+                # through never re-sends rows that already made it in.
+                for k in range(i, j):
+                    try:
+                        self._insert(table, [batch[k][2]])
+                    except APIError as row_error:
+                        if not is_row_error(row_error):
+                            raise
+                        self._dead_letter(table, batch[k][2], row_error)
+                    self._advance(batch[k][0] - consumed, 1)
+                    consumed = batch[k][0]
+                i = j
+                continue
+
+            end_offset = batch[j - 1][0]
+            self._advance(end_offset - consumed, j - i)
+            consumed = end_offset
+            i = j
+
+    def _insert(self, table, rows):
+        with SUPABASE_SECONDS.labels(table, "insert").time():
+            self.supabase.table(table).insert(rows).execute()
+
+    def _dead_letter(self, table, row, error):
+        logger.error(f"WAL: {table} row rejected by database, moved to dead letters: {error}")
+        with open(self.path + ".dead.jsonl", "a") as f:
+            f.write(json.dumps({"table": table, "row": row, "error": str(error)}) + "\n")
+
+
+def is_row_error(error):
+    """
+    True if PostgREST rejected the data itself (bad value, constraint violation,
+    malformed row), so retrying can never succeed. Connection, auth, rate-limit
+    and server errors are transient and must be retried, not dead-lettered.
+    """
+    code = str(error.code or "")
+    if code.isdigit() and len(code) == 3:
+        # HTTP status (PostgREST sent no JSON error body)
+        return code.startswith("4") and code not in ("401", "408", "429")
+    if code.startswith("PGRST"):
+        # PGRST1xx request / PGRST2xx schema errors are 4xx; PGRST0xx (no database
+        # connection) and PGRST3xx (JWT, config) are not the row's fault
+        return code[5:6] in ("1", "2")
+    # SQLSTATE: class 22 data exception, class 23 integrity constraint violation
+    return code[:2] in ("22", "23")
+
+
+def open_wal(supabase, directory=WAL_DIR, slots=WAL_SLOTS):
+    """Open the first log slot not held by another worker process"""
+    os.makedirs(directory, exist_ok=True)
+    for slot in range(slots):
+        path = os.path.join(directory, f"ingest-{slot}.wal")
+        try:
+            return WriteAheadLog(supabase, path)
+        except BlockingIOError:
+            continue
+    raise RuntimeError(f"All {slots} WAL slots in {directory} are in use")
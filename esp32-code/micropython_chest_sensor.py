@@ -4,7 +4,12 @@ Reads data from:
 - NEO-6M GPS Module
 - MPU6050 IMU (Accelerometer + Gyroscope + Temperature)
 
-Sends data to backend API every 2 seconds
+Sends data to backend API every second while moving and every 30 seconds
+while still (with a 50 Hz IMU burst), and immediately on an impact
+Stamps each sample with its capture time (GPS time, SNTP until the first fix), so queued and
+batched samples keep their true times
+Estimates the IMU bias at boot (keep the sensor still) and registers it with
+the backend, which corrects every sample with it
 
 Wiring:
 NEO-6M GPS:
@@ -32,6 +37,9 @@ import time
 import network
 import urequests as requests
 import ujson as json
+import ustruct as struct
+import socket
+import math
 from machine import Pin, I2C, UART
 import gc
 
@@ -41,9 +49,41 @@ WIFI_PASSWORD = "sasukeuchiha"
 
 # Backend API URL
 API_URL = "https://oracle-apis.hardikgarg.me/ignition-hackathon/api/esp32-chest"
+CALIBRATION_URL = API_URL.rsplit("/", 1)[0] + "/calibration"
 
-# Timing
-SEND_INTERVAL = 2000  # 2 seconds in milliseconds
+# Unique per board; the backend keys this device's calibration on it
+DEVICE_ID = "ESP32_CHEST"
+
+# Timing (adaptive; the backend may override both intervals in its responses)
+IDLE_INTERVAL = 30000  # ms between samples/uploads while still
+MOVING_INTERVAL = 1000  # ms between samples/uploads while moving
+IMU_RATE_HZ = 50  # High-rate IMU samples buffered between sends (impact detection)
+IMU_BURST_MAX = 180  # Cap (~3.6 s: 1 s before + IMPACT_POST after) so a slow send cannot exhaust memory
+
+# Backpressure: while the backend sheds load (429/503) samples queue here and
+# go out together; after a shed the device sends fewer, larger batches
+MAX_PENDING = 20
+MAX_BATCH_EVERY = 8  # Samples per request under sustained load
+MAX_BACKOFF = 60000  # ms, after repeated network errors
+
+# Motion detection over 1 s windows of the IMU stream
+MOTION_WINDOW = 1000  # ms
+STILL_ACCEL_STD = 0.3  # m/s², |accel| spread below this counts as still
+STILL_GYRO = 0.15  # rad/s, peak |gyro| below this counts as still
+STILL_SPEED = 1.0  # km/h (GPS)
+STILL_HOLD = 10000  # ms of still windows before dropping to IDLE_INTERVAL
+IMPACT_TRIGGER = 3.0 * 9.81  # m/s², |accel| that sends right away
+IMPACT_POST = 2500  # ms after the trigger: the server scores 2 s after the peak (settle + stillness), plus margin for a later peak
+
+# Clock: samples carry "device_time_ms" (Unix ms) once GPS/NTP has set it
+NTP_HOST = "pool.ntp.org"
+NTP_DELTA = 2208988800  # Seconds from 1900 (NTP) to 1970 (Unix)
+CLOCK_RESYNC = 30 * 60 * 1000  # ms between SNTP syncs (crystal drift stays ~0.1 s)
+
+# Boot calibration
+CALIBRATION_SAMPLES = 100  # ~2 s at IMU_RATE_HZ
+CALIBRATION_MAX_GYRO_STD = 0.02  # rad/s; noisier means the sensor moved
+CALIBRATION_ATTEMPTS = 3
 
 class MPU6050:
     """Simple MPU6050 driver for MicroPython"""
@@ -92,6 +132,34 @@ class MPU6050:
             'z': gyro_z * gyro_scale
         }
     
+    def get_imu_sample(self):
+        """Accel (m/s²) + gyro (rad/s) in one 14-byte I2C read: [ax, ay, az, gx, gy, gz]"""
+        raw = struct.unpack('>hhhhhhh', self.i2c.readfrom_mem(self.addr, 0x3B, 14))
+        accel_scale = 8.0 * 9.81 / 32768.0
+        gyro_scale = 500.0 * 3.14159 / (180.0 * 32768.0)
+        return [
+            round(raw[0] * accel_scale, 2), round(raw[1] * accel_scale, 2), round(raw[2] * accel_scale, 2),
+            round(raw[4] * gyro_scale, 3), round(raw[5] * gyro_scale, 3), round(raw[6] * gyro_scale, 3)
+        ]
+    
+    def estimate_rest(self, samples=CALIBRATION_SAMPLES):
+        """Average the IMU at rest: (gyro_bias, rest_accel), or None if the sensor moved"""
+        sums = [0.0] * 6
+        squares = [0.0] * 3
+        for _ in range(samples):
+            sample = self.get_imu_sample()
+            for i in range(6):
+                sums[i] += sample[i]
+            for i in range(3):
+                squares[i] += sample[3 + i] * sample[3 + i]
+            time.sleep_ms(1000 // IMU_RATE_HZ)
+        
+        mean = [total / samples for total in sums]
+        for i in range(3):
+            if squares[i] / samples - mean[3 + i] ** 2 > CALIBRATION_MAX_GYRO_STD ** 2:
+                return None
+        return mean[3:], mean[:3]
+    
     def get_temp_data(self):
         """Get temperature data in Celsius"""
         temp_raw = self.read_raw_data(0x41)
@@ -99,6 +167,16 @@ class MPU6050:
         temp_c = (temp_raw / 340.0) + 36.53
         return temp_c
 
+def unix_ms(year, month, day, hour, minute, ms):
+    """UTC date/time -> Unix ms (days-from-civil; no RTC or port epoch involved)"""
+    y = year - (1 if month <= 2 else 0)
+    era = y // 400
+    yoe = y - era * 400
+    doy = (153 * (month + (-3 if month > 2 else 9)) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    days = era * 146097 + doe - 719468
+    return (days * 86400 + hour * 3600 + minute * 60) * 1000 + ms
+
 class SimpleGPS:
     """Simple GPS parser for NEO-6M"""
     
@@ -112,6 +190,8 @@ class SimpleGPS:
         self.satellites = 0
         self.hdop = None
         self.fix_quality = 0
+        self.utc_ms = None  # Unix ms of the last RMC time, read at utc_ticks
+        self.utc_ticks = 0
         
     def update(self):
         """Read and parse GPS data"""
@@ -190,6 +270,15 @@ class SimpleGPS:
                 # Course/Heading
                 if parts[8]:
                     self.heading = float(parts[8])
+                
+                # UTC time (hhmmss.ss) and date (ddmmyy), trusted with a valid fix only
+                if parts[2] == 'A' and parts[1] and parts[9]:
+                    t, d = parts[1], parts[9]
+                    self.utc_ms = unix_ms(
+                        2000 + int(d[4:6]), int(d[2:4]), int(d[0:2]),
+                        int(t[0:2]), int(t[2:4]), round(float(t[4:]) * 1000)
+                    )
+                    self.utc_ticks = time.ticks_ms()
         except:
             pass
     
@@ -214,6 +303,89 @@ class SimpleGPS:
                 self.latitude is not None and 
                 self.longitude is not None)
 
+class MotionDetector:
+    """Still/moving state from the |accel| spread and peak |gyro| of each MOTION_WINDOW"""
+    def __init__(self):
+        self.moving = True  # Report at the fast rate until proven still
+        self.still_since = None
+        self.reset()
+    
+    def reset(self):
+        self.count = 0
+        self.accel_sum = 0.0
+        self.accel_sq = 0.0
+        self.gyro_peak = 0.0
+    
+    def add(self, imu):
+        """Feed one [ax, ay, az, gx, gy, gz] sample; returns |accel| for the impact trigger"""
+        accel = math.sqrt(imu[0] * imu[0] + imu[1] * imu[1] + imu[2] * imu[2])
+        gyro = math.sqrt(imu[3] * imu[3] + imu[4] * imu[4] + imu[5] * imu[5])
+        self.count += 1
+        self.accel_sum += accel
+        self.accel_sq += accel * accel
+        if gyro > self.gyro_peak:
+            self.gyro_peak = gyro
+        return accel
+    
+    def update(self, now, speed=0.0):
+        """Close the current window; moving starts at once, still only after STILL_HOLD"""
+        if self.count:
+            mean = self.accel_sum / self.count
+            variance = self.accel_sq / self.count - mean * mean
+            still = variance < STILL_ACCEL_STD * STILL_ACCEL_STD and self.gyro_peak < STILL_GYRO and speed < STILL_SPEED
+            if not still:
+                self.moving = True
+                self.still_since = None
+            elif self.still_since is None:
+                self.still_since = now
+            elif time.ticks_diff(now, self.still_since) >= STILL_HOLD:
+                self.moving = False
+        self.reset()
+        return self.moving
+
+class DeviceClock:
+    """Unix time in ms, anchored to ticks_ms at the last GPS/NTP sync"""
+    def __init__(self):
+        self.base_ms = None
+        self.base_ticks = 0
+        self.source = None
+    
+    def set(self, unix_ms, ticks, source):
+        if self.source != source:
+            print(f"Clock set from {source}")
+        self.base_ms = unix_ms
+        self.base_ticks = ticks
+        self.source = source
+    
+    def now_ms(self, ticks):
+        """Unix ms at a ticks_ms reading, or None before the first sync"""
+        if self.base_ms is None:
+            return None
+        return self.base_ms + time.ticks_diff(ticks, self.base_ticks)
+    
+    def sync_ntp(self):
+        """One SNTP query: server transmit time plus half the round trip"""
+        try:
+            addr = socket.getaddrinfo(NTP_HOST, 123)[0][-1]
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            try:
+                sock.settimeout(1)
+                query = bytearray(48)
+                query[0] = 0x1B  # Version 3, client mode
+                sent = time.ticks_ms()
+                sock.sendto(query, addr)
+                reply = sock.recv(48)
+                received = time.ticks_ms()
+            finally:
+                sock.close()
+            seconds, fraction = struct.unpack("!II", reply[40:48])
+            unix_ms = (seconds - NTP_DELTA) * 1000 + (fraction * 1000 >> 32)
+            self.set(unix_ms + time.ticks_diff(received, sent) // 2, received, "ntp")
+            return True
+        except Exception as e:
+            print(f"NTP sync failed: {e}")
+            return False
+
 def connect_wifi():
     """Connect to WiFi network"""
     print("ESP32 Chest Sensor - Initializing...")
@@ -267,65 +439,130 @@ def initialize_sensors():
         print(f"Error initializing sensors: {e}")
         return None, None
 
-def send_sensor_data(gps, mpu):
-    """Read sensors and send data to backend"""
+def calibrate_imu(mpu):
+    """Estimate the IMU bias at boot and register it with the backend"""
+    for attempt in range(CALIBRATION_ATTEMPTS):
+        print("Calibrating IMU - keep the sensor still...")
+        rest = mpu.estimate_rest()
+        if rest is None:
+            print("Movement detected, retrying calibration")
+            continue
+        
+        gyro_bias, rest_accel = rest
+        payload = {
+            "device_id": DEVICE_ID,
+            "gyro_bias": [round(v, 4) for v in gyro_bias],
+            "rest_accel": [round(v, 3) for v in rest_accel],
+            "samples": CALIBRATION_SAMPLES
+        }
+        try:
+            headers = {'Content-Type': 'application/json'}
+            response = requests.post(CALIBRATION_URL, json=payload, headers=headers, timeout=5)
+            print(f"Calibration response: {response.status_code}")
+            print(response.text)
+            stored = response.status_code == 201
+            response.close()
+            return stored
+        except Exception as e:
+            print(f"Error sending calibration: {e}")
+            return False
+    
+    print("Calibration skipped (sensor kept moving); the backend keeps the last one")
+    return False
+
+def read_sample(gps, mpu, clock):
+    """Read GPS and MPU6050 into one payload sample"""
+    gps.update()
+    accel_data = mpu.get_accel_data()
+    gyro_data = mpu.get_gyro_data()
+    temp_data = mpu.get_temp_data()
+    captured = time.ticks_ms()
+    
+    sample = {
+        "device_id": DEVICE_ID,
+        
+        # GPS Data
+        "latitude": gps.latitude,
+        "longitude": gps.longitude,
+        "altitude": gps.altitude,
+        "speed": round(gps.speed, 1) if gps.speed else 0.0,
+        "heading": gps.heading,
+        "accuracy": gps.hdop,
+        "satellites": gps.satellites,
+        
+        # MPU6050 Data
+        "accel_x": round(accel_data['x'], 3),
+        "accel_y": round(accel_data['y'], 3),
+        "accel_z": round(accel_data['z'], 3),
+        "gyro_x": round(gyro_data['x'], 3),
+        "gyro_y": round(gyro_data['y'], 3),
+        "gyro_z": round(gyro_data['z'], 3),
+        "temperature": round(temp_data, 2),
+        
+        # ticks_ms at capture; sent as "age_ms" (time spent queued)
+        "captured_ms": captured
+    }
+    
+    # Capture time on the device clock, once GPS/NTP has set it
+    device_time = clock.now_ms(captured)
+    if device_time is not None:
+        sample["device_time_ms"] = device_time
+    return sample
+
+def send_batch(pending, imu_burst):
+    """
+    POST queued samples, oldest first; the newest carries the IMU burst.
+    Returns (sent, retry_after_ms, policy): how many samples the backend took,
+    how long to wait before the next send (-1 after a network error), and the
+    upload policy the backend pushed, if any.
+    """
     try:
         # Check WiFi connection
         wlan = network.WLAN(network.STA_IF)
         if not wlan.isconnected():
             print("WiFi not connected!")
-            return False
+            return 0, -1, None
         
-        # Update GPS data
-        gps.update()
-        
-        # Read MPU6050 data
-        accel_data = mpu.get_accel_data()
-        gyro_data = mpu.get_gyro_data()
-        temp_data = mpu.get_temp_data()
-        
-        # Prepare JSON payload
-        payload = {
-            # GPS Data
-            "latitude": gps.latitude,
-            "longitude": gps.longitude,
-            "altitude": gps.altitude,
-            "speed": round(gps.speed, 1) if gps.speed else 0.0,
-            "heading": gps.heading,
-            "accuracy": gps.hdop,
-            "satellites": gps.satellites,
-            
-            # MPU6050 Data
-            "accel_x": round(accel_data['x'], 3),
-            "accel_y": round(accel_data['y'], 3),
-            "accel_z": round(accel_data['z'], 3),
-            "gyro_x": round(gyro_data['x'], 3),
-            "gyro_y": round(gyro_data['y'], 3),
-            "gyro_z": round(gyro_data['z'], 3),
-            "temperature": round(temp_data, 2)
-        }
+        now = time.ticks_ms()
+        batch = []
+        for sample in pending:
+            item = {k: v for k, v in sample.items() if k != "captured_ms"}
+            item["age_ms"] = time.ticks_diff(now, sample["captured_ms"])
+            batch.append(item)
         
         print("Sending data:")
-        print(json.dumps(payload))
+        print(json.dumps(batch[-1]))
+        print(f"Batch: {len(batch)} samples, IMU burst: {len(imu_burst)} samples")
         
-        # Send HTTP POST request
+        # Buffered high-rate IMU readings since the last send
+        batch[-1]["imu_burst"] = {"rate_hz": IMU_RATE_HZ, "samples": imu_burst}
+        
+        # Send HTTP POST request (a single sample goes as a plain object)
         headers = {'Content-Type': 'application/json'}
-        response = requests.post(API_URL, json=payload, headers=headers, timeout=5)
+        response = requests.post(API_URL, json=batch if len(batch) > 1 else batch[0], headers=headers, timeout=5)
         
         print(f"HTTP Response: {response.status_code}")
-        if response.status_code == 200 or response.status_code == 201:
+        sent, retry_after_ms, policy = len(batch), 0, None
+        if response.status_code in (200, 201, 202):
             print("Data sent successfully!")
-            print(response.text)
+            policy = response.json().get("policy")
+        elif response.status_code in (429, 503):
+            # Backend is shedding load: wait as told and keep the rest queued
+            retry_after_ms = int(response.headers.get('Retry-After', 5)) * 1000
+            body = response.json()
+            sent, policy = body.get("accepted", 0), body.get("policy")
+            print(f"Backend busy, retrying in {retry_after_ms} ms")
         else:
+            # The backend would reject these again; drop them
             print(f"HTTP Error: {response.status_code}")
             print(response.text)
         
         response.close()
-        return True
+        return sent, retry_after_ms, policy
         
     except Exception as e:
         print(f"Error sending data: {e}")
-        return False
+        return 0, -1, None
 
 def main():
     """Main execution loop"""
@@ -344,11 +581,27 @@ def main():
         print("Cannot continue without MPU6050!")
         return
     
+    clock = DeviceClock()
+    clock.sync_ntp()
+    
+    calibrate_imu(mpu)
+    
     print("System ready!")
     print("Waiting for GPS fix...")
     print("=" * 40)
     
     last_send_time = 0
+    last_imu_time = 0
+    imu_burst = []
+    pending = []
+    batch_every = 1  # Samples per request; doubles on each shed, halves on success
+    next_send_time = time.ticks_ms()
+    backoff = 0
+    motion = MotionDetector()
+    last_motion_time = 0
+    impact_send_time = None  # Set by an impact trigger
+    policy = {"idle_ms": IDLE_INTERVAL, "moving_ms": MOVING_INTERVAL}
+    last_clock_sync = time.ticks_ms()
     gps_status_printed = False
     
     try:
@@ -359,6 +612,11 @@ def main():
             if gps:
                 gps.update()
                 
+                # GPS time has no network delay: it replaces NTP whenever there is a fix
+                if gps.utc_ms is not None:
+                    clock.set(gps.utc_ms, gps.utc_ticks, "gps")
+                    gps.utc_ms = None
+                
                 # Print GPS status once
                 if not gps_status_printed:
                     if gps.is_valid():
@@ -368,23 +626,74 @@ def main():
                     elif gps.satellites > 0:
                         print(f"GPS searching... Satellites: {gps.satellites}")
             
-            # Send data every 2 seconds
-            if time.ticks_diff(current_time, last_send_time) >= SEND_INTERVAL:
-                last_send_time = current_time
-                
-                success = send_sensor_data(gps, mpu)
+            # Periodic SNTP resync (skipped while GPS time keeps the clock fresh)
+            if time.ticks_diff(current_time, last_clock_sync) >= CLOCK_RESYNC:
+                last_clock_sync = current_time
+                if clock.base_ms is None or time.ticks_diff(current_time, clock.base_ticks) >= CLOCK_RESYNC:
+                    clock.sync_ntp()
+            
+            # Buffer IMU samples at IMU_RATE_HZ for impact detection
+            if time.ticks_diff(current_time, last_imu_time) >= 1000 // IMU_RATE_HZ:
+                last_imu_time = current_time
+                imu = mpu.get_imu_sample()
+                imu_burst.append(imu)
+                if len(imu_burst) > IMU_BURST_MAX:
+                    imu_burst.pop(0)
                 
-                # Force garbage collection to free memory
-                gc.collect()
+                # Impact: send once the burst holds IMPACT_POST ms of aftermath
+                if motion.add(imu) >= IMPACT_TRIGGER and impact_send_time is None:
+                    print("Impact trigger!")
+                    impact_send_time = time.ticks_add(current_time, IMPACT_POST)
+            
+            if time.ticks_diff(current_time, last_motion_time) >= MOTION_WINDOW:
+                last_motion_time = current_time
+                was_moving = motion.moving
+                if motion.update(current_time, gps.speed if gps and gps.speed else 0.0) != was_moving:
+                    print("Moving" if motion.moving else "Still, slowing uploads")
+            
+            # Sample at the motion-dependent interval; send once the batch is
+            # full and any backoff has passed (an impact skips both)
+            interval = policy["moving_ms"] if motion.moving else policy["idle_ms"]
+            impact_due = impact_send_time is not None and time.ticks_diff(current_time, impact_send_time) >= 0
+            if impact_due or time.ticks_diff(current_time, last_send_time) >= interval:
+                last_send_time = current_time
+                pending.append(read_sample(gps, mpu, clock))
+                if len(pending) > MAX_PENDING:
+                    pending.pop(0)
                 
-                if success:
-                    print(f"Free memory: {gc.mem_free()} bytes")
+                if impact_due or (len(pending) >= batch_every and time.ticks_diff(current_time, next_send_time) >= 0):
+                    impact_send_time = None
+                    sent, retry_after_ms, new_policy = send_batch(pending, imu_burst)
+                    pending = pending[sent:]
+                    if new_policy:
+                        for key in policy:
+                            if key in new_policy:
+                                policy[key] = int(new_policy[key])
+                    if not pending:
+                        imu_burst = []
+                    
+                    if retry_after_ms > 0:
+                        batch_every = min(batch_every * 2, MAX_BATCH_EVERY)
+                        backoff = 0
+                        next_send_time = time.ticks_add(current_time, retry_after_ms)
+                    elif retry_after_ms < 0:
+                        backoff = min(max(backoff * 2, MOVING_INTERVAL), MAX_BACKOFF)
+                        next_send_time = time.ticks_add(current_time, backoff)
+                    else:
+                        batch_every = max(batch_every // 2, 1)
+                        backoff = 0
+                    
+                    # Force garbage collection to free memory
+                    gc.collect()
+                    
+                    if sent:
+                        print(f"Free memory: {gc.mem_free()} bytes")
                 
                 # Reset GPS status flag for periodic updates
                 gps_status_printed = False
             
-            # Small delay to prevent watchdog timeout
-            time.sleep(0.1)
+            # Small delay to prevent watchdog timeout (short enough for IMU_RATE_HZ)
+            time.sleep_ms(5)
             
     except KeyboardInterrupt:
         print("\nProgram stopped by user")
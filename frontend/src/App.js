@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import './App.css';
 import MapView from './components/MapView';
 import GyroscopeViz from './components/GyroscopeViz';
@@ -10,28 +10,77 @@ import axios from 'axios';
 // Backend API URL - update this to your domain
 const API_URL = process.env.REACT_APP_API_URL || 'http://localhost:7777';
 
+// Number of events kept in the events panel
+const MAX_EVENTS = 10;
+
+// Page size when paging back through event history
+const EVENTS_PAGE_SIZE = 20;
+
+// Rolling trends change slowly; poll them less often than live data
+const SUMMARY_INTERVAL = 10000;
+
 function App() {
   const [sensorData, setSensorData] = useState(null);
   const [events, setEvents] = useState([]);
   const [activityType, setActivityType] = useState('UNKNOWN');
+  const [summary, setSummary] = useState(null);
+  // Older events paged in on demand (below the live ones)
+  const [olderEvents, setOlderEvents] = useState([]);
+  const [olderCursor, setOlderCursor] = useState(null);
+  const [hasOlder, setHasOlder] = useState(true);
+  const [loadingOlder, setLoadingOlder] = useState(false);
   const [isConnected, setIsConnected] = useState(false);
   const [showTelegramLink, setShowTelegramLink] = useState(false);
+  // Cursor from the last response; the backend then only sends what changed
+  const seqRef = useRef(null);
+  // One request at a time, so the same cursor is never fetched twice
+  const fetchingRef = useRef(false);
 
   // Fetch live data every 2 seconds
   useEffect(() => {
     const fetchData = async () => {
+      if (fetchingRef.current) return;
+      fetchingRef.current = true;
+      let catchUp = false;
       try {
-        const response = await axios.get(`${API_URL}/api/live-data`);
+        const params = seqRef.current ? { since: seqRef.current } : {};
+        const response = await axios.get(`${API_URL}/api/live-data`, { params });
         const data = response.data;
         
-        setSensorData(data);
-        setActivityType(data.activity_type || 'UNKNOWN');
-        setEvents(data.recent_events || []);
+        seqRef.current = data.seq || null;
+        
+        // Only touch state for the parts that changed, so unchanged
+        // components are not re-rendered
+        if ('leg_sensor' in data || 'chest_sensor' in data) {
+          setSensorData((prev) => ({
+            leg_sensor: 'leg_sensor' in data ? data.leg_sensor : prev?.leg_sensor,
+            chest_sensor: 'chest_sensor' in data ? data.chest_sensor : prev?.chest_sensor
+          }));
+        }
+        if (data.activity_type) {
+          setActivityType(data.activity_type);
+        }
+        if (!data.delta) {
+          setEvents(data.recent_events || []);
+        } else if (data.recent_events && data.recent_events.length > 0) {
+          // Events from the last few seconds can be sent again; keep one copy
+          const fresh = new Set(data.recent_events.map((event) => event.id));
+          setEvents((prev) => [
+            ...data.recent_events,
+            ...prev.filter((event) => !fresh.has(event.id))
+          ].slice(0, MAX_EVENTS));
+        }
+        // More new events than one response holds: fetch the rest right away
+        catchUp = Boolean(data.has_more);
         setIsConnected(true);
       } catch (error) {
         console.error('Error fetching data:', error);
+        seqRef.current = null;
         setIsConnected(false);
+      } finally {
+        fetchingRef.current = false;
       }
+      if (catchUp) fetchData();
     };
 
     // Initial fetch
@@ -43,6 +92,45 @@ function App() {
     return () => clearInterval(interval);
   }, []);
 
+  // Fetch rolling trends (speed, distance, activity time, events)
+  useEffect(() => {
+    const fetchSummary = async () => {
+      try {
+        const response = await axios.get(`${API_URL}/api/dashboard/summary`);
+        setSummary(response.data.windows || null);
+      } catch (error) {
+        console.error('Error fetching summary:', error);
+      }
+    };
+
+    fetchSummary();
+    const interval = setInterval(fetchSummary, SUMMARY_INTERVAL);
+
+    return () => clearInterval(interval);
+  }, []);
+
+  // Next page of history, continuing from the oldest event shown
+  const loadOlderEvents = async () => {
+    const shown = olderEvents.length > 0 ? olderEvents : events;
+    const oldest = shown[shown.length - 1];
+    const before = olderCursor || (oldest ? `${oldest.timestamp},${oldest.id}` : null);
+    if (!before) return;
+
+    setLoadingOlder(true);
+    try {
+      const response = await axios.get(`${API_URL}/api/events/recent`, {
+        params: { before, limit: EVENTS_PAGE_SIZE }
+      });
+      setOlderEvents((prev) => [...prev, ...(response.data.events || [])]);
+      setOlderCursor(response.data.next_before);
+      setHasOlder(Boolean(response.data.next_before));
+    } catch (error) {
+      console.error('Error fetching older events:', error);
+    } finally {
+      setLoadingOlder(false);
+    }
+  };
+
   return (
     <div className="app">
       {/* Header */}
@@ -101,6 +189,7 @@ function App() {
             legData={sensorData?.leg_sensor}
             chestData={sensorData?.chest_sensor}
             activityType={activityType}
+            summary={summary}
           />
         </section>
 
@@ -116,7 +205,13 @@ function App() {
         {/* Events Panel */}
         <section className="events-section">
           <h2 className="section-title">Recent Events</h2>
-          <EventsPanel events={events} />
+          <EventsPanel
+            events={events}
+            olderEvents={olderEvents}
+            hasOlder={hasOlder && events.length > 0}
+            loadingOlder={loadingOlder}
+            onLoadOlder={loadOlderEvents}
+          />
         </section>
 
         {/* Telegram Link Button */}
@@ -1,7 +1,14 @@
 import React from 'react';
 import './Dashboard.css';
 
-const Dashboard = ({ legData, chestData, activityType }) => {
+// Rolling windows from /api/dashboard/summary, in display order
+const SUMMARY_WINDOWS = [
+  ['5m', 'Last 5 Minutes'],
+  ['1h', 'Last Hour'],
+  ['day', 'Today']
+];
+
+const Dashboard = ({ legData, chestData, activityType, summary }) => {
   const formatValue = (value, decimals = 2) => {
     return value !== undefined && value !== null ? value.toFixed(decimals) : 'N/A';
   };
@@ -17,6 +24,20 @@ const Dashboard = ({ legData, chestData, activityType }) => {
     return colors[type] || colors.UNKNOWN;
   };
 
+  const formatDuration = (seconds) => {
+    if (!seconds) return '0m';
+    const hours = Math.floor(seconds / 3600);
+    const minutes = Math.round((seconds % 3600) / 60);
+    return hours ? `${hours}h ${minutes}m` : `${minutes}m`;
+  };
+
+  // Activity with the most time in a window
+  const mainActivity = (activitySeconds) => {
+    const entries = Object.entries(activitySeconds || {}).filter(([, seconds]) => seconds > 0);
+    if (entries.length === 0) return 'UNKNOWN';
+    return entries.reduce((best, entry) => (entry[1] > best[1] ? entry : best))[0];
+  };
+
   return (
     <div className="dashboard">
       <div className="dashboard-grid">
@@ -43,7 +64,7 @@ const Dashboard = ({ legData, chestData, activityType }) => {
           <div className="card-content">
             <div className="stat-row">
               <span className="stat-label">Speed:</span>
-              <span className="stat-value">{formatValue(chestData?.speed, 1)} km/h</span>
+              <span className="stat-value">{formatValue(chestData?.smoothed_speed ?? chestData?.speed, 1)} km/h</span>
             </div>
             <div className="stat-row">
               <span className="stat-label">Satellites:</span>
@@ -162,6 +183,41 @@ const Dashboard = ({ legData, chestData, activityType }) => {
           </div>
         </div>
 
+        {/* Trend Cards (rolling windows) */}
+        {summary && SUMMARY_WINDOWS.map(([key, title]) => {
+          const stats = summary[key];
+          if (!stats) return null;
+          const activity = mainActivity(stats.activity_seconds);
+          return (
+            <div className="dashboard-card" key={key}>
+              <div className="card-header">
+                <span className="card-icon">📈</span>
+                <h3 className="card-title">{title}</h3>
+              </div>
+              <div className="card-content">
+                <div className="stat-row">
+                  <span className="stat-label">Avg / Max Speed:</span>
+                  <span className="stat-value">{formatValue(stats.avg_speed, 1)} / {formatValue(stats.max_speed, 1)} km/h</span>
+                </div>
+                <div className="stat-row">
+                  <span className="stat-label">Distance:</span>
+                  <span className="stat-value">{formatValue(stats.distance_km)} km</span>
+                </div>
+                <div className="stat-row">
+                  <span className="stat-label">Mostly:</span>
+                  <span className="stat-value" style={{ color: getActivityColor(activity) }}>
+                    {activity} ({formatDuration(stats.activity_seconds?.[activity])})
+                  </span>
+                </div>
+                <div className="stat-row">
+                  <span className="stat-label">Events:</span>
+                  <span className="stat-value">{stats.events} ({stats.critical_events} critical)</span>
+                </div>
+              </div>
+            </div>
+          );
+        })}
+
         {/* System Info Card */}
         <div className="dashboard-card">
           <div className="card-header">
@@ -188,4 +244,4 @@ const Dashboard = ({ legData, chestData, activityType }) => {
   );
 };
 
-export default Dashboard;
+export default React.memo(Dashboard);
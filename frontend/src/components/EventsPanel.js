@@ -1,7 +1,7 @@
 import React from 'react';
 import './EventsPanel.css';
 
-const EventsPanel = ({ events }) => {
+const EventsPanel = ({ events, olderEvents = [], hasOlder, loadingOlder, onLoadOlder }) => {
   const getSeverityColor = (severity) => {
     const colors = {
       LOW: '#4facfe',
@@ -59,10 +59,14 @@ const EventsPanel = ({ events }) => {
     );
   }
 
+  // Live events first, then pages of history (skipping any that overlap)
+  const liveIds = new Set(events.map((event) => event.id));
+  const shownEvents = [...events, ...olderEvents.filter((event) => !liveIds.has(event.id))];
+
   return (
     <div className="events-panel">
       <div className="events-list">
-        {events.map((event, index) => (
+        {shownEvents.map((event, index) => (
           <div 
             key={event.id || index} 
             className="event-card"
@@ -124,8 +128,14 @@ const EventsPanel = ({ events }) => {
           </div>
         ))}
       </div>
+
+      {hasOlder && onLoadOlder && (
+        <button className="load-older-btn" onClick={onLoadOlder} disabled={loadingOlder}>
+          {loadingOlder ? 'Loading…' : 'Load older events'}
+        </button>
+      )}
     </div>
   );
 };
 
-export default EventsPanel;
+export default React.memo(EventsPanel);
@@ -33,39 +33,38 @@ const SensorModel = ({ position, rotation, color, label }) => {
 };
 
 const GyroscopeViz = ({ legData, chestData }) => {
-  // Calculate orientation from accelerometer data (Euler angles)
-  const calculateOrientation = (accel_x, accel_y, accel_z) => {
-    // Normalize accelerometer values
+  // Roll/pitch/lean from the backend orientation filter (gyro + accel).
+  // Older rows without it fall back to a tilt estimate from the accelerometer.
+  const getOrientation = (data) => {
+    if (data?.roll != null && data?.pitch != null) {
+      return { x: data.roll, y: data.pitch, z: 0, lean: data.lean_angle ?? 0 };
+    }
+
+    const accel_x = data?.accel_x || 0;
+    const accel_y = data?.accel_y || 0;
+    const accel_z = data?.accel_z || 9.8;
     const magnitude = Math.sqrt(accel_x**2 + accel_y**2 + accel_z**2);
-    if (magnitude === 0) return { x: 0, y: 0, z: 0 };
+    if (magnitude === 0) return { x: 0, y: 0, z: 0, lean: 0 };
     
     const ax = accel_x / magnitude;
     const ay = accel_y / magnitude;
     const az = accel_z / magnitude;
     
-    // Calculate pitch (rotation around X-axis)
-    const pitch = Math.atan2(ay, Math.sqrt(ax**2 + az**2)) * (180 / Math.PI);
+    // Roll (rotation around X-axis)
+    const roll = Math.atan2(ay, az) * (180 / Math.PI);
     
-    // Calculate roll (rotation around Y-axis)
-    const roll = Math.atan2(-ax, az) * (180 / Math.PI);
+    // Pitch (rotation around Y-axis)
+    const pitch = Math.atan2(-ax, Math.sqrt(ay**2 + az**2)) * (180 / Math.PI);
     
-    // Yaw (rotation around Z-axis) - use gyro Z for indication
-    const yaw = 0; // Can't determine absolute yaw from accelerometer alone
+    // Lean (tilt of the Z-axis from vertical)
+    const lean = Math.acos(Math.max(-1, Math.min(1, az))) * (180 / Math.PI);
     
-    return { x: pitch, y: roll, z: yaw };
+    // Yaw can't be determined from accelerometer alone
+    return { x: roll, y: pitch, z: 0, lean };
   };
 
-  const legRotation = calculateOrientation(
-    legData?.accel_x || 0,
-    legData?.accel_y || 0,
-    legData?.accel_z || 9.8
-  );
-
-  const chestRotation = calculateOrientation(
-    chestData?.accel_x || 0,
-    chestData?.accel_y || 0,
-    chestData?.accel_z || 9.8
-  );
+  const legRotation = getOrientation(legData);
+  const chestRotation = getOrientation(chestData);
 
   // Calculate posture difference (angle between orientations)
   const postureDiff = Math.sqrt(
@@ -101,13 +100,17 @@ const GyroscopeViz = ({ legData, chestData }) => {
           <h4 className="gyro-subtitle">🦵 Leg Sensor</h4>
           <div className="gyro-values">
             <div className="gyro-value">
-              <span className="axis-label">Pitch:</span>
+              <span className="axis-label">Roll:</span>
               <span className="axis-value">{legRotation.x.toFixed(1)}°</span>
             </div>
             <div className="gyro-value">
-              <span className="axis-label">Roll:</span>
+              <span className="axis-label">Pitch:</span>
               <span className="axis-value">{legRotation.y.toFixed(1)}°</span>
             </div>
+            <div className="gyro-value">
+              <span className="axis-label">Lean:</span>
+              <span className="axis-value">{legRotation.lean.toFixed(1)}°</span>
+            </div>
             <div className="gyro-value">
               <span className="axis-label">Gyro Z:</span>
               <span className="axis-value">{(legData?.gyro_z || 0).toFixed(2)} rad/s</span>
@@ -119,13 +122,17 @@ const GyroscopeViz = ({ legData, chestData }) => {
           <h4 className="gyro-subtitle">🫀 Chest Sensor</h4>
           <div className="gyro-values">
             <div className="gyro-value">
-              <span className="axis-label">Pitch:</span>
+              <span className="axis-label">Roll:</span>
               <span className="axis-value">{chestRotation.x.toFixed(1)}°</span>
             </div>
             <div className="gyro-value">
-              <span className="axis-label">Roll:</span>
+              <span className="axis-label">Pitch:</span>
               <span className="axis-value">{chestRotation.y.toFixed(1)}°</span>
             </div>
+            <div className="gyro-value">
+              <span className="axis-label">Lean:</span>
+              <span className="axis-value">{chestRotation.lean.toFixed(1)}°</span>
+            </div>
             <div className="gyro-value">
               <span className="axis-label">Gyro Z:</span>
               <span className="axis-value">{(chestData?.gyro_z || 0).toFixed(2)} rad/s</span>
@@ -136,7 +143,7 @@ const GyroscopeViz = ({ legData, chestData }) => {
         <div className="gyro-section posture-diff">
           <h4 className="gyro-subtitle">📐 Posture Difference</h4>
           <div className="posture-value">
-            {postureDiff.toFixed(2)}°/s
+            {postureDiff.toFixed(1)}°
           </div>
           <div className="posture-bar">
             <div 
@@ -150,4 +157,4 @@ const GyroscopeViz = ({ legData, chestData }) => {
   );
 };
 
-export default GyroscopeViz;
+export default React.memo(GyroscopeViz);
@@ -47,9 +47,15 @@ const MapView = ({ legData, chestData }) => {
   // GPS data is on chest sensor, fallback to leg if chest not available
   const gpsData = chestData || legData || {};
   
-  const hasValidLocation = gpsData?.latitude && gpsData?.longitude;
+  // Prefer the backend's Kalman-smoothed track over raw GPS fixes
+  const latitude = gpsData.smoothed_latitude ?? gpsData.latitude;
+  const longitude = gpsData.smoothed_longitude ?? gpsData.longitude;
+  const speed = gpsData.smoothed_speed ?? gpsData.speed;
+  const heading = gpsData.smoothed_heading ?? gpsData.heading;
+  
+  const hasValidLocation = latitude && longitude;
   const position = hasValidLocation 
-    ? [gpsData.latitude, gpsData.longitude] 
+    ? [latitude, longitude] 
     : [0, 0];
 
   return (
@@ -77,7 +83,7 @@ const MapView = ({ legData, chestData }) => {
                 <div style={{ color: '#1a1f3a', fontWeight: 'bold' }}>
                   📍 Current Location<br />
                   <small style={{ color: '#6b7280' }}>
-                    {gpsData.latitude?.toFixed(6)}, {gpsData.longitude?.toFixed(6)}
+                    {latitude?.toFixed(6)}, {longitude?.toFixed(6)}
                   </small>
                 </div>
               </Popup>
@@ -109,7 +115,7 @@ const MapView = ({ legData, chestData }) => {
             <span className="info-label">📍 Location</span>
             <span className="info-value">
               {hasValidLocation 
-                ? `${gpsData.latitude?.toFixed(6) || '0'}, ${gpsData.longitude?.toFixed(6) || '0'}`
+                ? `${latitude?.toFixed(6) || '0'}, ${longitude?.toFixed(6) || '0'}`
                 : 'No GPS Fix'}
             </span>
           </div>
@@ -122,13 +128,13 @@ const MapView = ({ legData, chestData }) => {
           <div className="info-card">
             <span className="info-label">🚀 Speed</span>
             <span className="info-value">
-              {gpsData?.speed !== undefined ? `${gpsData.speed?.toFixed(1)} km/h` : 'N/A'}
+              {speed != null ? `${speed.toFixed(1)} km/h` : 'N/A'}
             </span>
           </div>
           <div className="info-card">
             <span className="info-label">🧭 Heading</span>
             <span className="info-value">
-              {gpsData?.heading !== undefined ? `${gpsData.heading?.toFixed(0)}°` : 'N/A'}
+              {heading != null ? `${heading.toFixed(0)}°` : 'N/A'}
             </span>
           </div>
           <div className="info-card">
@@ -150,4 +156,4 @@ const MapView = ({ legData, chestData }) => {
   );
 };
 
-export default MapView;
+export default React.memo(MapView);
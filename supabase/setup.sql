@@ -26,6 +26,11 @@ CREATE TABLE IF NOT EXISTS esp32_leg_data (
 CREATE INDEX idx_esp32_leg_timestamp ON esp32_leg_data(timestamp DESC);
 CREATE INDEX idx_esp32_leg_created ON esp32_leg_data(created_at DESC);
 
+-- Backend orientation filter (backend/orientation.py), degrees
+ALTER TABLE esp32_leg_data ADD COLUMN IF NOT EXISTS roll DOUBLE PRECISION;
+ALTER TABLE esp32_leg_data ADD COLUMN IF NOT EXISTS pitch DOUBLE PRECISION;
+ALTER TABLE esp32_leg_data ADD COLUMN IF NOT EXISTS lean_angle DOUBLE PRECISION;
+
 
 -- =============================================
 -- 2. ESP32 Chest Sensor Data (MPU6050 + GPS)
@@ -63,6 +68,17 @@ CREATE INDEX idx_esp32_chest_created ON esp32_chest_data(created_at DESC);
 CREATE INDEX idx_esp32_chest_gps_coords ON esp32_chest_data(latitude, longitude);
 CREATE INDEX idx_esp32_chest_timestamp_gps ON esp32_chest_data(timestamp DESC) WHERE latitude IS NOT NULL;
 
+-- Backend Kalman-smoothed track (backend/tracking.py); preferred over raw fixes
+ALTER TABLE esp32_chest_data ADD COLUMN IF NOT EXISTS smoothed_latitude DOUBLE PRECISION;
+ALTER TABLE esp32_chest_data ADD COLUMN IF NOT EXISTS smoothed_longitude DOUBLE PRECISION;
+ALTER TABLE esp32_chest_data ADD COLUMN IF NOT EXISTS smoothed_speed DOUBLE PRECISION;
+ALTER TABLE esp32_chest_data ADD COLUMN IF NOT EXISTS smoothed_heading DOUBLE PRECISION;
+
+-- Backend orientation filter (backend/orientation.py), degrees
+ALTER TABLE esp32_chest_data ADD COLUMN IF NOT EXISTS roll DOUBLE PRECISION;
+ALTER TABLE esp32_chest_data ADD COLUMN IF NOT EXISTS pitch DOUBLE PRECISION;
+ALTER TABLE esp32_chest_data ADD COLUMN IF NOT EXISTS lean_angle DOUBLE PRECISION;
+
 
 -- =============================================
 -- 3. Processed Ride Data (Combined Analysis)
@@ -125,6 +141,10 @@ CREATE INDEX idx_events_timestamp ON events(timestamp DESC);
 CREATE INDEX idx_events_type ON events(event_type);
 CREATE INDEX idx_events_severity ON events(severity);
 
+-- Impact detector output for FALL_DETECTED (backend/impact.py), 0..1
+ALTER TABLE events ADD COLUMN IF NOT EXISTS severity_score DOUBLE PRECISION;
+ALTER TABLE events ADD COLUMN IF NOT EXISTS confidence DOUBLE PRECISION;
+
 
 -- =============================================
 -- 5. Telegram User Links
@@ -166,6 +186,36 @@ CREATE TABLE IF NOT EXISTS telegram_pins (
 
 CREATE INDEX idx_telegram_pins_code ON telegram_pins(pin_code);
 CREATE INDEX idx_telegram_pins_expiry ON telegram_pins(expires_at);
+-- /register re-sends a chat's live, unused PIN instead of issuing another
+CREATE INDEX IF NOT EXISTS idx_telegram_pins_live
+    ON telegram_pins(telegram_chat_id, expires_at DESC) WHERE is_used = FALSE;
+
+-- Verify a PIN and link its Telegram user in one atomic round-trip.
+-- Returns the linked chat id, or NULL if the PIN is unknown, used or expired.
+-- The conditional UPDATE locks the PIN row, so a PIN can only be used once.
+CREATE OR REPLACE FUNCTION link_telegram_pin(p_pin VARCHAR)
+RETURNS BIGINT AS $$
+DECLARE
+    v_chat_id BIGINT;
+BEGIN
+    UPDATE telegram_pins
+    SET is_used = TRUE, used_at = NOW()
+    WHERE pin_code = p_pin
+      AND is_used = FALSE
+      AND expires_at > NOW()
+    RETURNING telegram_chat_id INTO v_chat_id;
+    
+    IF v_chat_id IS NULL THEN
+        RETURN NULL;
+    END IF;
+    
+    UPDATE telegram_users
+    SET is_linked = TRUE, linked_at = NOW(), updated_at = NOW()
+    WHERE telegram_chat_id = v_chat_id;
+    
+    RETURN v_chat_id;
+END;
+$$ LANGUAGE plpgsql;
 
 
 -- =============================================
@@ -269,7 +319,401 @@ $$ LANGUAGE plpgsql;
 
 -- You can schedule this with pg_cron extension or run manually
 -- SELECT cron.schedule('cleanup-sensor-data', '0 2 * * *', 'SELECT cleanup_old_sensor_data()');
+-- The Telegram bot also purges expired PINs every PIN_CLEANUP_INTERVAL seconds;
+-- with pg_cron available this can run in the database instead:
+-- SELECT cron.schedule('cleanup-telegram-pins', '*/5 * * * *', 'DELETE FROM telegram_pins WHERE expires_at < NOW()');
+
+
+-- =============================================
+-- 11. Status Snapshot (materialized, updated on ingest)
+-- =============================================
+-- Single-row summary read by the Telegram bot's /status command so it never
+-- has to scan sensor or event tables. Kept current by the triggers below.
+CREATE TABLE IF NOT EXISTS status_snapshot (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+
+    -- Latest GPS fix (chest sensor)
+    latitude DOUBLE PRECISION,
+    longitude DOUBLE PRECISION,
+    speed DOUBLE PRECISION,
+    accuracy DOUBLE PRECISION,
+    satellites INTEGER,
+
+    -- Sensor freshness
+    chest_updated_at TIMESTAMPTZ,
+    leg_updated_at TIMESTAMPTZ,
+
+    -- Event counters
+    total_events BIGINT NOT NULL DEFAULT 0,
+    harsh_brakes BIGINT NOT NULL DEFAULT 0,
+    harsh_accelerations BIGINT NOT NULL DEFAULT 0,
+    falls BIGINT NOT NULL DEFAULT 0,
+    last_event_at TIMESTAMPTZ,
+
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Seed the row (backfills counters once if events already exist)
+INSERT INTO status_snapshot (id, total_events, harsh_brakes, harsh_accelerations, falls, last_event_at)
+SELECT
+    1,
+    COUNT(*),
+    COUNT(*) FILTER (WHERE event_type = 'HARSH_BRAKE'),
+    COUNT(*) FILTER (WHERE event_type = 'HARSH_ACCEL'),
+    COUNT(*) FILTER (WHERE event_type = 'FALL_DETECTED'),
+    MAX(timestamp)
+FROM events
+ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION snapshot_chest_data()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE status_snapshot SET
+        latitude = NEW.latitude,
+        longitude = NEW.longitude,
+        speed = COALESCE(NEW.smoothed_speed, NEW.speed),
+        accuracy = NEW.accuracy,
+        satellites = NEW.satellites,
+        chest_updated_at = NEW.timestamp,
+        updated_at = NOW()
+    WHERE id = 1
+      AND (chest_updated_at IS NULL OR chest_updated_at <= NEW.timestamp);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION snapshot_leg_data()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE status_snapshot SET
+        leg_updated_at = NEW.timestamp,
+        updated_at = NOW()
+    WHERE id = 1
+      AND (leg_updated_at IS NULL OR leg_updated_at <= NEW.timestamp);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION snapshot_event()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE status_snapshot SET
+        total_events = total_events + 1,
+        harsh_brakes = harsh_brakes + (NEW.event_type = 'HARSH_BRAKE')::INT,
+        harsh_accelerations = harsh_accelerations + (NEW.event_type = 'HARSH_ACCEL')::INT,
+        falls = falls + (NEW.event_type = 'FALL_DETECTED')::INT,
+        last_event_at = GREATEST(last_event_at, NEW.timestamp),
+        updated_at = NOW()
+    WHERE id = 1;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_snapshot_chest_data ON esp32_chest_data;
+CREATE TRIGGER trg_snapshot_chest_data
+    AFTER INSERT ON esp32_chest_data
+    FOR EACH ROW EXECUTE FUNCTION snapshot_chest_data();
+
+DROP TRIGGER IF EXISTS trg_snapshot_leg_data ON esp32_leg_data;
+CREATE TRIGGER trg_snapshot_leg_data
+    AFTER INSERT ON esp32_leg_data
+    FOR EACH ROW EXECUTE FUNCTION snapshot_leg_data();
+
+DROP TRIGGER IF EXISTS trg_snapshot_event ON events;
+CREATE TRIGGER trg_snapshot_event
+    AFTER INSERT ON events
+    FOR EACH ROW EXECUTE FUNCTION snapshot_event();
+
+
+-- =============================================
+-- 12. Ride Aggregates (maintained incrementally on ingest)
+-- =============================================
+-- Each GPS point extends the current ride session (or starts a new one after
+-- RIDE_GAP of silence) and the day's totals, so /ride and /week read a few
+-- rows instead of scanning esp32_chest_data.
+ALTER TABLE ride_sessions ADD COLUMN IF NOT EXISTS moving_seconds DOUBLE PRECISION DEFAULT 0;
+ALTER TABLE ride_sessions ADD COLUMN IF NOT EXISTS falls INTEGER DEFAULT 0;
+ALTER TABLE ride_sessions ADD COLUMN IF NOT EXISTS last_latitude DOUBLE PRECISION;
+ALTER TABLE ride_sessions ADD COLUMN IF NOT EXISTS last_longitude DOUBLE PRECISION;
+
+CREATE INDEX IF NOT EXISTS idx_ride_sessions_start ON ride_sessions(start_time DESC);
+
+CREATE TABLE IF NOT EXISTS ride_daily_stats (
+    day DATE PRIMARY KEY,
+    total_distance DOUBLE PRECISION NOT NULL DEFAULT 0, -- km
+    moving_seconds DOUBLE PRECISION NOT NULL DEFAULT 0,
+    max_speed DOUBLE PRECISION NOT NULL DEFAULT 0,      -- km/h
+    gps_points_count INTEGER NOT NULL DEFAULT 0,
+    harsh_brakes INTEGER NOT NULL DEFAULT 0,
+    harsh_accelerations INTEGER NOT NULL DEFAULT 0,
+    falls INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Great-circle distance in km
+CREATE OR REPLACE FUNCTION haversine_km(lat1 DOUBLE PRECISION, lon1 DOUBLE PRECISION,
+                                        lat2 DOUBLE PRECISION, lon2 DOUBLE PRECISION)
+RETURNS DOUBLE PRECISION AS $$
+    SELECT 2 * 6371.0 * ASIN(SQRT(
+        POWER(SIN(RADIANS(lat2 - lat1) / 2), 2) +
+        COS(RADIANS(lat1)) * COS(RADIANS(lat2)) * POWER(SIN(RADIANS(lon2 - lon1) / 2), 2)
+    ));
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION track_ride_point()
+RETURNS TRIGGER AS $$
+DECLARE
+    ride_gap CONSTANT INTERVAL := INTERVAL '5 minutes';
+    v_session ride_sessions%ROWTYPE;
+    v_speed DOUBLE PRECISION := COALESCE(NEW.smoothed_speed, NEW.speed, 0);
+    v_moving BOOLEAN := COALESCE(NEW.smoothed_speed, NEW.speed, 0) >= 1; -- Below 1 km/h is GPS drift
+    v_latitude DOUBLE PRECISION := COALESCE(NEW.smoothed_latitude, NEW.latitude);
+    v_longitude DOUBLE PRECISION := COALESCE(NEW.smoothed_longitude, NEW.longitude);
+    v_step_km DOUBLE PRECISION := 0;
+    v_step_seconds DOUBLE PRECISION := 0;
+BEGIN
+    IF v_latitude IS NULL OR v_longitude IS NULL THEN
+        RETURN NEW;
+    END IF;
+
+    SELECT * INTO v_session
+    FROM ride_sessions
+    ORDER BY start_time DESC
+    LIMIT 1
+    FOR UPDATE;
+
+    IF FOUND AND v_session.end_time IS NOT NULL
+       AND NEW.timestamp >= v_session.end_time
+       AND NEW.timestamp - v_session.end_time < ride_gap THEN
+        IF v_moving AND v_session.last_latitude IS NOT NULL THEN
+            v_step_km := haversine_km(v_session.last_latitude, v_session.last_longitude,
+                                      v_latitude, v_longitude);
+            v_step_seconds := EXTRACT(EPOCH FROM (NEW.timestamp - v_session.end_time));
+        END IF;
+
+        UPDATE ride_sessions SET
+            end_time = NEW.timestamp,
+            total_distance = COALESCE(total_distance, 0) + v_step_km,
+            moving_seconds = COALESCE(moving_seconds, 0) + v_step_seconds,
+            max_speed = GREATEST(COALESCE(max_speed, 0), v_speed),
+            avg_speed = CASE WHEN COALESCE(moving_seconds, 0) + v_step_seconds > 0
+                             THEN (COALESCE(total_distance, 0) + v_step_km)
+                                  / ((COALESCE(moving_seconds, 0) + v_step_seconds) / 3600.0)
+                             ELSE 0 END,
+            gps_points_count = COALESCE(gps_points_count, 0) + 1,
+            avg_gps_accuracy = (COALESCE(avg_gps_accuracy, 0) * COALESCE(gps_points_count, 0)
+                                + COALESCE(NEW.accuracy, 0)) / (COALESCE(gps_points_count, 0) + 1),
+            last_latitude = v_latitude,
+            last_longitude = v_longitude
+        WHERE id = v_session.id;
+    ELSIF NOT FOUND OR v_session.end_time IS NULL OR NEW.timestamp > v_session.end_time THEN
+        INSERT INTO ride_sessions (start_time, end_time, total_distance, moving_seconds,
+                                   max_speed, avg_speed, gps_points_count, avg_gps_accuracy,
+                                   last_latitude, last_longitude)
+        VALUES (NEW.timestamp, NEW.timestamp, 0, 0, v_speed, 0, 1, NEW.accuracy,
+                v_latitude, v_longitude);
+    END IF;
+    -- Points older than the current session's last point are ignored
+
+    INSERT INTO ride_daily_stats (day, total_distance, moving_seconds, max_speed, gps_points_count)
+    VALUES (NEW.timestamp::DATE, v_step_km, v_step_seconds, v_speed, 1)
+    ON CONFLICT (day) DO UPDATE SET
+        total_distance = ride_daily_stats.total_distance + EXCLUDED.total_distance,
+        moving_seconds = ride_daily_stats.moving_seconds + EXCLUDED.moving_seconds,
+        max_speed = GREATEST(ride_daily_stats.max_speed, EXCLUDED.max_speed),
+        gps_points_count = ride_daily_stats.gps_points_count + 1,
+        updated_at = NOW();
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION track_ride_event()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_brake INT := (NEW.event_type = 'HARSH_BRAKE')::INT;
+    v_accel INT := (NEW.event_type = 'HARSH_ACCEL')::INT;
+    v_fall INT := (NEW.event_type = 'FALL_DETECTED')::INT;
+BEGIN
+    IF v_brake + v_accel + v_fall = 0 THEN
+        RETURN NEW;
+    END IF;
+
+    UPDATE ride_sessions SET
+        harsh_brakes = COALESCE(harsh_brakes, 0) + v_brake,
+        harsh_accelerations = COALESCE(harsh_accelerations, 0) + v_accel,
+        falls = COALESCE(falls, 0) + v_fall
+    WHERE id = (SELECT id FROM ride_sessions ORDER BY start_time DESC LIMIT 1);
+
+    INSERT INTO ride_daily_stats (day, harsh_brakes, harsh_accelerations, falls)
+    VALUES (NEW.timestamp::DATE, v_brake, v_accel, v_fall)
+    ON CONFLICT (day) DO UPDATE SET
+        harsh_brakes = ride_daily_stats.harsh_brakes + EXCLUDED.harsh_brakes,
+        harsh_accelerations = ride_daily_stats.harsh_accelerations + EXCLUDED.harsh_accelerations,
+        falls = ride_daily_stats.falls + EXCLUDED.falls,
+        updated_at = NOW();
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_track_ride_point ON esp32_chest_data;
+CREATE TRIGGER trg_track_ride_point
+    AFTER INSERT ON esp32_chest_data
+    FOR EACH ROW EXECUTE FUNCTION track_ride_point();
+
+DROP TRIGGER IF EXISTS trg_track_ride_event ON events;
+CREATE TRIGGER trg_track_ride_event
+    AFTER INSERT ON events
+    FOR EACH ROW EXECUTE FUNCTION track_ride_event();
+
+
+-- =============================================
+-- 13. Geospatial Index & Event Hotspots
+-- =============================================
+-- The backend stores a 9-character geohash with every GPS point and event
+-- (backend/geo.py). Spatial lookups are then prefix scans on a btree, and
+-- hotspot clusters are pre-aggregated per geohash cell as events arrive.
+-- (With PostGIS available, a GIST index on a geography column would be the
+-- drop-in alternative; geohash keeps this working on any Postgres.)
+ALTER TABLE events ADD COLUMN IF NOT EXISTS geohash VARCHAR(12);
+ALTER TABLE esp32_chest_data ADD COLUMN IF NOT EXISTS geohash VARCHAR(12);
+
+CREATE INDEX IF NOT EXISTS idx_events_geohash
+    ON events(geohash varchar_pattern_ops) WHERE geohash IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_esp32_chest_geohash
+    ON esp32_chest_data(geohash varchar_pattern_ops) WHERE geohash IS NOT NULL;
+
+-- Event counts per geohash cell, at the precisions in geo.HOTSPOT_PRECISIONS
+CREATE TABLE IF NOT EXISTS event_hotspots (
+    precision SMALLINT NOT NULL,
+    cell VARCHAR(12) NOT NULL,
+    event_type VARCHAR(50) NOT NULL,
+    
+    event_count INTEGER NOT NULL DEFAULT 0,
+    sum_latitude DOUBLE PRECISION NOT NULL DEFAULT 0,
+    sum_longitude DOUBLE PRECISION NOT NULL DEFAULT 0,
+    -- Centroid of the events in this cell
+    latitude DOUBLE PRECISION,
+    longitude DOUBLE PRECISION,
+    last_event_at TIMESTAMPTZ,
+    
+    PRIMARY KEY (precision, cell, event_type)
+);
+
+CREATE INDEX IF NOT EXISTS idx_event_hotspots_bbox
+    ON event_hotspots(precision, event_type, latitude, longitude);
+
+CREATE OR REPLACE FUNCTION track_event_hotspot()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_precision INT;
+BEGIN
+    IF NEW.geohash IS NULL OR NEW.latitude IS NULL OR NEW.longitude IS NULL THEN
+        RETURN NEW;
+    END IF;
+
+    FOREACH v_precision IN ARRAY ARRAY[5, 6, 7] LOOP
+        INSERT INTO event_hotspots (precision, cell, event_type, event_count,
+                                    sum_latitude, sum_longitude, latitude, longitude, last_event_at)
+        VALUES (v_precision, LEFT(NEW.geohash, v_precision), NEW.event_type, 1,
+                NEW.latitude, NEW.longitude, NEW.latitude, NEW.longitude, NEW.timestamp)
+        ON CONFLICT (precision, cell, event_type) DO UPDATE SET
+            event_count = event_hotspots.event_count + 1,
+            sum_latitude = event_hotspots.sum_latitude + EXCLUDED.sum_latitude,
+            sum_longitude = event_hotspots.sum_longitude + EXCLUDED.sum_longitude,
+            latitude = (event_hotspots.sum_latitude + EXCLUDED.sum_latitude) / (event_hotspots.event_count + 1),
+            longitude = (event_hotspots.sum_longitude + EXCLUDED.sum_longitude) / (event_hotspots.event_count + 1),
+            last_event_at = GREATEST(event_hotspots.last_event_at, EXCLUDED.last_event_at);
+    END LOOP;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_track_event_hotspot ON events;
+CREATE TRIGGER trg_track_event_hotspot
+    AFTER INSERT ON events
+    FOR EACH ROW EXECUTE FUNCTION track_event_hotspot();
+
+
+-- =============================================
+-- 14. Device Calibrations (versioned)
+-- =============================================
+-- One row per calibration an ESP32 posts at boot (backend/calibration.py).
+-- The backend applies the highest version to every sample before detection
+-- and records which version it used on the sample row (0 = uncalibrated).
+CREATE TABLE IF NOT EXISTS device_calibrations (
+    device_id VARCHAR(50) NOT NULL,
+    version INTEGER NOT NULL,
+    
+    gyro_offset_x DOUBLE PRECISION NOT NULL DEFAULT 0,  -- rad/s
+    gyro_offset_y DOUBLE PRECISION NOT NULL DEFAULT 0,
+    gyro_offset_z DOUBLE PRECISION NOT NULL DEFAULT 0,
+    accel_scale DOUBLE PRECISION NOT NULL DEFAULT 1,
+    rotation DOUBLE PRECISION[] NOT NULL,  -- Row-major 3x3 mounting rotation
+    
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (device_id, version)
+);
+
+-- Store a calibration under the device's next version and return that version.
+-- Two posts from the same device (a firmware retrying a timed-out request,
+-- handled by another worker) can race for the same version; the loser takes
+-- the primary-key conflict and tries the next one instead of failing.
+CREATE OR REPLACE FUNCTION store_device_calibration(
+    p_device_id VARCHAR,
+    p_gyro_offset_x DOUBLE PRECISION,
+    p_gyro_offset_y DOUBLE PRECISION,
+    p_gyro_offset_z DOUBLE PRECISION,
+    p_accel_scale DOUBLE PRECISION,
+    p_rotation DOUBLE PRECISION[]
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_version INTEGER;
+BEGIN
+    LOOP
+        BEGIN
+            INSERT INTO device_calibrations (device_id, version, gyro_offset_x, gyro_offset_y,
+                                             gyro_offset_z, accel_scale, rotation)
+            SELECT p_device_id, COALESCE(MAX(version), 0) + 1, p_gyro_offset_x, p_gyro_offset_y,
+                   p_gyro_offset_z, p_accel_scale, p_rotation
+            FROM device_calibrations
+            WHERE device_id = p_device_id
+            RETURNING version INTO v_version;
+            RETURN v_version;
+        EXCEPTION WHEN unique_violation THEN
+            -- Another calibration took this version first; read the new maximum
+        END;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+ALTER TABLE esp32_leg_data ADD COLUMN IF NOT EXISTS calibration_version INTEGER DEFAULT 0;
+ALTER TABLE esp32_chest_data ADD COLUMN IF NOT EXISTS calibration_version INTEGER DEFAULT 0;
+
+
+
+-- =============================================
+-- 15. Event Pagination Indexes
+-- =============================================
+-- /api/events/recent pages newest-first with a keyset cursor
+-- (timestamp, id) < (?, ?), optionally filtered by type or severity. These
+-- composites let every page, however old, be one index range scan in cursor
+-- order; they supersede the single-column indexes from section 4. A bounding
+-- box filter goes through idx_events_geohash (section 13) as geohash prefix
+-- scans, like /api/events/near.
+CREATE INDEX IF NOT EXISTS idx_events_keyset
+    ON events(timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_events_type_keyset
+    ON events(event_type, timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_events_severity_keyset
+    ON events(severity, timestamp DESC, id DESC);
 
+DROP INDEX IF EXISTS idx_events_timestamp;
+DROP INDEX IF EXISTS idx_events_type;
+DROP INDEX IF EXISTS idx_events_severity;
 
 -- =============================================
 -- DONE! Schema created successfully
@@ -11,11 +11,17 @@ from telegram import Update
 from telegram.ext import ApplicationBuilder, CommandHandler, ContextTypes
 from os import getenv
 from dotenv import load_dotenv
-from supabase import create_client, Client
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import logging
+import math
+import os
 import random
 import string
+import sys
+import threading
+import time
 
 # Load environment variables
 load_dotenv()
@@ -32,14 +38,133 @@ BOT_TOKEN = getenv("TELEGRAM_BOT_TOKEN")
 SUPABASE_URL = getenv("SUPABASE_URL")
 SUPABASE_SERVICE_KEY = getenv("SUPABASE_SERVICE_ROLE_KEY")
 
-# Initialize Supabase
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+# Update delivery: 'polling' (default) or 'webhook' (served behind nginx)
+BOT_MODE = getenv("BOT_MODE", "polling").lower()
+WEBHOOK_URL = getenv("WEBHOOK_URL")  # Public URL Telegram posts updates to
+WEBHOOK_LISTEN = getenv("WEBHOOK_LISTEN", "127.0.0.1")
+WEBHOOK_PORT = int(getenv("WEBHOOK_PORT", 8081))
+WEBHOOK_PATH = getenv("WEBHOOK_PATH", "webhook")
+WEBHOOK_SECRET = getenv("WEBHOOK_SECRET")  # Checked against X-Telegram-Bot-Api-Secret-Token
+WEBHOOK_MAX_CONNECTIONS = int(getenv("WEBHOOK_MAX_CONNECTIONS", 40))
+
+# Bot API server (override to drive the bot from a local/fake Telegram server)
+TELEGRAM_API_URL = getenv("TELEGRAM_API_URL", "https://api.telegram.org").rstrip('/')
+
+# Database worker pool size (also caps concurrent update processing)
+DB_POOL_SIZE = int(getenv("DB_POOL_SIZE", 8))
+
+# Supabase client (one shared client = one shared HTTP connection pool),
+# created on first use so importing / starting the bot stays cheap
+supabase_client = None
+supabase_client_lock = threading.Lock()
+
+# The Supabase client is synchronous, so queries run on a bounded thread pool
+# instead of blocking the bot's event loop
+db_executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="supabase")
+
+# /status snapshot cache (sensor data arrives every 2 seconds)
+STATUS_CACHE_SECONDS = float(getenv("STATUS_CACHE_SECONDS", 2))
+status_cache = {"snapshot": {}, "fetched_at": float("-inf")}
+status_cache_lock = asyncio.Lock()
+
+# PIN lifecycle (expired PINs are purged by a periodic job, not per request)
+PIN_TTL_MINUTES = 10
+PIN_CLEANUP_INTERVAL = int(getenv("PIN_CLEANUP_INTERVAL", 300))  # seconds
+REGISTER_RATE_LIMIT = int(getenv("REGISTER_RATE_LIMIT", 5))  # /register calls per chat per minute
+# Best-effort throttle: counted per worker process, so N webhook workers allow
+# up to N x REGISTER_RATE_LIMIT. PIN dedupe itself lives in the database.
+register_attempts = {}  # chat_id -> monotonic times of recent /register calls
 
 
 # =============================================
 # HELPER FUNCTIONS
 # =============================================
 
+def get_supabase():
+    """Shared Supabase client, created on first use (thread-safe)"""
+    global supabase_client
+    if supabase_client is None:
+        with supabase_client_lock:
+            if supabase_client is None:
+                from supabase import create_client
+                supabase_client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+    return supabase_client
+
+
+async def warm_up(application):
+    """Create the Supabase client on the DB pool while the bot starts receiving updates"""
+    db_executor.submit(get_supabase)
+
+
+async def run_query(query):
+    """Execute a Supabase query on the DB pool without blocking other chats"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, query.execute)
+
+
+def parse_timestamp(timestamp):
+    """Timezone-aware datetime from an ISO timestamp from Supabase"""
+    return datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+
+
+def seconds_since(timestamp):
+    """Whole seconds elapsed since an ISO timestamp from Supabase"""
+    moment = parse_timestamp(timestamp)
+    return int((datetime.now(moment.tzinfo) - moment).total_seconds())
+
+
+async def get_status_snapshot():
+    """
+    Return the materialized status row (see status_snapshot in setup.sql).
+    Cached for STATUS_CACHE_SECONDS so a burst of /status calls shares one read.
+    """
+    if time.monotonic() - status_cache["fetched_at"] < STATUS_CACHE_SECONDS:
+        return status_cache["snapshot"]
+    
+    async with status_cache_lock:
+        # Another chat may have refreshed it while we waited
+        if time.monotonic() - status_cache["fetched_at"] < STATUS_CACHE_SECONDS:
+            return status_cache["snapshot"]
+        
+        result = await run_query(
+            get_supabase().table("status_snapshot")
+            .select("*")
+            .eq("id", 1)
+            .limit(1)
+        )
+        status_cache["snapshot"] = result.data[0] if result.data else {}
+        status_cache["fetched_at"] = time.monotonic()
+        return status_cache["snapshot"]
+
+
+def format_duration(seconds):
+    """Format seconds as e.g. '1h 05m' or '12m 30s'"""
+    seconds = int(seconds or 0)
+    hours, remainder = divmod(seconds, 3600)
+    minutes, secs = divmod(remainder, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m"
+    return f"{minutes}m {secs:02d}s"
+
+
+async def get_linked_user(update: Update):
+    """Return the caller's user row, or reply with a hint and return None if not linked"""
+    user_result = await run_query(
+        get_supabase().table("telegram_users")
+        .select("*")
+        .eq("telegram_chat_id", update.effective_chat.id)
+    )
+    
+    if not user_result.data or not user_result.data[0].get('is_linked'):
+        await update.message.reply_text(
+            "⚠️ You are not registered yet!\n\n"
+            "Use /register to get started."
+        )
+        return None
+    
+    return user_result.data[0]
+
+
 def generate_pin():
     """Generate 6-digit PIN code"""
     return ''.join(random.choices(string.digits, k=6))
@@ -48,14 +173,76 @@ def generate_pin():
 async def cleanup_expired_pins():
     """Remove expired PINs from database"""
     try:
-        supabase.table("telegram_pins")\
-            .delete()\
-            .lt("expires_at", datetime.now().isoformat())\
-            .execute()
+        await run_query(
+            get_supabase().table("telegram_pins")
+            .delete()
+            .lt("expires_at", datetime.now(timezone.utc).isoformat())
+        )
     except Exception as e:
         logger.error(f"Error cleaning up PINs: {e}")
 
 
+async def pin_maintenance(context: ContextTypes.DEFAULT_TYPE):
+    """Periodic job: purge expired PINs and prune the /register rate-limit counters"""
+    await cleanup_expired_pins()
+    
+    cutoff = time.monotonic() - 60
+    for chat_id, attempts in list(register_attempts.items()):
+        if not attempts or attempts[-1] < cutoff:
+            del register_attempts[chat_id]
+
+
+def is_register_rate_limited(chat_id):
+    """Sliding one-minute window of /register calls per chat (no DB access)"""
+    now = time.monotonic()
+    recent = [t for t in register_attempts.get(chat_id, []) if now - t < 60]
+    limited = len(recent) >= REGISTER_RATE_LIMIT
+    if not limited:
+        recent.append(now)
+    register_attempts[chat_id] = recent
+    return limited
+
+
+async def issue_pin(chat_id):
+    """Store a fresh PIN for chat_id, retrying if the random code is taken"""
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=PIN_TTL_MINUTES)
+    
+    for attempt in range(3):
+        pin = generate_pin()
+        pin_data = {
+            "pin_code": pin,
+            "telegram_chat_id": chat_id,
+            "expires_at": expires_at.isoformat()
+        }
+        try:
+            await run_query(get_supabase().table("telegram_pins").insert(pin_data))
+            break
+        except Exception as e:
+            # pin_code is UNIQUE; a collision with a live or not-yet-purged PIN
+            if attempt == 2:
+                raise
+            logger.warning(f"PIN insert failed, retrying: {e}")
+    
+    return pin, expires_at
+
+
+async def get_live_pin(chat_id):
+    """(pin, expires_at) of the chat's newest unused, unexpired PIN, or None"""
+    result = await run_query(
+        get_supabase().table("telegram_pins")
+        .select("pin_code, expires_at")
+        .eq("telegram_chat_id", chat_id)
+        .eq("is_used", False)
+        .gt("expires_at", datetime.now(timezone.utc).isoformat())
+        .order("expires_at", desc=True)
+        .limit(1)
+    )
+    if not result.data:
+        return None
+    row = result.data[0]
+    return row["pin_code"], parse_timestamp(row["expires_at"])
+
+
 # =============================================
 # COMMAND HANDLERS
 # =============================================
@@ -74,6 +261,8 @@ This bot sends you real-time alerts about:
 *Available Commands:*
 /register - Link your account
 /status - Check system status
+/ride - Latest ride summary
+/week - Last 7 days statistics
 /unlink - Unlink your account
 /help - Show this message
 
@@ -92,11 +281,19 @@ async def register(update: Update, context: ContextTypes.DEFAULT_TYPE):
         chat_id = update.effective_chat.id
         user = update.effective_user
         
+        # Throttle bursts before touching the database
+        if is_register_rate_limited(chat_id):
+            await update.message.reply_text(
+                "⏳ Too many requests. Please wait a minute and try again."
+            )
+            return
+        
         # Check if already linked
-        existing_user = supabase.table("telegram_users")\
-            .select("*")\
-            .eq("telegram_chat_id", chat_id)\
-            .execute()
+        existing_user = await run_query(
+            get_supabase().table("telegram_users")
+            .select("*")
+            .eq("telegram_chat_id", chat_id)
+        )
         
         if existing_user.data and existing_user.data[0].get('is_linked'):
             await update.message.reply_text(
@@ -105,46 +302,45 @@ async def register(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
             return
         
-        # Clean up old expired PINs
-        await cleanup_expired_pins()
-        
-        # Generate new PIN
-        pin = generate_pin()
-        expires_at = datetime.now() + timedelta(minutes=10)
-        
-        # Store PIN in database
-        pin_data = {
-            "pin_code": pin,
-            "telegram_chat_id": chat_id,
-            "expires_at": expires_at.isoformat()
-        }
-        supabase.table("telegram_pins").insert(pin_data).execute()
-        
-        # Create or update user record
-        user_data = {
-            "telegram_chat_id": chat_id,
-            "telegram_username": user.username,
-            "first_name": user.first_name,
-            "last_name": user.last_name
-        }
-        
-        if existing_user.data:
-            supabase.table("telegram_users")\
-                .update(user_data)\
-                .eq("telegram_chat_id", chat_id)\
-                .execute()
+        # Re-send a still-valid PIN instead of issuing another one. Checked in the
+        # database, not a local cache: any worker may have issued it, and a PIN
+        # used to link (then /unlink) must not be offered again.
+        live_pin = await get_live_pin(chat_id)
+        if live_pin:
+            pin, expires_at = live_pin
         else:
-            supabase.table("telegram_users").insert(user_data).execute()
+            pin, expires_at = await issue_pin(chat_id)
+            
+            # Create or update user record
+            user_data = {
+                "telegram_chat_id": chat_id,
+                "telegram_username": user.username,
+                "first_name": user.first_name,
+                "last_name": user.last_name
+            }
+            
+            if existing_user.data:
+                await run_query(
+                    get_supabase().table("telegram_users")
+                    .update(user_data)
+                    .eq("telegram_chat_id", chat_id)
+                )
+            else:
+                await run_query(get_supabase().table("telegram_users").insert(user_data))
+        
+        # A re-sent PIN has less than the full TTL left
+        expires_in = expires_at - datetime.now(timezone.utc)
+        minutes_left = max(math.ceil(expires_in.total_seconds() / 60), 1)
         
         message = f"""
 🔐 *Registration PIN Generated*
 
 Your PIN code is: `{pin}`
 
-⏰ Valid for: 10 minutes
+⏰ Valid for: {minutes_left} minutes
 📱 Enter this PIN in the dashboard to link your account
 
-The PIN will expire at: {expires_at.strftime('%H:%M:%S')}
+The PIN will expire at: {expires_at.astimezone(timezone.utc).strftime('%H:%M:%S')} UTC
 """
         
         await update.message.reply_text(message, parse_mode='Markdown')
@@ -160,57 +356,35 @@ The PIN will expire at: {expires_at.strftime('%H:%M:%S')}
 async def status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /status command - Show system status"""
     try:
-        chat_id = update.effective_chat.id
-        
-        # Check if user is linked
-        user_result = supabase.table("telegram_users")\
-            .select("*")\
-            .eq("telegram_chat_id", chat_id)\
-            .execute()
-        
-        if not user_result.data or not user_result.data[0].get('is_linked'):
-            await update.message.reply_text(
-                "⚠️ You are not registered yet!\n\n"
-                "Use /register to get started."
-            )
+        user = await get_linked_user(update)
+        if not user:
             return
         
-        # Get latest sensor data
-        chest_data = supabase.table("esp32_chest_data")\
-            .select("*")\
-            .order("timestamp", desc=True)\
-            .limit(1)\
-            .execute()
-        
-        leg_data = supabase.table("esp32_leg_data")\
-            .select("*")\
-            .order("timestamp", desc=True)\
-            .limit(1)\
-            .execute()
-        
-        # Get recent events count
-        events = supabase.table("events")\
-            .select("event_type", count="exact")\
-            .execute()
+        # Latest fix, sensor freshness and event counters (one cached row)
+        snapshot = await get_status_snapshot()
         
         # Build status message
         status_msg = "📊 *System Status*\n\n"
         
-        if chest_data.data:
-            chest = chest_data.data[0]
-            status_msg += f"📍 GPS: {chest.get('latitude', 'N/A')}, {chest.get('longitude', 'N/A')}\n"
-            status_msg += f"🏍️ Speed: {chest.get('speed', 0):.1f} km/h\n"
-            status_msg += f"🛰️ Satellites: {chest.get('satellites', 0)}\n"
-            status_msg += f"🎯 Accuracy: {chest.get('accuracy', 0):.1f}m\n"
-            
-            last_update = datetime.fromisoformat(chest['timestamp'].replace('Z', '+00:00'))
-            time_diff = (datetime.now(last_update.tzinfo) - last_update).seconds
-            status_msg += f"⏰ Last update: {time_diff}s ago\n"
+        if snapshot.get('chest_updated_at'):
+            status_msg += f"📍 GPS: {snapshot.get('latitude') or 'N/A'}, {snapshot.get('longitude') or 'N/A'}\n"
+            status_msg += f"🏍️ Speed: {snapshot.get('speed') or 0:.1f} km/h\n"
+            status_msg += f"🛰️ Satellites: {snapshot.get('satellites') or 0}\n"
+            status_msg += f"🎯 Accuracy: {snapshot.get('accuracy') or 0:.1f}m\n"
+            status_msg += f"⏰ Last update: {seconds_since(snapshot['chest_updated_at'])}s ago\n"
         else:
             status_msg += "⚠️ No GPS data available\n"
         
-        status_msg += f"\n📊 Total events: {len(events.data) if events.data else 0}\n"
-        status_msg += f"🔔 Notifications: {'ON' if user_result.data[0].get('notifications_enabled') else 'OFF'}\n"
+        if snapshot.get('leg_updated_at'):
+            status_msg += f"🦵 Leg sensor: {seconds_since(snapshot['leg_updated_at'])}s ago\n"
+        else:
+            status_msg += "⚠️ No leg sensor data available\n"
+        
+        status_msg += f"\n📊 Total events: {snapshot.get('total_events', 0)}\n"
+        status_msg += f"   🚨 Falls: {snapshot.get('falls', 0)}\n"
+        status_msg += f"   ⚠️ Harsh brakes: {snapshot.get('harsh_brakes', 0)}\n"
+        status_msg += f"   ⚡ Harsh accelerations: {snapshot.get('harsh_accelerations', 0)}\n"
+        status_msg += f"🔔 Notifications: {'ON' if user.get('notifications_enabled') else 'OFF'}\n"
         
         await update.message.reply_text(status_msg, parse_mode='Markdown')
         
@@ -221,15 +395,98 @@ async def status(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
 
 
+async def ride(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /ride command - Summary of the latest ride session"""
+    try:
+        if not await get_linked_user(update):
+            return
+        
+        # Maintained by the track_ride_point/track_ride_event triggers
+        result = await run_query(
+            get_supabase().table("ride_sessions")
+            .select("*")
+            .order("start_time", desc=True)
+            .limit(1)
+        )
+        
+        if not result.data:
+            await update.message.reply_text("⚠️ No rides recorded yet.")
+            return
+        
+        session = result.data[0]
+        in_progress = seconds_since(session['end_time']) < 300
+        started = parse_timestamp(session['start_time'])
+        ended = parse_timestamp(session['end_time'])
+        
+        ride_msg = f"🏍️ *{'Current' if in_progress else 'Last'} Ride*\n\n"
+        ride_msg += f"🕐 Started: {started.strftime('%d %b %H:%M')}\n"
+        ride_msg += f"⏱️ Duration: {format_duration((ended - started).total_seconds())}"
+        ride_msg += f" (moving {format_duration(session.get('moving_seconds'))})\n"
+        ride_msg += f"📏 Distance: {session.get('total_distance') or 0:.2f} km\n"
+        ride_msg += f"🚀 Max speed: {session.get('max_speed') or 0:.1f} km/h\n"
+        ride_msg += f"📈 Avg speed: {session.get('avg_speed') or 0:.1f} km/h\n"
+        ride_msg += f"\n⚠️ Harsh brakes: {session.get('harsh_brakes') or 0}\n"
+        ride_msg += f"⚡ Harsh accelerations: {session.get('harsh_accelerations') or 0}\n"
+        ride_msg += f"🚨 Falls: {session.get('falls') or 0}\n"
+        
+        await update.message.reply_text(ride_msg, parse_mode='Markdown')
+        
+    except Exception as e:
+        logger.error(f"Error in ride command: {e}")
+        await update.message.reply_text(
+            "❌ Error fetching ride summary. Please try again."
+        )
+
+
+async def week(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /week command - Totals for the last 7 days"""
+    try:
+        if not await get_linked_user(update):
+            return
+        
+        # At most 7 pre-aggregated rows, one per day
+        since = datetime.now(timezone.utc).date() - timedelta(days=6)
+        result = await run_query(
+            get_supabase().table("ride_daily_stats")
+            .select("*")
+            .gte("day", since.isoformat())
+        )
+        days = result.data or []
+        
+        distance = sum(d.get('total_distance') or 0 for d in days)
+        moving_seconds = sum(d.get('moving_seconds') or 0 for d in days)
+        max_speed = max((d.get('max_speed') or 0 for d in days), default=0)
+        avg_speed = distance / (moving_seconds / 3600) if moving_seconds else 0
+        
+        week_msg = "📊 *Last 7 Days*\n\n"
+        week_msg += f"📅 Days ridden: {sum(1 for d in days if d.get('moving_seconds'))}\n"
+        week_msg += f"📏 Distance: {distance:.2f} km\n"
+        week_msg += f"⏱️ Moving time: {format_duration(moving_seconds)}\n"
+        week_msg += f"🚀 Max speed: {max_speed:.1f} km/h\n"
+        week_msg += f"📈 Avg speed: {avg_speed:.1f} km/h\n"
+        week_msg += f"\n⚠️ Harsh brakes: {sum(d.get('harsh_brakes') or 0 for d in days)}\n"
+        week_msg += f"⚡ Harsh accelerations: {sum(d.get('harsh_accelerations') or 0 for d in days)}\n"
+        week_msg += f"🚨 Falls: {sum(d.get('falls') or 0 for d in days)}\n"
+        
+        await update.message.reply_text(week_msg, parse_mode='Markdown')
+        
+    except Exception as e:
+        logger.error(f"Error in week command: {e}")
+        await update.message.reply_text(
+            "❌ Error fetching weekly statistics. Please try again."
+        )
+
+
 async def unlink(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /unlink command - Unlink account"""
     try:
         chat_id = update.effective_chat.id
         
-        result = supabase.table("telegram_users")\
-            .update({"is_linked": False, "notifications_enabled": False})\
-            .eq("telegram_chat_id", chat_id)\
-            .execute()
+        result = await run_query(
+            get_supabase().table("telegram_users")
+            .update({"is_linked": False, "notifications_enabled": False})
+            .eq("telegram_chat_id", chat_id)
+        )
         
         if result.data:
             await update.message.reply_text(
@@ -255,11 +512,12 @@ async def toggle_notifications(update: Update, context: ContextTypes.DEFAULT_TYP
         chat_id = update.effective_chat.id
         
         # Get current status
-        user_result = supabase.table("telegram_users")\
-            .select("notifications_enabled")\
-            .eq("telegram_chat_id", chat_id)\
-            .eq("is_linked", True)\
-            .execute()
+        user_result = await run_query(
+            get_supabase().table("telegram_users")
+            .select("notifications_enabled")
+            .eq("telegram_chat_id", chat_id)
+            .eq("is_linked", True)
+        )
         
         if not user_result.data:
             await update.message.reply_text(
@@ -271,10 +529,11 @@ async def toggle_notifications(update: Update, context: ContextTypes.DEFAULT_TYP
         current_status = user_result.data[0].get('notifications_enabled', True)
         new_status = not current_status
         
-        supabase.table("telegram_users")\
-            .update({"notifications_enabled": new_status})\
-            .eq("telegram_chat_id", chat_id)\
-            .execute()
+        await run_query(
+            get_supabase().table("telegram_users")
+            .update({"notifications_enabled": new_status})
+            .eq("telegram_chat_id", chat_id)
+        )
         
         status_text = "enabled ✅" if new_status else "disabled ❌"
         await update.message.reply_text(
@@ -298,6 +557,8 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 /start - Welcome message
 /register - Generate PIN to link your account
 /status - Check system status and latest data
+/ride - Distance, speed and events of your latest ride
+/week - Ride statistics for the last 7 days
 /notifications - Toggle alerts on/off
 /unlink - Unlink your account
 /help - Show this help message
@@ -326,27 +587,66 @@ Check the dashboard or contact the admin.
 # MAIN
 # =============================================
 
+async def shutdown_db_pool(application):
+    """Release DB worker threads when the bot stops"""
+    db_executor.shutdown(wait=False)
+
+
 def main():
     """Start the bot"""
     if not BOT_TOKEN:
         logger.error("TELEGRAM_BOT_TOKEN not found in environment variables")
         return
     
-    # Build application
-    application = ApplicationBuilder().token(BOT_TOKEN).build()
+    # Build application (process updates concurrently so one slow chat
+    # does not hold up the others)
+    application = ApplicationBuilder()\
+        .token(BOT_TOKEN)\
+        .base_url(f"{TELEGRAM_API_URL}/bot")\
+        .base_file_url(f"{TELEGRAM_API_URL}/file/bot")\
+        .concurrent_updates(DB_POOL_SIZE * 4)\
+        .post_init(warm_up)\
+        .post_shutdown(shutdown_db_pool)\
+        .build()
     
     # Add command handlers
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("register", register))
     application.add_handler(CommandHandler("status", status))
+    application.add_handler(CommandHandler("ride", ride))
+    application.add_handler(CommandHandler("week", week))
     application.add_handler(CommandHandler("unlink", unlink))
     application.add_handler(CommandHandler("notifications", toggle_notifications))
     application.add_handler(CommandHandler("help", help_command))
     
+    # Purge expired PINs in the background instead of on every /register
+    application.job_queue.run_repeating(pin_maintenance, interval=PIN_CLEANUP_INTERVAL, first=10)
+    
     # Start bot
-    logger.info("🤖 Rider Telemetry Bot is starting...")
-    application.run_polling()
+    if BOT_MODE == 'webhook':
+        if not WEBHOOK_URL:
+            logger.error("WEBHOOK_URL is required when BOT_MODE=webhook")
+            return
+        
+        logger.info(f"🤖 Rider Telemetry Bot is starting (webhook on {WEBHOOK_LISTEN}:{WEBHOOK_PORT}/{WEBHOOK_PATH})...")
+        application.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=WEBHOOK_PATH,
+            webhook_url=WEBHOOK_URL,
+            secret_token=WEBHOOK_SECRET,
+            max_connections=WEBHOOK_MAX_CONNECTIONS
+        )
+    else:
+        logger.info("🤖 Rider Telemetry Bot is starting (polling)...")
+        application.run_polling()
 
 
 if __name__ == '__main__':
-    main()
+    if '--profile-startup' in sys.argv[1:]:
+        # Cold-start breakdown by imported package (shared tool in backend/)
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+        from startup_profile import print_startup_profile
+        print_startup_profile(__file__)
+    else:
+        main()
@@ -0,0 +1,275 @@
+# Webhook Check - Ignition Hackathon
+# Drives tele-bot.py in webhook mode end to end, fully offline:
+#
+#   stubs     the Telegram Bot API and Supabase (PostgREST) are served by one
+#             in-process stub that records every Bot API call
+#   bot       tele-bot.py runs in a subprocess with BOT_MODE=webhook and
+#             TELEGRAM_API_URL / SUPABASE_URL pointed at the stub
+#   updates   Telegram-style updates are posted to the bot's webhook, with and
+#             without the secret token
+#
+# Checked: the bot registers its webhook (URL and secret), rejects an update
+# with the wrong secret, answers /start and /register through sendMessage to
+# the right chat, and re-sends the live PIN on a second /register. Exits
+# non-zero on the first failure.
+#
+# CLI:
+#   python webhook_check.py
+#   python webhook_check.py --timeout 60 --log bot.log
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+import httpx
+
+BOT_TOKEN = "123456:stub"
+SECRET = "stub-secret"
+CHAT_ID = 4242
+
+
+# =============================================
+# Stub Bot API + Supabase
+# =============================================
+
+class StubCalls:
+    """Bot API calls the stub received, as (method, params) (thread-safe)"""
+
+    def __init__(self):
+        self.calls = []
+        self.pins = []  # telegram_pins rows the bot inserted
+        self.changed = threading.Condition()
+
+    def add(self, method, params):
+        with self.changed:
+            self.calls.append((method, params))
+            self.changed.notify_all()
+
+    def replies(self):
+        """Parameters of every sendMessage call so far"""
+        return [params for method, params in self.calls if method == "sendMessage"]
+
+    def wait_for(self, match, timeout):
+        """First recorded call for which match(method, params) is true, or None after timeout"""
+        deadline = time.time() + timeout
+        with self.changed:
+            while True:
+                found = next((call for call in self.calls if match(*call)), None)
+                if found or time.time() >= deadline:
+                    return found
+                self.changed.wait(deadline - time.time())
+
+
+def stub_handler(calls):
+    """Request handler class answering the Bot API and PostgREST calls the bot makes"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _params(self):
+            """Request parameters, JSON or form-encoded (python-telegram-bot sends the latter)"""
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length).decode()
+            if not raw:
+                return {}
+            if self.headers.get("Content-Type", "").startswith("application/json"):
+                return json.loads(raw)
+            return dict(parse_qsl(raw))
+
+        def _bot_api(self):
+            method = self.path.split("?")[0].rsplit("/", 1)[-1]
+            params = self._params()
+            calls.add(method, params)
+            if method == "getMe":
+                result = {"id": 1, "is_bot": True, "first_name": "Stub", "username": "stub_bot"}
+            elif method == "sendMessage":
+                result = {
+                    "message_id": len(calls.calls),
+                    "date": int(time.time()),
+                    "chat": {"id": int(params.get("chat_id", 0)), "type": "private"},
+                    "text": params.get("text", ""),
+                }
+            else:
+                result = True  # setWebhook, deleteWebhook, ...
+            self._reply(200, {"ok": True, "result": result})
+
+        def do_GET(self):
+            if self.path.startswith("/bot"):
+                self._bot_api()
+            elif self.path.startswith("/rest/v1/telegram_pins"):
+                # The newest PIN, with the 'Z' suffix PostgREST may use
+                pins = [{**pin, "expires_at": pin["expires_at"].replace("+00:00", "Z")} for pin in calls.pins[-1:]]
+                self._reply(200, pins)
+            else:
+                self._reply(200, [])  # No linked users or rides
+
+        def do_POST(self):
+            if self.path.startswith("/bot"):
+                self._bot_api()
+                return
+            params = self._params()
+            if self.path.startswith("/rest/v1/telegram_pins"):
+                calls.pins.append(params)
+            self._reply(201, [])
+
+        def do_PATCH(self):
+            self._params()
+            self._reply(200, [])
+
+        def do_DELETE(self):
+            self._reply(200, [])
+
+    return Handler
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_stub(port):
+    """Serve the stub in a background thread; returns (server, calls)"""
+    calls = StubCalls()
+    server = _StubServer(("127.0.0.1", port), stub_handler(calls))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, calls
+
+
+def start_bot(stub_url, webhook_port, log):
+    """Run tele-bot.py in webhook mode against the stub; returns the Popen"""
+    env = dict(
+        os.environ,
+        TELEGRAM_BOT_TOKEN=BOT_TOKEN,
+        TELEGRAM_API_URL=stub_url,
+        SUPABASE_URL=stub_url,
+        SUPABASE_SERVICE_ROLE_KEY="stub",
+        BOT_MODE="webhook",
+        WEBHOOK_URL=f"http://127.0.0.1:{webhook_port}/webhook",
+        WEBHOOK_LISTEN="127.0.0.1",
+        WEBHOOK_PORT=str(webhook_port),
+        WEBHOOK_PATH="webhook",
+        WEBHOOK_SECRET=SECRET,
+    )
+    here = os.path.dirname(os.path.abspath(__file__))
+    return subprocess.Popen(
+        [sys.executable, os.path.join(here, "tele-bot.py")],
+        cwd=here, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+
+
+# =============================================
+# Checks
+# =============================================
+
+def command_update(update_id, text):
+    """Update carrying a private-chat bot command, as Telegram posts it"""
+    command = text.split()[0]
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": CHAT_ID, "type": "private"},
+            "from": {"id": CHAT_ID, "is_bot": False, "first_name": "Test", "username": "tester"},
+            "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(command)}],
+        },
+    }
+
+
+def post_update(webhook_url, update, secret=SECRET):
+    return httpx.post(
+        webhook_url, json=update, timeout=5.0,
+        headers={"X-Telegram-Bot-Api-Secret-Token": secret}
+    ).status_code
+
+
+def run_checks(calls, webhook_url, timeout):
+    """Yields (description, passed) for each check, stopping after the first failure"""
+    registered = calls.wait_for(lambda method, params: method == "setWebhook", timeout)
+    yield "webhook registered", bool(registered)
+    if not registered:
+        return
+    yield "webhook URL and secret", (
+        registered[1].get("url") == webhook_url and registered[1].get("secret_token") == SECRET
+    )
+
+    yield "wrong secret rejected", post_update(webhook_url, command_update(1, "/start"), secret="wrong") == 403
+
+    # (command, check, text the reply must contain)
+    steps = (
+        ("/start", "/start answered", lambda: "Welcome"),
+        ("/register", "/register answered", lambda: "PIN"),
+        ("/register", "live PIN re-sent", lambda: calls.pins[0]["pin_code"]),
+    )
+    for update_id, (text, description, expected) in enumerate(steps, start=2):
+        sent_before = len(calls.replies())
+        if post_update(webhook_url, command_update(update_id, text)) != 200:
+            yield f"{text} accepted", False
+            return
+        calls.wait_for(lambda method, params: len(calls.replies()) > sent_before, timeout)
+        replies = calls.replies()[sent_before:]
+        passed = bool(replies) and str(replies[0].get("chat_id")) == str(CHAT_ID) \
+            and expected() in replies[0].get("text", "")
+        yield description, passed
+        if not passed:
+            return
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the Telegram bot's webhook mode against a stub Bot API")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Seconds to wait for each bot reaction")
+    parser.add_argument("--log", help="Write the bot's output here (default: a temporary file)")
+    args = parser.parse_args()
+
+    stub_port, webhook_port = free_port(), free_port()
+    stub, calls = start_stub(stub_port)
+    webhook_url = f"http://127.0.0.1:{webhook_port}/webhook"
+    log_path = args.log or os.path.join(tempfile.mkdtemp(prefix="webhook-check-"), "bot.log")
+
+    failed = False
+    with open(log_path, "w") as log:
+        bot = start_bot(f"http://127.0.0.1:{stub_port}", webhook_port, log)
+        try:
+            for description, passed in run_checks(calls, webhook_url, args.timeout):
+                print(f"{'ok  ' if passed else 'FAIL'} {description}")
+                failed = failed or not passed
+        finally:
+            bot.terminate()
+            try:
+                bot.wait(10)
+            except subprocess.TimeoutExpired:
+                bot.kill()
+            stub.shutdown()
+
+    if failed:
+        print(f"Bot output: {log_path}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())